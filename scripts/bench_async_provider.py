@@ -0,0 +1,128 @@
+"""Concurrency ceiling of the request path with a blocking vs an async provider.
+
+Drives the FastAPI app in-process with ``--concurrency`` simultaneous charge requests
+against a provider stub that injects ``--latency-ms`` of latency per call. The blocking
+provider runs on worker threads (40 by default, like the pre-async request path on
+Starlette's threadpool); the async provider is awaited on the event loop. Reports throughput and the
+peak number of provider calls in flight.
+
+Usage: PYTHONPATH=src python scripts/bench_async_provider.py [--requests 2000] [--concurrency 500] [--latency-ms 50]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+import uuid
+
+os.environ.setdefault("DISABLE_AUTH_FOR_TESTS", "true")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from payments.api import register_payment_routes  # noqa: E402
+from payments.models import PaymentInstrument, PaymentStatus, PaymentTransaction  # noqa: E402
+from payments.providers import PaymentProvider  # noqa: E402
+
+
+def _txn(request, provider: str) -> PaymentTransaction:
+    return PaymentTransaction(
+        txn_id=str(uuid.uuid4()),
+        person_id=request.person_id,
+        instrument_id=request.instrument_id,
+        amount=request.amount,
+        currency=request.currency,
+        status=PaymentStatus.SUCCEEDED,
+        provider=provider,
+    )
+
+
+class _Gauge:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.active -= 1
+
+
+class BlockingProvider(PaymentProvider):
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.gauge = _Gauge()
+
+    def register_instrument(self, instrument):
+        return instrument
+
+    def create_transaction(self, request):
+        with self.gauge:
+            time.sleep(self.latency)
+        return _txn(request, self.name)
+
+
+class AsyncProvider:
+    name = "mock"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.gauge = _Gauge()
+
+    async def register_instrument(self, instrument):
+        return instrument
+
+    async def create_transaction(self, request):
+        with self.gauge:
+            await asyncio.sleep(self.latency)
+        return _txn(request, self.name)
+
+    async def get_status(self, txn_id):
+        raise KeyError(txn_id)
+
+    async def handle_webhook(self, payload):
+        raise NotImplementedError
+
+
+async def _run(label: str, provider, requests: int, concurrency: int) -> None:
+    app = FastAPI()
+    service = register_payment_routes(app, provider=provider)
+    await service.aregister_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"))
+    charge = {"person_id": "p1", "instrument_id": "i1", "amount": 1.0, "authorization_context": {"approved": True}}
+    limit = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+
+        async def one() -> None:
+            async with limit:
+                resp = await client.post("/payments/transactions", json=charge)
+                resp.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    service.close()
+    print(f"{label:<9} {requests / elapsed:>8.0f} req/s  peak in-flight provider calls={provider.gauge.peak}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000.0
+    asyncio.run(_run("blocking", BlockingProvider(latency), args.requests, args.concurrency))
+    asyncio.run(_run("async", AsyncProvider(latency), args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Per-request overhead of the auth dependency with and without the verified-token cache.
+
+Calls ``auth_dependency`` directly ``--requests`` times, cycling through ``--tokens``
+distinct bearer tokens, and reports mean microseconds per call.
+
+Usage: PYTHONPATH=src python scripts/bench_auth.py [--requests 20000] [--tokens 100]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from jose import jwt
+
+from payments import auth
+
+
+def _tokens(count: int) -> list[str]:
+    exp = int(time.time()) + 3600
+    return [
+        "Bearer "
+        + jwt.encode(
+            {"sub": f"user-{n}", "iss": "unison-auth", "aud": "unison-internal", "exp": exp}, "bench", algorithm="HS256"
+        )
+        for n in range(count)
+    ]
+
+
+async def _run(headers: list[str], requests: int) -> float:
+    start = time.perf_counter()
+    for n in range(requests):
+        await auth.auth_dependency(headers[n % len(headers)])
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ["UNISON_AUTH_SECRET"] = "bench"
+    os.environ.pop("DISABLE_AUTH_FOR_TESTS", None)
+    headers = _tokens(args.tokens)
+    for label, cache_size in (("uncached", "0"), ("cached", "10000")):
+        os.environ["UNISON_AUTH_CACHE_SIZE"] = cache_size
+        auth.reset_auth_settings()
+        elapsed = asyncio.run(_run(headers, args.requests))
+        print(f"{label:<9} {elapsed / args.requests * 1e6:>8.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
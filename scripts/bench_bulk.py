@@ -0,0 +1,90 @@
+"""Throughput of bulk vs per-item instrument registration and transaction creation.
+
+Runs the FastAPI app in-process against local stub context/storage services and
+registers ``--items`` instruments (over ``--persons`` people), then charges them, once
+with per-item requests and once with the bulk endpoints. Reports items/sec and how many
+upstream requests each path made.
+
+Usage: PYTHONPATH=src python scripts/bench_bulk.py [--items 10000] [--persons 100]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("DISABLE_AUTH_FOR_TESTS", "true")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from payments.api import register_payment_routes  # noqa: E402
+from payments.clients import ServiceHttpClient  # noqa: E402
+from stub_services import StubServer  # noqa: E402
+
+
+def _vault_handler(method, path, body):
+    if method == "GET":
+        return 200, {"value": {"token": "tok_bench"}}
+    return 201, {"ok": True}
+
+
+def _run(label: str, items: int, persons: int, bulk: bool) -> None:
+    with StubServer() as context, StubServer(_vault_handler) as storage:
+        context_client = ServiceHttpClient(context.host, context.port)
+        storage_client = ServiceHttpClient(storage.host, storage.port)
+        app = FastAPI()
+        register_payment_routes(app, context_client=context_client, storage_client=storage_client)
+        client = TestClient(app)
+        instruments = [
+            {"person_id": f"person-{n % persons}", "kind": "card", "last4": "4242", "token": f"tok_{n}"}
+            for n in range(items)
+        ]
+
+        start = time.perf_counter()
+        if bulk:
+            body = client.post("/payments/instruments/bulk", json=instruments).json()
+            registered = [result["instrument"] for result in body["results"]]
+        else:
+            registered = [client.post("/payments/instruments", json=item).json()["instrument"] for item in instruments]
+        register_elapsed = time.perf_counter() - start
+        register_upstream = context.requests + storage.requests
+
+        charges = [
+            {
+                "person_id": inst["person_id"],
+                "instrument_id": inst["instrument_id"],
+                "amount": 1.0,
+                "authorization_context": {"approved": True},
+            }
+            for inst in registered
+        ]
+        start = time.perf_counter()
+        if bulk:
+            client.post("/payments/transactions/bulk", json=charges)
+        else:
+            for charge in charges:
+                client.post("/payments/transactions", json=charge)
+        charge_elapsed = time.perf_counter() - start
+        charge_upstream = context.requests + storage.requests - register_upstream
+        context_client.close()
+        storage_client.close()
+
+    print(
+        f"{label:<9} register {items / register_elapsed:>8.0f}/s (upstream={register_upstream:<6})"
+        f"  charge {items / charge_elapsed:>8.0f}/s (upstream={charge_upstream})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--persons", type=int, default=100)
+    args = parser.parse_args()
+
+    _run("per-item", args.items, args.persons, bulk=False)
+    _run("bulk", args.items, args.persons, bulk=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Throughput benchmark for single-event vs batched PaymentEventLogger emission.
+
+Runs a local stub receiver that accepts ``POST /payments/events`` (one JSON event) and
+``POST /payments/events/batch`` (gzip NDJSON) and reports events/sec plus request counts.
+
+Usage: PYTHONPATH=src python scripts/bench_event_batching.py [--events 5000] [--batch-size 500]
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import time
+
+from payments.clients import ServiceHttpClient
+from payments.logging import PaymentEventLogger
+from stub_services import StubServer
+
+
+class _Receiver:
+    def __init__(self):
+        self.events = 0
+
+    def __call__(self, method, path, body):
+        if path.endswith("/batch"):
+            self.events += gzip.decompress(body).count(b"\n") + 1
+        else:
+            self.events += 1
+        return 202, None
+
+
+def _emit(emitter: PaymentEventLogger, count: int) -> None:
+    for i in range(count):
+        emitter.log_event(
+            event_type="PaymentTransactionSucceeded",
+            subject_id=f"txn-{i}",
+            person_id="bench-person",
+            provider="mock",
+            status="succeeded",
+            amount=1.23,
+            currency="USD",
+        )
+
+
+def _run(label: str, count: int, **logger_kwargs) -> None:
+    receiver = _Receiver()
+    with StubServer(receiver) as stub:
+        client = ServiceHttpClient(stub.host, stub.port)
+        emitter = PaymentEventLogger(client, **logger_kwargs)
+        start = time.perf_counter()
+        _emit(emitter, count)
+        emitter.close()
+        elapsed = time.perf_counter() - start
+        client.close()
+        print(
+            f"{label:<8} {count / elapsed:>10.0f} events/s  requests={stub.requests:<6}"
+            f" received={receiver.events} stats={emitter.stats()}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    _run("single", args.events)
+    _run("batched", args.events, batch_size=args.batch_size, flush_interval=args.flush_ms / 1000.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Ledger export throughput and peak memory for a large ledger.
+
+Loads ``--rows`` transactions into a SQLite ledger (kept at ``--path`` if given, and
+reused on later runs), then exports all of them once per available format (CSV, plus
+Arrow IPC and Parquet when pyarrow is installed). Each export runs in a fresh child
+process so its peak RSS is measured on its own. Reports rows/sec, output size and peak
+RSS, which should stay flat as ``--rows`` grows.
+
+Usage: PYTHONPATH=src python scripts/bench_export.py [--rows 10000000] [--path /tmp/export-ledger.db]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from payments.export import available_formats
+
+
+def _load(path: str, rows: int) -> None:
+    from payments.ledger import SQLiteLedger
+    from payments.models import PaymentStatus, PaymentTransaction
+
+    ledger = SQLiteLedger(path, group_commit_size=100_000)
+    existing = len(ledger)
+    start = time.perf_counter()
+    batch = []
+    for n in range(existing, rows):
+        batch.append(
+            PaymentTransaction(
+                f"txn-{n:010d}", f"person-{n % 100_000}", f"inst-{n % 250_000}", None, "USD", PaymentStatus.SUCCEEDED,
+                description="coffee" if n % 3 else None, provider="mock", metadata={"order": n} if n % 10 == 0 else None,
+                created_at=1_700_000_000 + n * 0.01, amount_minor=100 + n % 99_900,
+            )
+        )
+        if len(batch) == 10_000:
+            ledger.put_many(batch)
+            batch.clear()
+    if batch:
+        ledger.put_many(batch)
+    ledger.close()
+    if rows > existing:
+        print(f"loaded {rows - existing:,} rows in {time.perf_counter() - start:.0f}s")
+
+
+def _run_export(path: str, fmt: str, output: str) -> None:
+    from payments.export import Export
+    from payments.ledger import SQLiteLedger
+
+    ledger = SQLiteLedger(path)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    export = Export(ledger, fmt)
+    start = time.perf_counter()
+    with open(output, "wb") as handle:
+        for data in export:
+            handle.write(data)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"rows": export.rows, "seconds": elapsed, "baseline_kb": baseline, "peak_kb": peak}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--path", default=None)
+    parser.add_argument("--run-export", nargs=3, metavar=("LEDGER", "FORMAT", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run_export:
+        _run_export(*args.run_export)
+        return
+
+    directory = tempfile.mkdtemp(prefix="payments-export-")
+    path = args.path or os.path.join(directory, "ledger.db")
+    _load(path, args.rows)
+    for fmt in available_formats():
+        output = os.path.join(directory, f"transactions.{fmt}")
+        result = subprocess.run(
+            [sys.executable, __file__, "--run-export", path, fmt, output], capture_output=True, text=True, check=True
+        )
+        stats = json.loads(result.stdout)
+        print(
+            f"{fmt:<8} {stats['rows'] / stats['seconds']:>10,.0f} rows/s  {stats['rows']:,} rows in "
+            f"{stats['seconds']:.1f}s  {os.path.getsize(output) / 1e6:,.0f} MB  peak RSS {stats['peak_kb'] / 1024:.0f} MB "
+            f"(after imports {stats['baseline_kb'] / 1024:.0f} MB)"
+        )
+        os.remove(output)
+
+
+if __name__ == "__main__":
+    main()
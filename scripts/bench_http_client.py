@@ -0,0 +1,114 @@
+"""Benchmark pooled ServiceHttpClient against per-call httpx requests.
+
+Starts a local stub service and issues the same request mix (GET profile, POST profile,
+PUT vault) through:
+
+- ``per-call``: module-level ``httpx.get``/``httpx.post``/``httpx.put`` (one TCP connection per call)
+- ``pooled``: a single ``ServiceHttpClient`` with keep-alive
+- ``pooled-async``: ``AsyncServiceHttpClient`` with bounded concurrency
+
+Usage: PYTHONPATH=src python scripts/bench_http_client.py [--requests 3000] [--concurrency 8]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from payments.clients import AsyncServiceHttpClient, ServiceHttpClient
+from stub_services import StubServer, percentile
+
+_PATHS = [("GET", "/profile/p1", None), ("POST", "/profile/p1", {"profile": {}}), ("PUT", "/kv/vault/k", {"value": {}})]
+
+
+def _per_call(base_url: str):
+    def call(i: int) -> float:
+        method, path, payload = _PATHS[i % len(_PATHS)]
+        start = time.perf_counter()
+        if method == "GET":
+            httpx.get(f"{base_url}{path}", timeout=2.0)
+        elif method == "POST":
+            httpx.post(f"{base_url}{path}", json=payload, timeout=2.0)
+        else:
+            httpx.put(f"{base_url}{path}", json=payload, timeout=2.0)
+        return time.perf_counter() - start
+
+    return call
+
+
+def _pooled(client: ServiceHttpClient):
+    def call(i: int) -> float:
+        method, path, payload = _PATHS[i % len(_PATHS)]
+        start = time.perf_counter()
+        if method == "GET":
+            client.get(path)
+        elif method == "POST":
+            client.post(path, payload)
+        else:
+            client.put(path, payload)
+        return time.perf_counter() - start
+
+    return call
+
+
+def _run_threads(call, requests: int, concurrency: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(call, range(requests)))
+    return time.perf_counter() - start, latencies
+
+
+async def _run_async(client: AsyncServiceHttpClient, requests: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def call(i: int) -> float:
+        method, path, payload = _PATHS[i % len(_PATHS)]
+        async with sem:
+            start = time.perf_counter()
+            if method == "GET":
+                await client.get(path)
+            elif method == "POST":
+                await client.post(path, payload)
+            else:
+                await client.put(path, payload)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(call(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return elapsed, latencies
+
+
+def _report(label: str, elapsed: float, latencies) -> None:
+    print(
+        f"{label:<14} {len(latencies) / elapsed:>9.0f} req/s"
+        f"  p50={percentile(latencies, 50) * 1000:.2f}ms  p99={percentile(latencies, 99) * 1000:.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with StubServer() as stub:
+        base_url = f"http://{stub.host}:{stub.port}"
+        _report("per-call", *_run_threads(_per_call(base_url), args.requests, args.concurrency))
+
+        client = ServiceHttpClient(stub.host, stub.port)
+        try:
+            _report("pooled", *_run_threads(_pooled(client), args.requests, args.concurrency))
+        finally:
+            client.close()
+
+        async_client = AsyncServiceHttpClient(stub.host, stub.port)
+        _report("pooled-async", *asyncio.run(_run_async(async_client, args.requests, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
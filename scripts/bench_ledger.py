@@ -0,0 +1,75 @@
+"""Insert throughput and lookup latency for the SQLite ledger.
+
+Loads ``--rows`` transactions (spread over ``--persons`` people) through
+``SQLiteLedger.put`` with group commit, then samples point lookups by ``txn_id`` and
+range lookups by ``person_id``. Use the default 10M rows to size disks and workers; smaller
+values are handy for quick checks.
+
+Usage: PYTHONPATH=src python scripts/bench_ledger.py [--rows 10000000] [--path /tmp/ledger.db]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+from stub_services import percentile
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--persons", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--group-commit", type=int, default=1024)
+    parser.add_argument("--path", default=None)
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(prefix="payments-ledger-"), "ledger.db")
+    ledger = SQLiteLedger(path, group_commit_size=args.group_commit)
+    base = time.time()
+    start = time.perf_counter()
+    for i in range(args.rows):
+        ledger.put(
+            PaymentTransaction(
+                txn_id=f"txn-{i:010d}",
+                person_id=f"person-{i % args.persons}",
+                instrument_id=f"inst-{i % (args.persons * 2)}",
+                amount=1.0 + (i % 500),
+                currency="USD",
+                status=PaymentStatus.SUCCEEDED,
+                provider="mock",
+                created_at=base + i * 0.001,
+            )
+        )
+    ledger.flush()
+    elapsed = time.perf_counter() - start
+    print(f"inserts: {args.rows:,} rows in {elapsed:.1f}s -> {args.rows / elapsed:,.0f} rows/s ({ledger.stats()})")
+
+    point = []
+    for _ in range(args.lookups):
+        txn_id = f"txn-{random.randrange(args.rows):010d}"
+        t0 = time.perf_counter()
+        ledger.get(txn_id)
+        point.append(time.perf_counter() - t0)
+    print(f"get(txn_id): p50={percentile(point, 50) * 1e6:.1f}us p99={percentile(point, 99) * 1e6:.1f}us")
+
+    by_person = []
+    for _ in range(min(args.lookups, 5000)):
+        person = f"person-{random.randrange(args.persons)}"
+        t0 = time.perf_counter()
+        ledger._conn.execute(
+            "SELECT txn_id FROM transactions WHERE person_id = ? ORDER BY created_at DESC LIMIT 50", (person,)
+        ).fetchall()
+        by_person.append(time.perf_counter() - t0)
+    print(f"person range (50 rows): p50={percentile(by_person, 50) * 1e6:.1f}us p99={percentile(by_person, 99) * 1e6:.1f}us")
+    ledger.close()
+    print(f"db size: {os.path.getsize(path) / 2**20:,.1f} MiB at {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Memory per transaction object and response serialization cost, before vs after.
+
+``before`` is the previous model (a regular dataclass with a per-instance ``__dict__``
+and two eagerly allocated dicts) rendered the previous way: ``txn.__dict__`` through
+FastAPI's ``jsonable_encoder`` and ``JSONResponse``. ``after`` is the slotted
+``PaymentTransaction`` rendered with ``to_dict`` and ``PaymentJSONResponse``.
+
+Usage: PYTHONPATH=src python scripts/bench_models.py [--objects 100000] [--responses 20000] [--page 50]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.responses import PaymentJSONResponse, orjson
+
+
+@dataclass
+class LegacyTransaction:
+    txn_id: str
+    person_id: str
+    instrument_id: str
+    amount: float
+    currency: str
+    status: PaymentStatus
+    description: str | None = None
+    counterparty: str | None = None
+    provider: str | None = None
+    authorization_context: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=lambda: time.time())
+
+
+def _make(cls, n: int, txn_id: str | None = None):
+    return cls(
+        txn_id=txn_id or f"txn-{n:012d}",
+        person_id="person-1",
+        instrument_id="inst-1",
+        amount=12.5,
+        currency="USD",
+        status=PaymentStatus.SUCCEEDED,
+        provider="mock",
+    )
+
+
+def _bytes_per_object(cls, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    ids = [f"txn-{n:012d}" for n in range(count)]
+    with_ids, _ = tracemalloc.get_traced_memory()
+    objects = [_make(cls, n, ids[n]) for n in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects, ids
+    # The txn_id strings are allocated up front; subtract the list's pointer per object.
+    return (current - with_ids) / count - 8
+
+
+def _time(render: Callable[[], Any], count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        render()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=100_000)
+    parser.add_argument("--responses", type=int, default=20_000)
+    parser.add_argument("--page", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    for label, cls in (("before", LegacyTransaction), ("after", PaymentTransaction)):
+        print(f"{label:<7} {_bytes_per_object(cls, args.objects):>6.0f} bytes/object")
+
+    legacy, txn = _make(LegacyTransaction, 1), _make(PaymentTransaction, 1)
+    legacy_page = [_make(LegacyTransaction, n) for n in range(args.page)]
+    page = [_make(PaymentTransaction, n) for n in range(args.page)]
+    cases = (
+        (
+            "single",
+            lambda: JSONResponse(jsonable_encoder({"ok": True, "transaction": legacy.__dict__})),
+            lambda: PaymentJSONResponse({"ok": True, "transaction": txn.to_dict()}),
+        ),
+        (
+            f"page of {args.page}",
+            lambda: JSONResponse(jsonable_encoder({"ok": True, "transactions": [t.__dict__ for t in legacy_page]})),
+            lambda: PaymentJSONResponse({"ok": True, "transactions": [t.to_dict() for t in page]}),
+        ),
+    )
+    for name, before, after in cases:
+        count = max(1, args.responses // (args.page if name != "single" else 1))
+        old, new = _time(before, count), _time(after, count)
+        size_old, size_new = len(before().body), len(after().body)
+        print(
+            f"{name:<11} before={old:>8.1f} us/response ({size_old} B)  "
+            f"after={new:>7.1f} us/response ({size_new} B)  {old / new:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Profile writes for a person with many instruments: read-modify-write vs merge patch.
+
+Seeds a stub context service with one person holding ``--instruments`` instruments,
+then registers ``--registrations`` more for that person from ``--threads`` threads,
+once with the whole-profile read-modify-write path and once with coalesced merge
+patches of the instrument list. Reports registrations/sec, context requests, bytes on the wire and how many
+of the new instruments are missing from the final profile (lost updates).
+
+Usage: PYTHONPATH=src python scripts/bench_profile_patch.py [--instruments 1000] [--registrations 500] [--threads 8]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from payments.clients import ServiceHttpClient
+from payments.models import PaymentInstrument
+from payments.profile import ProfilePatcher
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+from stub_services import ContextStub, StubServer
+
+
+def _run(label: str, args, patch: bool) -> None:
+    context = ContextStub()
+    with StubServer(context) as server:
+        client = ServiceHttpClient(server.host, server.port)
+        seed = PaymentService(MockPaymentProvider(), context_client=client)
+        existing = [
+            PaymentInstrument(instrument_id=f"seed-{n}", person_id="p1", provider="mock", kind="card", last4="4242")
+            for n in range(args.instruments)
+        ]
+        seed._write_person_instruments("p1", existing)
+        context.bytes_in = context.bytes_out = 0
+        before = server.requests
+
+        service = PaymentService(
+            MockPaymentProvider(), context_client=client, profile_patcher=ProfilePatcher(client) if patch else None
+        )
+
+        def register(n: int) -> None:
+            service.register_instrument(
+                PaymentInstrument(instrument_id=f"new-{n}", person_id="p1", provider="mock", kind="card", last4="1111")
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(register, range(args.registrations)))
+        elapsed = time.perf_counter() - start
+        client.close()
+
+        stored = {entry["instrument_id"] for entry in context.profiles["p1"]["payments"]["instruments"]}
+        lost = sum(1 for n in range(args.registrations) if f"new-{n}" not in stored)
+        print(
+            f"{label:<6} {args.registrations / elapsed:>8.0f} reg/s  requests={server.requests - before:<5} "
+            f"sent={context.bytes_in / 1e6:>7.2f}MB  received={context.bytes_out / 1e6:>7.2f}MB  lost={lost}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instruments", type=int, default=1000)
+    parser.add_argument("--registrations", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    _run("rmw", args, patch=False)
+    _run("patch", args, patch=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Reconciliation throughput and memory for a large settlement file.
+
+Loads ``--records`` transactions into a SQLite ledger (or the in-memory store with
+``--store memory``), writes a settlement file in CSV and NDJSON where about 1% of rows
+differ (amount, status or an unknown txn_id), then reconciles each file from disk on one
+thread. Reports records/sec, discrepancies found and the peak Python heap growth during
+the run, which should stay flat as ``--records`` grows. The target is 100k records/sec.
+
+Usage: PYTHONPATH=src python scripts/bench_reconcile.py [--records 1000000] [--store ledger|memory]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.reconcile import Reconciler, read_settlement
+from payments.store import InMemoryTransactionStore
+
+
+def _txn(n: int) -> PaymentTransaction:
+    return PaymentTransaction(
+        txn_id=f"txn-{n:010d}",
+        person_id=f"person-{n % 1000}",
+        instrument_id=f"inst-{n % 5000}",
+        amount=round(1 + (n % 9973) / 100, 2),
+        currency="USD",
+        status=PaymentStatus.SUCCEEDED,
+        provider="mock",
+        authorization_context={"approved": True},
+        created_at=1_700_000_000 + n,
+    )
+
+
+def _settlement_rows(count: int):
+    for n in range(count):
+        txn = _txn(n)
+        txn_id, amount, status = txn.txn_id, txn.amount, "settled"
+        if n % 300 == 1:
+            amount += 1
+        elif n % 300 == 2:
+            status = "declined"
+        elif n % 300 == 3:
+            txn_id = f"unknown-{n}"
+        yield txn_id, amount, status
+
+
+def _write_files(directory: str, count: int):
+    csv_path, ndjson_path = os.path.join(directory, "settlement.csv"), os.path.join(directory, "settlement.ndjson")
+    with open(csv_path, "w", encoding="utf-8") as csv_file, open(ndjson_path, "w", encoding="utf-8") as ndjson_file:
+        csv_file.write("transaction_id,amount,currency,status\n")
+        for txn_id, amount, status in _settlement_rows(count):
+            csv_file.write(f"{txn_id},{amount:.2f},USD,{status}\n")
+            ndjson_file.write(
+                json.dumps({"transaction_id": txn_id, "amount": f"{amount:.2f}", "currency": "USD", "status": status})
+                + "\n"
+            )
+    return {"csv": csv_path, "ndjson": ndjson_path}
+
+
+def _load(store, count: int) -> None:
+    batch = []
+    for n in range(count):
+        batch.append(_txn(n))
+        if len(batch) == 10_000:
+            if hasattr(store, "put_many"):
+                store.put_many(batch)
+            else:
+                for txn in batch:
+                    store.put(txn)
+            batch.clear()
+    for txn in batch:
+        store.put(txn)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--store", choices=("ledger", "memory"), default="ledger")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.store == "ledger":
+            store = SQLiteLedger(os.path.join(directory, "ledger.db"), group_commit_size=50_000)
+        else:
+            store = InMemoryTransactionStore(args.records, pending_ttl=86400, terminal_ttl=86400)
+        start = time.perf_counter()
+        _load(store, args.records)
+        if args.store == "ledger":
+            store.flush()
+        files = _write_files(directory, args.records)
+        print(f"setup: {args.records} transactions ({args.store}) and settlement files in {time.perf_counter() - start:.1f}s")
+
+        for fmt, path in files.items():
+            tracemalloc.start()
+            base, _ = tracemalloc.get_traced_memory()
+            reconciler = Reconciler(store)
+            start = time.perf_counter()
+            with open(path, "rb") as stream:
+                found = sum(1 for _ in reconciler.run(read_settlement(stream, fmt)))
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # tracemalloc slows allocation-heavy code; time once more without it.
+            reconciler = Reconciler(store)
+            start = time.perf_counter()
+            with open(path, "rb") as stream:
+                for _ in reconciler.run(read_settlement(stream, fmt)):
+                    pass
+            elapsed = time.perf_counter() - start
+            summary = reconciler.summary
+            print(
+                f"{fmt:<7} {args.records / elapsed:>9,.0f} records/s  discrepancies={found} "
+                f"(missing={summary['missing']} mismatched={summary['mismatched']})  "
+                f"peak heap growth={(peak - base) / 1e6:.1f} MB"
+            )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Transaction totals over a large columnar snapshot: NumPy vs pure Python vs per-object loop.
+
+Fills a ``TransactionColumns`` snapshot with ``--transactions`` rows spread over
+``--persons`` persons, six currencies and 30 days, then times ``reporting.totals`` by
+person, currency and day, and converted to USD by day, with NumPy and with the
+pure-Python fallback (the results are checked to be identical). For comparison, a
+per-object loop over ``--object-sample`` ``PaymentTransaction`` objects (float amounts,
+dict accumulation) is timed and reported as rows/sec.
+
+Usage: PYTHONPATH=src python scripts/bench_reporting.py [--transactions 10000000] [--persons 10000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import payments.reporting as reporting
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.reporting import FXRates, TransactionColumns, totals
+
+CURRENCIES = ("USD", "EUR", "GBP", "JPY", "KWD", "CAD")
+FX = FXRates.from_spec("EUR=1.08,GBP=1.27,JPY=0.0067,KWD=3.25,CAD=0.73")
+START = 1_700_006_400
+
+
+def _rows(count: int, persons: int):
+    rng = random.Random(11)
+    for _ in range(count):
+        yield (
+            f"person-{rng.randrange(persons)}",
+            CURRENCIES[rng.randrange(len(CURRENCIES))],
+            rng.randrange(100, 50_000),
+            START + rng.randrange(30 * 86400),
+        )
+
+
+def _time(label: str, fn, rows: int):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed:7.2f}s  {rows / elapsed:>12,.0f} rows/s  groups={len(result):,}")
+    return result
+
+
+def _per_object(txns):
+    rates = {currency: FX.factor(currency, "USD") / 100 for currency in CURRENCIES}
+    sums = {}
+    for txn in txns:
+        key = int(txn.created_at // 86400)
+        sums[key] = sums.get(key, 0.0) + txn.amount * 10 ** (2 if txn.currency not in ("JPY", "KWD") else 0) * rates[txn.currency]
+    return sums
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=10_000_000)
+    parser.add_argument("--persons", type=int, default=10_000)
+    parser.add_argument("--object-sample", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    columns = TransactionColumns()
+    start = time.perf_counter()
+    for row in _rows(args.transactions, args.persons):
+        columns.append(*row)
+    print(f"snapshot: {args.transactions:,} rows in {time.perf_counter() - start:.1f}s")
+
+    numpy = reporting.use_numpy
+    results = {}
+    for name in ("numpy", "python"):
+        if name == "numpy" and not numpy:
+            print("numpy: not installed, skipped")
+            continue
+        reporting.use_numpy = name == "numpy"
+        print(f"{name}:")
+        results[name] = (
+            _time("by person, currency, day", lambda: totals(columns), args.transactions),
+            _time("USD by day", lambda: totals(columns, by=["day"], convert_to="USD", fx=FX), args.transactions),
+        )
+    reporting.use_numpy = numpy
+    if len(results) == 2:
+        print(f"numpy and python results identical: {results['numpy'] == results['python']}")
+
+    sample = min(args.object_sample, args.transactions)
+    txns = [
+        PaymentTransaction(f"t{n}", person, "i1", None, currency, PaymentStatus.SUCCEEDED, created_at=at, amount_minor=minor)
+        for n, (person, currency, minor, at) in enumerate(_rows(sample, args.persons))
+    ]
+    print(f"per-object loop ({sample:,} PaymentTransaction objects):")
+    _time("USD by day", lambda: _per_object(txns), sample)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Cold-start cost of the payments server, with import-time budgets.
+
+Each run starts a fresh ``python -X importtime`` child that imports FastAPI first (every
+FastAPI service pays for that), then ``payments.server``, calls ``create_app()`` (which
+imports ``payments.api`` and adds the routes) and runs the lifespan startup that builds
+the service. From the
+importtime tree it reports the cumulative import time of ``payments.server`` and
+``payments.api`` on top of FastAPI, the time from ``import payments.server`` until the
+app is ready, and the slowest modules imported along the way. The best of ``--runs``
+runs is kept.
+
+With ``--check`` the results are compared to ``scripts/startup_budget.json`` (or
+``--budget``): every ``import_ms`` and ``ready_ms`` budget must hold and none of the
+``deferred`` modules (crypto backends, pyarrow, numpy, HTTP and tracing SDKs) may be
+loaded by the time the app is ready; the exit status is 1 otherwise.
+
+Usage: PYTHONPATH=src python scripts/bench_startup.py [--runs 3] [--check] [--budget scripts/startup_budget.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+_CHILD = """
+import asyncio, json, sys, time
+import fastapi, fastapi.middleware.cors
+start = time.perf_counter()
+from payments.server import create_app
+app = create_app()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(boot())
+print(json.dumps({"ready_ms": (ready - start) * 1000, "modules": sorted(sys.modules)}))
+"""
+
+
+def parse_importtime(stderr: str) -> Tuple[Dict[str, float], List[Tuple[float, str]]]:
+    """Top-level cumulative times and every module's self time (ms) from ``-X importtime`` output."""
+    cumulative: Dict[str, float] = {}
+    own: List[Tuple[float, str]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        own.append((int(self_us) / 1000, name))
+        if depth == 0:
+            cumulative[name] = int(cumulative_us) / 1000
+    return cumulative, own
+
+
+def measure(runs: int) -> Dict[str, Any]:
+    """Best-of-``runs`` startup figures for a fresh interpreter."""
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    best: Dict[str, Any] = {}
+    for _ in range(max(1, runs)):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _CHILD], capture_output=True, text=True, env=env, check=True
+        )
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        cumulative, own = parse_importtime(result.stderr)
+        run = {
+            "import_ms": {name: cumulative.get(name, 0.0) for name in ("payments.server", "payments.api")},
+            "ready_ms": report["ready_ms"],
+            "modules": report["modules"],
+            "slowest": sorted(own, reverse=True)[:10],
+        }
+        if not best or run["ready_ms"] < best["ready_ms"]:
+            best = run
+    return best
+
+
+def check(results: Dict[str, Any], budget: Dict[str, Any]) -> List[str]:
+    """Budget violations in ``results`` (empty when within budget)."""
+    problems = []
+    for name, limit in budget.get("import_ms", {}).items():
+        took = results["import_ms"].get(name, 0.0)
+        if took > limit:
+            problems.append(f"import {name} took {took:.1f}ms (budget {limit}ms)")
+    if results["ready_ms"] > budget.get("ready_ms", float("inf")):
+        problems.append(f"ready after {results['ready_ms']:.1f}ms (budget {budget['ready_ms']}ms)")
+    modules = set(results["modules"])
+    for name in budget.get("deferred", []):
+        if name in modules:
+            problems.append(f"{name} is imported before the first request")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--check", action="store_true", help="exit 1 when a budget is exceeded")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET)
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    for name, took in results["import_ms"].items():
+        print(f"import {name:<16} {took:8.1f} ms  (on top of fastapi)")
+    print(f"ready after        {results['ready_ms']:8.1f} ms  (import payments.server -> lifespan startup done)")
+    print("slowest modules (self time):")
+    for took, name in results["slowest"]:
+        print(f"  {took:8.1f} ms  {name}")
+    if args.check:
+        with open(args.budget, encoding="utf-8") as handle:
+            problems = check(results, json.load(handle))
+        for problem in problems:
+            print(f"OVER BUDGET: {problem}")
+        if problems:
+            sys.exit(1)
+        print("within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Status polling with a large backlog of pending transactions.
+
+Tracks ``--pending`` transactions (spread over ``--providers`` providers) in a
+``StatusPoller`` with its default settings (first polls spread over the 30s-900s
+backoff range) and reports the tracking rate and the Python heap held per pending
+transaction (ids excluded). It then drains the backlog with the backoff scaled down to
+fractions of a second: each poll settles a transaction with probability
+``--settle-rate`` and leaves the rest for another backoff round, and each batch costs
+``--batch-latency-ms`` to mimic a provider's batch status API. Reports polls per second,
+batches, the largest ``overdue_seconds`` and thread count seen (one scheduler plus
+``--workers`` pollers, whatever the backlog) and the time until nothing is left.
+Finally ``--service-transactions`` pending transactions are drained through
+``PaymentService.poll_statuses``, which reads the store, calls the provider's
+``get_statuses`` and records every change as a webhook would.
+
+Usage: PYTHONPATH=src python scripts/bench_status_poller.py [--pending 1000000] [--workers 4] [--batch-size 100]
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+import threading
+import time
+import tracemalloc
+
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.poller import StatusPoller
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+
+
+# Backoff scaled down so a drain finishes in seconds rather than hours.
+FAST = dict(base_delay=0.05, max_delay=0.4, resolution=0.01)
+
+
+def _track(args) -> None:
+    ids = [f"txn-{n:09d}" for n in range(args.pending)]
+    providers = [f"psp-{n}" for n in range(args.providers)]
+    poller = StatusPoller(lambda provider, txn_ids: {})
+
+    def delay():
+        return poller.base_delay + (poller.max_delay - poller.base_delay) * random.random()
+
+    sampled = min(args.pending, 200_000)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for n in range(sampled):
+        poller.track(ids[n], providers[n % len(providers)], delay=delay())
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for n in range(sampled, args.pending):
+        poller.track(ids[n], providers[n % len(providers)], delay=delay())
+    elapsed = time.perf_counter() - start
+    rate = (args.pending - sampled) / elapsed if args.pending > sampled else 0.0
+    print(f"track: {len(poller):,} pending, {rate:,.0f} tracks/s, {(heap - base) / sampled:.0f} B heap per pending txn")
+
+
+def _drain(args) -> None:
+    rng = random.Random(7)
+    latency = args.batch_latency_ms / 1000.0
+
+    def check(provider, txn_ids):
+        if latency:
+            time.sleep(latency)
+        return {txn_id: rng.random() < args.settle_rate for txn_id in txn_ids}
+
+    poller = StatusPoller(check, workers=args.workers, batch_size=args.batch_size, **FAST)
+    providers = [f"psp-{n}" for n in range(args.providers)]
+    for n in range(args.pending):
+        poller.track(f"txn-{n:09d}", providers[n % len(providers)], delay=random.random())
+    overdue, threads = [0.0], [0]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.5):
+            overdue[0] = max(overdue[0], poller.stats()["overdue_seconds"])
+            threads[0] = max(threads[0], threading.active_count() - 2)  # not main and this sampler
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    poller.start()
+    poller.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    poller.close()
+    stats = poller.stats()
+    print(
+        f"drain: {stats['polled']:,} polls in {elapsed:.1f}s ({stats['polled'] / elapsed:,.0f} polls/s), "
+        f"{stats['batches']:,} batches, settled {stats['settled']:,}, expired {stats['expired']:,}, "
+        f"max overdue {overdue[0]:.2f}s, at most {threads[0]} poller threads"
+    )
+
+
+class _SettlingProvider(MockPaymentProvider):
+    """Answers a batch status request by settling every transaction."""
+
+    name = "psp"
+
+    def get_statuses(self, txn_ids):
+        settled = []
+        for txn_id in txn_ids:
+            txn = copy.copy(self._transactions.get(txn_id))
+            txn.status = PaymentStatus.SUCCEEDED
+            settled.append(txn)
+        return settled
+
+
+def _service(args) -> None:
+    provider = _SettlingProvider()
+    service = PaymentService(provider)
+    service.poller = StatusPoller(service.poll_statuses, workers=args.workers, batch_size=args.batch_size, **FAST)
+    for n in range(args.service_transactions):
+        txn = PaymentTransaction(
+            f"txn-{n}", f"person-{n % 1000}", "inst-1", 12.5, "USD", PaymentStatus.CREATED, provider="psp"
+        )
+        provider._transactions.put(txn)
+        service.transactions.put(copy.copy(txn))
+        service.poller.track(txn.txn_id, "psp", delay=0.0)
+    start = time.perf_counter()
+    service.poller.start()
+    service.poller.join()
+    elapsed = time.perf_counter() - start
+    settled = sum(1 for txn in service.transactions if txn.status == PaymentStatus.SUCCEEDED)
+    print(
+        f"service: {args.service_transactions:,} pending settled through poll_statuses in {elapsed:.1f}s "
+        f"({args.service_transactions / elapsed:,.0f} txns/s), {settled:,} stored as succeeded"
+    )
+    service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pending", type=int, default=1_000_000)
+    parser.add_argument("--providers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--settle-rate", type=float, default=0.5)
+    parser.add_argument("--batch-latency-ms", type=float, default=0.0)
+    parser.add_argument("--service-transactions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    _track(args)
+    _drain(args)
+    _service(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Overhead of metrics and tracing on the smoke flow (register, charge, status lookup).
+
+Builds the app with telemetry off, with metrics, and with metrics plus tracing (an SDK
+tracer provider without an exporter, so span creation is measured but nothing is sent),
+then runs the ``scripts/payments_smoke.py`` flow ``--iterations`` times per round,
+alternating configurations for ``--rounds`` rounds. Reports the median time per flow and
+the overhead relative to telemetry off; the budget is 5%.
+
+Usage: PYTHONPATH=src python scripts/bench_telemetry.py [--iterations 500] [--rounds 5]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("DISABLE_AUTH_FOR_TESTS", "true")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from opentelemetry.sdk.trace import TracerProvider  # noqa: E402
+
+from payments import api  # noqa: E402
+from payments.telemetry import Telemetry  # noqa: E402
+
+_TRACER = TracerProvider().get_tracer("bench")
+
+
+def _client(metrics: bool, tracing: bool) -> TestClient:
+    api._build_telemetry_from_env = lambda: Telemetry(metrics=metrics, tracer=_TRACER if tracing else None)
+    app = FastAPI()
+    api.register_payment_routes(app)
+    return TestClient(app)
+
+
+def _flow(client: TestClient, iterations: int) -> float:
+    instrument = {"person_id": "smoke-person", "provider": "mock", "kind": "card", "last4": "4242", "token": "tok"}
+    start = time.perf_counter()
+    for _ in range(iterations):
+        registered = client.post("/payments/instruments", json=instrument).json()["instrument"]
+        charge = {
+            "person_id": registered["person_id"],
+            "instrument_id": registered["instrument_id"],
+            "amount": 1.23,
+            "authorization_context": {"approved": True},
+        }
+        txn = client.post("/payments/transactions", json=charge).json()["transaction"]
+        client.get(f"/payments/transactions/{txn['txn_id']}").raise_for_status()
+    return (time.perf_counter() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    configs = {"off": (False, False), "metrics": (True, False), "metrics+tracing": (True, True)}
+    clients = {label: _client(*flags) for label, flags in configs.items()}
+    for client in clients.values():
+        _flow(client, 20)  # warm up
+    samples = {label: [] for label in configs}
+    for _ in range(args.rounds):
+        for label, client in clients.items():
+            samples[label].append(_flow(client, args.iterations))
+    baseline = statistics.median(samples["off"])
+    for label, values in samples.items():
+        median = statistics.median(values)
+        print(f"{label:<16} {median * 1e6:>8.0f} us/flow  overhead={(median / baseline - 1) * 100:+6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Listing latency vs store size for the in-memory index and the SQLite ledger.
+
+For each size, fills a store with ``--per-person`` transactions per person and times
+first-page and deep-page (cursor) queries for a random person, plus a status filter.
+Latency should stay flat as the store grows.
+
+Usage: PYTHONPATH=src python scripts/bench_transaction_listing.py [--sizes 10000,100000,1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.store import InMemoryTransactionStore, TransactionQuery
+from stub_services import percentile
+
+
+def _fill(store, size: int, persons: int) -> None:
+    txns = (
+        PaymentTransaction(
+            txn_id=f"txn-{i:09d}",
+            person_id=f"person-{i % persons}",
+            instrument_id=f"inst-{i % (persons * 2)}",
+            amount=1.0,
+            currency="USD",
+            status=PaymentStatus.FAILED if i % 10 == 0 else PaymentStatus.SUCCEEDED,
+            created_at=1_700_000_000.0 + i,
+        )
+        for i in range(size)
+    )
+    if isinstance(store, SQLiteLedger):
+        batch = []
+        for txn in txns:
+            batch.append(txn)
+            if len(batch) == 10000:
+                store.put_many(batch)
+                batch = []
+        store.put_many(batch)
+        store.flush()
+    else:
+        for txn in txns:
+            store.put(txn)
+
+
+def _time(store, make_query, samples: int):
+    latencies = []
+    for _ in range(samples):
+        query = make_query()
+        start = time.perf_counter()
+        store.query(query)
+        latencies.append(time.perf_counter() - start)
+    return f"p50={percentile(latencies, 50) * 1e6:7.1f}us p99={percentile(latencies, 99) * 1e6:7.1f}us"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--per-person", type=int, default=200)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        persons = max(1, size // args.per_person)
+        for label in ("memory", "ledger"):
+            if label == "memory":
+                store = InMemoryTransactionStore(size)
+            else:
+                store = SQLiteLedger(os.path.join(tempfile.mkdtemp(prefix="payments-list-"), "ledger.db"))
+            _fill(store, size, persons)
+
+            def person():
+                return f"person-{random.randrange(persons)}"
+
+            def deep_cursor():
+                created = 1_700_000_000.0 + random.randrange(size)
+                return created, "txn-999999999"
+
+            first = _time(store, lambda: TransactionQuery(person_id=person(), limit=50), args.samples)
+            deep = _time(store, lambda: TransactionQuery(person_id=person(), cursor=deep_cursor(), limit=50), args.samples)
+            failed = _time(store, lambda: TransactionQuery(person_id=person(), status="failed", limit=20), args.samples)
+            print(f"{label:<6} size={size:>9,}  first-page {first}  deep-page {deep}  status-filter {failed}")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
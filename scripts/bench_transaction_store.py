@@ -0,0 +1,75 @@
+"""Memory benchmark for transaction retention.
+
+Creates ``--count`` transactions through ``PaymentService`` + ``MockPaymentProvider`` and
+reports traced memory per created transaction for:
+
+- ``unbounded``: the previous layout, plain dicts in both service and provider
+- ``bounded``: one shared ``InMemoryTransactionStore`` capped at ``--max-entries``
+
+Usage: PYTHONPATH=src python scripts/bench_transaction_store.py [--count 1000000] [--max-entries 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from payments.models import PaymentInstrument, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+from payments.store import InMemoryTransactionStore
+
+
+class _DictStore(dict):
+    """Mimics the previous unbounded dict storage."""
+
+    def get(self, txn_id, default=None):
+        return dict.get(self, txn_id, default)
+
+    def put(self, txn):
+        self[txn.txn_id] = txn
+
+    def close(self):
+        pass
+
+
+def _run(label: str, count: int, service: PaymentService) -> None:
+    service.register_instrument(PaymentInstrument(instrument_id="inst", person_id="p", provider="mock", kind="card"))
+    request = PaymentTransactionRequest(person_id="p", instrument_id="inst", amount=1.0, authorization_context={})
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for _ in range(count):
+        service.create_transaction(request)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = len(service._transactions)
+    print(
+        f"{label:<10} retained={retained:<8} total={(current - base) / 2**20:8.1f} MiB"
+        f" peak={(peak - base) / 2**20:8.1f} MiB"
+        f" bytes/created-txn={(current - base) / count:7.0f}"
+        f" bytes/retained-txn={(current - base) / max(retained, 1):7.0f}"
+        f" create={count / elapsed:,.0f}/s (traced)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--max-entries", type=int, default=100_000)
+    args = parser.parse_args()
+
+    provider = MockPaymentProvider(store=_DictStore())
+    _run("unbounded", args.count, PaymentService(provider, store=_DictStore()))
+    del provider
+    gc.collect()
+
+    store = InMemoryTransactionStore(args.max_entries)
+    _run("bounded", args.count, PaymentService(MockPaymentProvider(store=store), store=store))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Charge latency and vault traffic with and without the vault token cache.
+
+Registers ``--instruments`` instruments against a stub storage service that adds
+``--latency-ms`` per request, then makes ``--charges`` charges spread over them from
+``--threads`` threads, once with the cache disabled and once enabled. Reports charges/sec,
+vault GETs and the cache hit rate.
+
+Usage: PYTHONPATH=src python scripts/bench_vault_cache.py [--charges 5000] [--instruments 50] [--threads 16] [--latency-ms 5]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from payments.clients import ServiceHttpClient
+from payments.models import PaymentInstrument, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+from payments.vault import VaultTokenCache
+from stub_services import StubServer
+
+
+def _vault_handler(method, path, body):
+    if method == "GET":
+        return 200, {"value": {"token": "tok_bench"}}
+    return 201, {"ok": True}
+
+
+def _run(label: str, args, cache: VaultTokenCache | None) -> None:
+    with StubServer(_vault_handler, latency=args.latency_ms / 1000.0) as storage:
+        service = PaymentService(
+            MockPaymentProvider(), storage_client=ServiceHttpClient(storage.host, storage.port), vault_cache=cache
+        )
+        for n in range(args.instruments):
+            service.register_instrument(
+                PaymentInstrument(instrument_id=f"i{n}", person_id="p1", provider="mock", kind="card"), token="tok_bench"
+            )
+        writes = storage.requests
+
+        def charge(n: int) -> None:
+            service.create_transaction(
+                PaymentTransactionRequest(person_id="p1", instrument_id=f"i{n % args.instruments}", amount=1.0)
+            )
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(charge, range(args.charges)))
+        elapsed = time.perf_counter() - start
+        service.close()
+        hit_rate = f"{cache.stats()['hit_rate']:.1%}" if cache is not None else "-"
+        print(
+            f"{label:<9} {args.charges / elapsed:>8.0f} charges/s  "
+            f"vault GETs={storage.requests - writes:<6} hit rate={hit_rate}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--charges", type=int, default=5000)
+    parser.add_argument("--instruments", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    _run("uncached", args, None)
+    _run("cached", args, VaultTokenCache(max_entries=1000, ttl=60))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Webhook acknowledgement latency for a burst, inline processing vs the ingestion queue.
+
+Posts ``--deliveries`` webhooks back to back to the in-process app, with event emission
+going to a local stub that adds ``--latency-ms`` per request (standing in for the
+downstream work a PSP delivery triggers). Reports ack latency percentiles and, for the
+queue, how long the workers took to drain the burst.
+
+Usage: PYTHONPATH=src python scripts/bench_webhooks.py [--deliveries 2000] [--latency-ms 5] [--workers 4]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.clients import ServiceHttpClient
+from stub_services import StubServer, percentile
+
+
+def _run(label: str, deliveries: int, latency: float, queued: bool, workers: int) -> None:
+    os.environ["UNISON_PAYMENTS_WEBHOOK_QUEUE"] = "true" if queued else "false"
+    os.environ["UNISON_PAYMENTS_WEBHOOK_WORKERS"] = str(workers)
+    with StubServer(latency=latency) as events:
+        event_client = ServiceHttpClient(events.host, events.port)
+        app = FastAPI()
+        service = register_payment_routes(app, event_client=event_client)
+        client = TestClient(app)
+        latencies = []
+        start = time.perf_counter()
+        for n in range(deliveries):
+            body = {"event_id": f"evt_{n}", "txn_id": f"txn_{n % 500}", "person_id": "p1", "amount": 1, "status": "succeeded"}
+            sent = time.perf_counter()
+            client.post("/payments/webhooks/mock", json=body).raise_for_status()
+            latencies.append(time.perf_counter() - sent)
+        acked = time.perf_counter() - start
+        if service.webhooks is not None:
+            service.webhooks.join()
+        drained = time.perf_counter() - start
+        service.close()
+        event_client.close()
+    print(
+        f"{label:<7} ack p50={percentile(latencies, 50) * 1000:6.2f}ms p99={percentile(latencies, 99) * 1000:6.2f}ms"
+        f"  burst acked in {acked:.2f}s, processed in {drained:.2f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deliveries", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    latency = args.latency_ms / 1000.0
+    _run("inline", args.deliveries, latency, queued=False, workers=args.workers)
+    _run("queued", args.deliveries, latency, queued=True, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
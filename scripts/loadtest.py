@@ -0,0 +1,302 @@
+"""Load test for the payments API with JSON results and a baseline regression gate.
+
+Starts local stub context, storage and event services that add ``--stub-latency-ms`` per
+request, points the app at them and drives one or more scenarios from ``--concurrency``
+threads:
+
+  register  POST /payments/instruments
+  charge    POST /payments/transactions against pre-registered instruments
+  status    GET /payments/transactions/{txn_id} for pre-created transactions
+  webhook   POST /payments/webhooks/mock with distinct event ids
+  mixed     50% charge, 30% status, 10% register, 10% webhook
+
+``--target inprocess`` (default) runs ``payments.server:app`` through TestClient,
+``--target uvicorn`` spawns uvicorn on a free port with the stub services configured,
+and ``--target http://host:port`` drives an already running server (which must have
+been started with auth disabled, or pass ``--token``).
+
+Results (requests, errors, throughput, p50/p95/p99 in ms per scenario) are printed and
+written as JSON to ``--output``. With ``--baseline`` the run is compared to a stored
+result and exits 1 when any scenario's throughput drops, or p95/p99 rise, by more than
+``--threshold`` (a fraction). ``scripts/loadtest_baseline.json`` is the in-process
+baseline for the default settings; refresh it with ``--save-baseline`` on the machine
+that runs the gate.
+
+Usage: PYTHONPATH=src python scripts/loadtest.py [--target inprocess|uvicorn|URL] [--scenario all] [--requests 2000] [--concurrency 8] [--stub-latency-ms 2] [--output results.json] [--baseline scripts/loadtest_baseline.json] [--threshold 0.25]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+import httpx
+
+from stub_services import ContextStub, StorageStub, StubServer, percentile
+
+SCENARIOS = ("register", "charge", "status", "webhook", "mixed")
+_MIXED = (("charge", 50), ("status", 30), ("register", 10), ("webhook", 10))
+# Baseline metrics checked by the gate: (key, True when higher is better).
+_GATED = (("throughput_rps", True), ("p95_ms", False), ("p99_ms", False))
+
+
+class Workload:
+    """Request generators for each scenario, sharing a pool of instruments and transactions."""
+
+    def __init__(self, client: Any, *, instruments: int = 50, seed: int = 7):
+        self.client = client
+        self.instruments: List[Dict[str, Any]] = []
+        self.txn_ids: List[str] = []
+        self._random = random.Random(seed)
+        for _ in range(instruments):
+            self.register(0)
+        for n in range(instruments * 4):
+            self.charge(n)
+
+    def register(self, n: int) -> int:
+        body = {"person_id": f"load-{n % 20}", "provider": "mock", "kind": "card", "last4": "4242", "token": "tok_load"}
+        resp = self.client.post("/payments/instruments", json=body)
+        if resp.status_code == 200:
+            self.instruments.append(resp.json()["instrument"])
+        return resp.status_code
+
+    def charge(self, n: int) -> int:
+        instrument = self.instruments[n % len(self.instruments)]
+        body = {
+            "person_id": instrument["person_id"],
+            "instrument_id": instrument["instrument_id"],
+            "amount": 1.23,
+            "currency": "USD",
+            "authorization_context": {"approved": True},
+        }
+        resp = self.client.post("/payments/transactions", json=body)
+        if resp.status_code == 200:
+            self.txn_ids.append(resp.json()["transaction"]["txn_id"])
+        return resp.status_code
+
+    def status(self, n: int) -> int:
+        return self.client.get(f"/payments/transactions/{self.txn_ids[n % len(self.txn_ids)]}").status_code
+
+    def webhook(self, n: int) -> int:
+        body = {
+            "event_id": f"evt_{uuid.uuid4().hex}",
+            "txn_id": self.txn_ids[n % len(self.txn_ids)],
+            "person_id": "load-0",
+            "amount": 1.23,
+            "status": "succeeded",
+        }
+        return self.client.post("/payments/webhooks/mock", json=body).status_code
+
+    def mixed_plan(self, count: int) -> List[str]:
+        names = [name for name, _ in _MIXED]
+        weights = [weight for _, weight in _MIXED]
+        return self._random.choices(names, weights, k=count)
+
+    def operation(self, scenario: str, count: int) -> Callable[[int], int]:
+        if scenario != "mixed":
+            return getattr(self, scenario)
+        plan = self.mixed_plan(count)
+        return lambda n: getattr(self, plan[n])(n)
+
+
+def run_scenario(workload: Workload, scenario: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    operation = workload.operation(scenario, requests)
+    latencies: List[float] = [0.0] * requests
+    errors = 0
+
+    def one(n: int) -> bool:
+        start = time.perf_counter()
+        try:
+            ok = operation(n) < 400
+        except Exception:  # noqa: BLE001 - transport failures count as errors
+            ok = False
+        latencies[n] = time.perf_counter() - start
+        return ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        for ok in pool.map(one, range(requests)):
+            errors += not ok
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` beyond ``threshold`` (e.g. 0.25 = 25%)."""
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(scenario)
+        if reference is None:
+            continue
+        if current["errors"] > reference.get("errors", 0):
+            regressions.append(f"{scenario}: errors {reference.get('errors', 0)} -> {current['errors']}")
+        for key, higher_is_better in _GATED:
+            old, new = reference.get(key), current.get(key)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > threshold:
+                regressions.append(f"{scenario}: {key} {old} -> {new} ({change:+.0%} worse, limit {threshold:.0%})")
+    return regressions
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def _stub_environment(latency: float) -> Iterator[Dict[str, str]]:
+    """Start the stub services and yield the environment that points the app at them."""
+    with ExitStack() as stack:
+        context = stack.enter_context(StubServer(ContextStub(), latency=latency))
+        storage = stack.enter_context(StubServer(StorageStub(), latency=latency))
+        events = stack.enter_context(StubServer(latency=latency))
+        yield {
+            "DISABLE_AUTH_FOR_TESTS": "true",
+            "UNISON_CONTEXT_HOST": context.host,
+            "UNISON_CONTEXT_PORT": context.port,
+            "UNISON_STORAGE_HOST": storage.host,
+            "UNISON_STORAGE_PORT": storage.port,
+            "UNISON_CONTEXT_GRAPH_HOST": events.host,
+            "UNISON_CONTEXT_GRAPH_PORT": events.port,
+        }
+
+
+@contextmanager
+def _inprocess_client(env: Dict[str, str]) -> Iterator[Any]:
+    os.environ.update(env)
+    from fastapi.testclient import TestClient
+
+    from payments.server import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@contextmanager
+def _uvicorn_client(env: Dict[str, str], token: str | None) -> Iterator[Any]:
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", "payments.server:app", "--port", str(port), "--log-level", "warning"]
+    # The server logs every outbound stub call at INFO; keep it out of the report.
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        with _http_client(f"http://127.0.0.1:{port}", token) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if process.poll() is not None or time.monotonic() > deadline:
+                    log.seek(0)
+                    sys.stderr.write(log.read().decode("utf-8", "replace")[-4000:])
+                    raise SystemExit("uvicorn did not start")
+                time.sleep(0.1)
+            yield client
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        log.close()
+
+
+@contextmanager
+def _http_client(url: str, token: str | None) -> Iterator[Any]:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+    with httpx.Client(base_url=url, headers=headers, limits=limits, timeout=30) as client:
+        yield client
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    with _stub_environment(args.stub_latency_ms / 1000.0) as env:
+        if args.target == "inprocess":
+            session = _inprocess_client(env)
+        elif args.target == "uvicorn":
+            session = _uvicorn_client(env, args.token)
+        else:
+            session = _http_client(args.target, args.token)
+        with session as client:
+            workload = Workload(client, instruments=args.instruments)
+            run_scenario(workload, "mixed", args.warmup, args.concurrency)
+            results = {
+                scenario: run_scenario(workload, scenario, args.requests, args.concurrency) for scenario in scenarios
+            }
+    return {
+        "target": args.target if args.target in ("inprocess", "uvicorn") else "url",
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "stub_latency_ms": args.stub_latency_ms,
+            "instruments": args.instruments,
+        },
+        "scenarios": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="inprocess", help="inprocess, uvicorn or a base URL")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stub-latency-ms", type=float, default=2.0)
+    parser.add_argument("--instruments", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--token", help="bearer token for a server with auth enabled")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="fail when results regress against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression fraction")
+    parser.add_argument("--save-baseline", help="write the results as a new baseline file")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("payments").setLevel(logging.WARNING)
+
+    results = run(args)
+    for scenario, stats in results["scenarios"].items():
+        print(
+            f"{scenario:<9} {stats['throughput_rps']:>8.0f} req/s  p50={stats['p50_ms']:7.2f}ms "
+            f"p95={stats['p95_ms']:7.2f}ms p99={stats['p99_ms']:7.2f}ms  errors={stats['errors']}"
+        )
+    document = json.dumps(results, indent=2) + "\n"
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(document)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        if baseline.get("config") != results["config"]:
+            print(f"warning: baseline config {baseline.get('config')} differs from this run", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
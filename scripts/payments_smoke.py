@@ -12,7 +12,11 @@ from payments.server import app  # noqa: E402
 
 
 def run_smoke():
-    client = TestClient(app)
+    with TestClient(app) as client:
+        _run_flow(client)
+
+
+def _run_flow(client):
     inst_payload = {
         "person_id": "smoke-person",
         "provider": "mock",
@@ -0,0 +1,138 @@
+"""Local stub HTTP services used by the benchmark scripts.
+
+Each stub runs a keep-alive capable ``ThreadingHTTPServer`` on an ephemeral port in a
+background thread. Responses are tiny JSON documents so that the measured cost is
+dominated by the client side, optionally padded with a fixed latency.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Tuple
+
+from payments.profile import merge_patch
+
+Handler = Callable[[str, str, bytes], Tuple[int, Dict[str, Any] | None]]
+
+
+def _default_handler(method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any] | None]:
+    return 200, {"ok": True}
+
+
+class StubServer:
+    """Background HTTP server that dispatches every request to ``handler``."""
+
+    def __init__(self, handler: Handler = _default_handler, *, latency: float = 0.0):
+        self.handler = handler
+        self.latency = latency
+        self.requests = 0
+        stub = self
+
+        class _RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, payload = stub.handler(self.command, self.path, body)
+                data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):  # noqa: A002 - signature from BaseHTTPRequestHandler
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _RequestHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def host(self) -> str:
+        return "127.0.0.1"
+
+    @property
+    def port(self) -> str:
+        return str(self._server.server_address[1])
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class ContextStub:
+    """Handler for a stub context service holding person profiles in memory.
+
+    ``GET``/``POST /profile/{person_id}`` read and replace a whole profile, ``PATCH``
+    applies an RFC 7386 merge patch. Counts request and response bytes so benchmarks can
+    compare write paths.
+    """
+
+    def __init__(self):
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any] | None]:
+        if not path.startswith("/profile/"):
+            return 404, None
+        person_id = path[len("/profile/"):]
+        with self._lock:
+            self.bytes_in += len(body)
+            if method == "GET":
+                if person_id not in self.profiles:
+                    return 404, None
+                response = {"profile": self.profiles[person_id]}
+                self.bytes_out += len(json.dumps(response))
+                return 200, response
+            document = json.loads(body) if body else {}
+            if method == "POST":
+                self.profiles[person_id] = document.get("profile") or {}
+            elif method == "PATCH":
+                self.profiles[person_id] = merge_patch(self.profiles.get(person_id), document.get("profile") or {})
+            else:
+                return 405, None
+            return 200, {"ok": True}
+
+
+class StorageStub:
+    """Handler for a stub storage service: ``PUT`` stores a document, ``GET`` returns it."""
+
+    def __init__(self):
+        self.documents: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any] | None]:
+        with self._lock:
+            if method == "GET":
+                if path not in self.documents:
+                    return 404, None
+                return 200, self.documents[path]
+            if method in ("PUT", "POST"):
+                self.documents[path] = json.loads(body) if body else {}
+                return 201, {"ok": True}
+            return 405, None
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
@@ -1,17 +1,42 @@
 from __future__ import annotations
 
 import os
+import socket
+import json
 import uuid
 import logging
-from typing import Dict, Any
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, Any, List, Type
 
-from fastapi import APIRouter, Body, HTTPException, Request, Depends
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Body, HTTPException, Request, Depends, Query, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, model_validator
 
-from .models import PaymentInstrument, PaymentTransactionRequest
-from .providers import MockPaymentProvider, PaymentProvider
+from .models import PaymentInstrument, PaymentTransaction, PaymentTransactionRequest
+from .money import to_minor
+from .providers import AsyncPaymentProvider, PaymentProvider
+from .registry import ProviderBusy, ProviderRegistry, ProviderTimeout, UnknownProvider
+from .resilience import CircuitOpen
+from .responses import PaymentJSONResponse
 from .service import PaymentService
 from .logging import PaymentEventLogger
+from .outbox import Outbox
+from .poller import StatusPoller
+from .profile import ProfilePatcher
+from .export import SETTLE_SECONDS, Export
+from .reconcile import detect_format, read_settlement, reconcile
+from .reporting import FXRates, snapshot, totals
+from .idempotency import IdempotencyCache, IdempotencyConflict, IdempotencyInProgress
+from .ledger import SQLiteLedger
+from .limits import LimitExceeded, LimitsEngine
+from .store import InMemoryTransactionStore, TransactionQuery, decode_cursor, encode_cursor, iter_query
+from .telemetry import Telemetry, configure_tracing, timed_route_class
+from .vault import VaultTokenCache
+from .webhooks import WebhookQueue, WebhookQueueFull
 from .auth import auth_dependency
 
 _logger = logging.getLogger(__name__)
@@ -19,6 +44,21 @@ _logger = logging.getLogger(__name__)
 _require_payment_approval = os.getenv("UNISON_REQUIRE_PAYMENT_APPROVAL", "true").lower() in {"1", "true", "yes", "on"}
 
 
+_bulk_max_items = int(os.getenv("UNISON_PAYMENTS_BULK_MAX_ITEMS", "10000"))
+# Uploaded settlement files are spooled to disk beyond this many bytes.
+_reconcile_spool_bytes = 8 * 1024 * 1024
+
+
+def _build_outbox_from_env() -> Outbox | None:
+    if os.getenv("UNISON_PAYMENTS_OUTBOX", "false").lower() not in {"1", "true", "yes", "on"}:
+        return None
+    return Outbox(
+        max_size=int(os.getenv("UNISON_PAYMENTS_OUTBOX_SIZE", "10000")),
+        policy=os.getenv("UNISON_PAYMENTS_OUTBOX_POLICY", "drop_oldest"),
+        max_attempts=int(os.getenv("UNISON_PAYMENTS_OUTBOX_MAX_ATTEMPTS", "5")),
+    ).start()
+
+
 class PaymentInstrumentPayload(BaseModel):
     person_id: str = Field(..., description="Owner of the instrument")
     provider: str = Field(default="mock", description="Payment provider ID")
@@ -35,97 +75,624 @@ class PaymentInstrumentPayload(BaseModel):
 class PaymentTransactionPayload(BaseModel):
     person_id: str
     instrument_id: str
-    amount: float
+    amount: Decimal = Field(..., gt=0, description="Major units, at most the currency's minor-unit precision")
     currency: str = "USD"
     description: str | None = None
     counterparty: str | None = None
     authorization_context: Dict[str, Any] = Field(default_factory=dict)
     surface: str | None = Field(default=None, description="Requesting surface (voice, text, app)")
 
+    @model_validator(mode="after")
+    def _exact_amount(self) -> "PaymentTransactionPayload":
+        to_minor(self.amount, self.currency, strict=True)
+        return self
+
+
+def _instrument_from_payload(payload: PaymentInstrumentPayload) -> PaymentInstrument:
+    return PaymentInstrument(
+        instrument_id=str(uuid.uuid4()),
+        person_id=payload.person_id,
+        provider=payload.provider,
+        kind=payload.kind,
+        display_name=payload.display_name,
+        brand=payload.brand,
+        last4=payload.last4,
+        expiry=payload.expiry,
+        handle=payload.handle,
+        metadata=payload.metadata,
+    )
+
+
+def _transaction_request_from_payload(payload: PaymentTransactionPayload) -> PaymentTransactionRequest:
+    return PaymentTransactionRequest(
+        person_id=payload.person_id,
+        instrument_id=payload.instrument_id,
+        amount=payload.amount,
+        currency=payload.currency,
+        description=payload.description,
+        counterparty=payload.counterparty,
+        authorization_context=payload.authorization_context,
+        surface=payload.surface,
+    )
+
+
+class _ItemRejected(Exception):
+    """A bulk item the API rejected before it reached the service."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
 
-def register_payment_routes(app, *, context_client=None, storage_client=None) -> PaymentService:
-    api = APIRouter()
-    provider_name = os.getenv("UNISON_PAYMENTS_PROVIDER", "mock")
-    provider: PaymentProvider
-    if provider_name == "mock":
-        provider = MockPaymentProvider()
+async def _read_bulk_items(request: Request, model: Type[BaseModel]) -> List[BaseModel | Exception]:
+    """Parse a JSON array (or ``{"items": [...]}``) or an NDJSON body into per-item models.
+
+    Items that fail validation are returned as :class:`_ItemRejected` so one bad row does
+    not reject the whole batch.
+    """
+    raw = await request.body()
+    if "ndjson" in request.headers.get("content-type", ""):
+        rows: List[Any] = [line for line in raw.splitlines() if line.strip()]
     else:
-        _logger.warning("Unsupported provider '%s'; defaulting to mock. Extend providers to add real PSPs.", provider_name)
-        provider = MockPaymentProvider()
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="body must be a JSON array or NDJSON")
+        rows = body.get("items") if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="body must be a JSON array or NDJSON")
+    if len(rows) > _bulk_max_items:
+        raise HTTPException(status_code=413, detail=f"at most {_bulk_max_items} items per request")
+    items: List[BaseModel | Exception] = []
+    for row in rows:
+        try:
+            items.append(model.model_validate_json(row) if isinstance(row, bytes) else model.model_validate(row))
+        except ValidationError as exc:
+            items.append(_ItemRejected("invalid_item", f"invalid item: {exc.errors(include_url=False)[0].get('msg')}"))
+    return items
+
+
+def _bulk_error(error: Exception) -> Dict[str, Any]:
+    """A stable ``code`` and client-safe ``error`` message for a failed bulk item.
+
+    Only messages this service writes itself are passed through; provider and library
+    exception text is not, and unexpected errors are logged and reported generically.
+    """
+    if isinstance(error, _ItemRejected):
+        return {"code": error.code, "error": str(error)}
+    if isinstance(error, LimitExceeded):
+        return {"code": "limit_exceeded", "error": str(error), "retry_after": max(1, round(error.retry_after))}
+    if isinstance(error, UnknownProvider):
+        return {"code": "unknown_provider", "error": str(error)}
+    if isinstance(error, CircuitOpen):
+        return {
+            "code": "provider_unavailable",
+            "error": "provider is unavailable; retry later",
+            "retry_after": max(1, round(error.retry_after)),
+        }
+    if isinstance(error, ProviderBusy):
+        return {"code": "provider_busy", "error": "provider is at its concurrency limit; retry later"}
+    if isinstance(error, ProviderTimeout):
+        return {"code": "provider_timeout", "error": "provider timed out"}
+    if isinstance(error, LookupError):
+        return {"code": "not_found", "error": "not found"}
+    if isinstance(error, ValueError):
+        return {"code": "invalid_request", "error": "invalid request"}
+    _logger.error("bulk item failed", exc_info=error)
+    return {"code": "internal_error", "error": "internal error"}
+
+
+def _bulk_response(results: List[Any], key: str, **render: Any) -> PaymentJSONResponse:
+    rendered = []
+    for index, result in enumerate(results):
+        if isinstance(result, Exception):
+            rendered.append({"index": index, "ok": False, **_bulk_error(result)})
+        else:
+            rendered.append({"index": index, "ok": True, key: result.to_dict(**render)})
+    failed = sum(1 for item in rendered if not item["ok"])
+    return PaymentJSONResponse({"ok": True, "succeeded": len(rendered) - failed, "failed": failed, "results": rendered})
+
+
+_INCLUDE_AUTHORIZATION_CONTEXT = Query(
+    default=False, description="Echo the transaction's authorization_context (omitted by default)"
+)
+
+
+def _transaction_response(txn: PaymentTransaction, include_authorization_context: bool = False) -> PaymentJSONResponse:
+    return PaymentJSONResponse(
+        {"ok": True, "transaction": txn.to_dict(include_authorization_context=include_authorization_context)}
+    )
+
+
+@contextmanager
+def _provider_errors():
+    try:
+        yield
+    except UnknownProvider as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except LimitExceeded as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+    except CircuitOpen as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+    except ProviderBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except ProviderTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+
+
+def _build_provider_registry_from_env(store: InMemoryTransactionStore) -> ProviderRegistry:
+    registry = ProviderRegistry.from_env(store=store)
+    try:
+        registry.get()
+    except UnknownProvider:
+        _logger.warning(
+            "Unsupported provider '%s'; defaulting to mock. Extend providers to add real PSPs.", registry.default
+        )
+        registry.default = "mock"
+    return registry
+
+
+def _shared_state() -> bool:
+    """True when several server processes share state through the ledger (``UNISON_PAYMENTS_WORKERS`` > 1)."""
+    return int(os.getenv("UNISON_PAYMENTS_WORKERS", "1")) > 1
+
+
+def _build_ledger_from_env() -> SQLiteLedger | None:
+    path = os.getenv("UNISON_PAYMENTS_LEDGER_PATH")
+    if not path:
+        if _shared_state():
+            raise RuntimeError("UNISON_PAYMENTS_WORKERS > 1 requires UNISON_PAYMENTS_LEDGER_PATH (shared state)")
+        return None
+    # Shared: commit every write so a status lookup on another worker sees it right away.
+    return SQLiteLedger(
+        path,
+        group_commit_size=int(os.getenv("UNISON_PAYMENTS_LEDGER_GROUP_COMMIT", "1" if _shared_state() else "256")),
+        group_commit_interval=float(os.getenv("UNISON_PAYMENTS_LEDGER_COMMIT_MS", "10")) / 1000.0,
+    )
+
+
+def _build_store_from_env(ledger: SQLiteLedger | None) -> InMemoryTransactionStore:
+    # Shared: pending transactions change on whichever worker gets the webhook, so don't cache them.
+    # Unset TTLs take the store's defaults, which never age out transactions without a ledger.
+    pending_ttl = os.getenv("UNISON_PAYMENTS_TXN_PENDING_TTL", "0" if _shared_state() else "")
+    terminal_ttl = os.getenv("UNISON_PAYMENTS_TXN_TERMINAL_TTL", "")
+    return InMemoryTransactionStore(
+        int(os.getenv("UNISON_PAYMENTS_TXN_CACHE_SIZE", "100000")),
+        pending_ttl=float(pending_ttl) if pending_ttl else None,
+        terminal_ttl=float(terminal_ttl) if terminal_ttl else None,
+        backend=ledger,
+    )
+
+
+def _build_idempotency_from_env(service: PaymentService, ledger: SQLiteLedger | None) -> IdempotencyCache:
+    # Persisted rows hold only the txn_id; replays re-read the transaction from the store.
+    return IdempotencyCache(
+        int(os.getenv("UNISON_PAYMENTS_IDEMPOTENCY_SIZE", "10000")),
+        float(os.getenv("UNISON_PAYMENTS_IDEMPOTENCY_TTL", "86400")),
+        wait_timeout=float(os.getenv("UNISON_PAYMENTS_IDEMPOTENCY_WAIT", "10")),
+        backend=ledger,
+        encode=lambda txn: txn.txn_id,
+        decode=service.get_transaction_status,
+        claim_ttl=float(os.getenv("UNISON_PAYMENTS_IDEMPOTENCY_CLAIM_TTL", "60")),
+    )
+
+
+def _build_event_logger_from_env(event_client) -> PaymentEventLogger:
+    batch_size = int(os.getenv("UNISON_PAYMENTS_EVENT_BATCH_SIZE", "0"))
+    return PaymentEventLogger(
+        event_client,
+        batch_size=batch_size or None,
+        flush_interval=float(os.getenv("UNISON_PAYMENTS_EVENT_FLUSH_MS", "50")) / 1000.0,
+    )
+
+
+def _build_vault_cache_from_env() -> VaultTokenCache | None:
+    size = int(os.getenv("UNISON_PAYMENTS_VAULT_CACHE_SIZE", "0"))
+    if size <= 0:
+        return None
+    return VaultTokenCache(size, float(os.getenv("UNISON_PAYMENTS_VAULT_CACHE_TTL", "60")))
+
+
+def _build_profile_patcher_from_env(context_client) -> ProfilePatcher | None:
+    if context_client is None:
+        return None
+    if os.getenv("UNISON_PAYMENTS_PROFILE_PATCH", "false").lower() not in {"1", "true", "yes", "on"}:
+        return None
+    window = float(os.getenv("UNISON_PAYMENTS_PROFILE_PATCH_WINDOW_MS", "0")) / 1000.0
+    return ProfilePatcher(context_client, window=window)
+
+
+def _build_telemetry_from_env() -> Telemetry:
+    metrics = os.getenv("UNISON_PAYMENTS_METRICS", "true").lower() in {"1", "true", "yes", "on"}
+    tracer = None
+    if os.getenv("UNISON_PAYMENTS_TRACING", "false").lower() in {"1", "true", "yes", "on"}:
+        tracer = configure_tracing()
+    return Telemetry(metrics=metrics, tracer=tracer)
+
+
+def _build_limits_from_env(ledger: SQLiteLedger | None) -> LimitsEngine | None:
+    spec = os.getenv("UNISON_PAYMENTS_LIMITS", "").strip()
+    if not spec:
+        return None
+    limits = LimitsEngine.from_spec(spec, buckets=int(os.getenv("UNISON_PAYMENTS_LIMIT_BUCKETS", "10")))
+    if ledger is not None:
+        # Counters are in memory; reload the current windows so a restart doesn't reset them.
+        query = TransactionQuery(created_after=time.time() - limits.max_window, limit=1000)
+        counted = limits.rebuild(iter_query(ledger, query))
+        _logger.info("rebuilt spend limits from %d ledger transactions", counted)
+    return limits
+
+
+def _build_fx_rates_from_env() -> FXRates | None:
+    spec = os.getenv("UNISON_PAYMENTS_FX_RATES", "").strip()
+    if not spec:
+        return None
+    return FXRates.from_spec(spec, base=os.getenv("UNISON_PAYMENTS_FX_BASE", "USD"))
+
+
+def _build_webhook_queue_from_env(service: PaymentService, ledger: SQLiteLedger | None) -> WebhookQueue | None:
+    if os.getenv("UNISON_PAYMENTS_WEBHOOK_QUEUE", "false").lower() not in {"1", "true", "yes", "on"}:
+        return None
+    return WebhookQueue(
+        service.process_webhook,
+        workers=int(os.getenv("UNISON_PAYMENTS_WEBHOOK_WORKERS", "4")),
+        max_pending=int(os.getenv("UNISON_PAYMENTS_WEBHOOK_QUEUE_SIZE", "10000")),
+        backend=ledger,
+        replay_lease=60.0 if _shared_state() else None,
+    ).start()
+
+
+def _build_status_poller_from_env(service: PaymentService, ledger: SQLiteLedger | None) -> StatusPoller | None:
+    if os.getenv("UNISON_PAYMENTS_STATUS_POLL", "false").lower() not in {"1", "true", "yes", "on"}:
+        return None
+    poller = StatusPoller(
+        service.poll_statuses,
+        workers=int(os.getenv("UNISON_PAYMENTS_STATUS_POLL_WORKERS", "4")),
+        batch_size=int(os.getenv("UNISON_PAYMENTS_STATUS_POLL_BATCH", "100")),
+        base_delay=float(os.getenv("UNISON_PAYMENTS_STATUS_POLL_BASE_DELAY", "30")),
+        max_delay=float(os.getenv("UNISON_PAYMENTS_STATUS_POLL_MAX_DELAY", "900")),
+        max_attempts=int(os.getenv("UNISON_PAYMENTS_STATUS_POLL_MAX_ATTEMPTS", "30")),
+    )
+    # Each worker polls what it created; after a restart one worker picks up the rest.
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    if ledger is not None and (not _shared_state() or ledger.claim_lease("status_poll_rebuild", owner, 60.0)):
+        lookback = float(os.getenv("UNISON_PAYMENTS_STATUS_POLL_LOOKBACK", "86400"))
+        tracked = 0
+        for status in ("created", "authorized"):
+            query = TransactionQuery(status=status, created_after=time.time() - lookback, limit=1000)
+            for txn in iter_query(ledger, query):
+                tracked += poller.track(txn.txn_id, txn.provider or service.providers.default)
+        _logger.info("resumed status polling for %d pending ledger transactions", tracked)
+    return poller.start()
+
+
+def build_payment_service(
+    *,
+    context_client=None,
+    storage_client=None,
+    event_client=None,
+    async_storage_client=None,
+    provider: ProviderRegistry | PaymentProvider | AsyncPaymentProvider | None = None,
+    ledger: SQLiteLedger | None = None,
+) -> PaymentService:
+    """A payment service with the ledger, store, providers and opt-in components the environment configures.
+
+    ``ledger`` is used instead of the one ``UNISON_PAYMENTS_LEDGER_PATH`` names, e.g. by
+    the reconciliation command line.
+    """
+    telemetry = _build_telemetry_from_env()
+    if ledger is None:
+        ledger = _build_ledger_from_env()
+    store = _build_store_from_env(ledger)
+    if provider is None:
+        provider = _build_provider_registry_from_env(store)
 
     service = PaymentService(
         provider,
-        PaymentEventLogger(),
+        _build_event_logger_from_env(event_client),
+        context_client=context_client,
+        storage_client=storage_client,
+        outbox=_build_outbox_from_env(),
+        store=store,
+        ledger=ledger,
+        async_storage_client=async_storage_client,
+        vault_cache=_build_vault_cache_from_env(),
+        profile_patcher=_build_profile_patcher_from_env(context_client),
+        telemetry=telemetry,
+        limits=_build_limits_from_env(ledger),
+    )
+    service.idempotency = _build_idempotency_from_env(service, ledger)
+    service.webhooks = _build_webhook_queue_from_env(service, ledger)
+    service.poller = _build_status_poller_from_env(service, ledger)
+    return service
+
+
+async def _service(request: Request) -> PaymentService:
+    """The app's payment service, ``app.state.service``.
+
+    The server's lifespan startup sets it. When the app runs without lifespan events, the
+    first request starts it through ``app.state.start_service`` (see ``payments.server``),
+    in the threadpool, since opening and migrating the ledger and starting workers block.
+    """
+    state = request.app.state
+    service = getattr(state, "service", None)
+    if service is None:
+        start = getattr(state, "start_service", None)
+        if start is None:
+            raise HTTPException(status_code=503, detail="payment service is not running")
+        _logger.warning("payment service started by the first request; without lifespan events it is not drained on shutdown")
+        service = await run_in_threadpool(start)
+    return service
+
+
+def _request_telemetry(request: Request) -> Telemetry | None:
+    service = getattr(request.app.state, "service", None)
+    return service.telemetry if service is not None and service.telemetry.metrics else None
+
+
+def register_payment_routes(
+    app,
+    *,
+    context_client=None,
+    storage_client=None,
+    event_client=None,
+    async_storage_client=None,
+    provider: ProviderRegistry | PaymentProvider | AsyncPaymentProvider | None = None,
+) -> PaymentService:
+    """Build a payment service (see :func:`build_payment_service`) as ``app.state.service`` and add the routes."""
+    service = build_payment_service(
         context_client=context_client,
         storage_client=storage_client,
+        event_client=event_client,
+        async_storage_client=async_storage_client,
+        provider=provider,
     )
+    app.state.service = service
+    add_payment_routes(app)
+    return service
+
+
+def add_payment_routes(app) -> None:
+    """Add the payment API to ``app``; handlers use whichever service ``app.state.service`` holds."""
+    api = APIRouter(route_class=timed_route_class(_request_telemetry))
+    fx_rates = _build_fx_rates_from_env()
 
     @api.post("/payments/instruments")
-    def register_instrument(
+    async def register_instrument(
         payload: PaymentInstrumentPayload = Body(...),
         current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
     ):
-        instrument = PaymentInstrument(
-            instrument_id=str(uuid.uuid4()),
-            person_id=payload.person_id,
-            provider=payload.provider,
-            kind=payload.kind,
-            display_name=payload.display_name,
-            brand=payload.brand,
-            last4=payload.last4,
-            expiry=payload.expiry,
-            handle=payload.handle,
-            metadata=payload.metadata,
-        )
-        registered = service.register_instrument(instrument, token=payload.token)
-        return {"ok": True, "instrument": registered.__dict__}
+        with _provider_errors():
+            registered = await service.aregister_instrument(_instrument_from_payload(payload), token=payload.token)
+        return PaymentJSONResponse({"ok": True, "instrument": registered.to_dict()})
+
+    @api.post("/payments/instruments/bulk")
+    async def register_instruments_bulk(
+        request: Request,
+        current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
+    ):
+        items = await _read_bulk_items(request, PaymentInstrumentPayload)
+        valid = [
+            (i, _instrument_from_payload(item), item.token) for i, item in enumerate(items) if not isinstance(item, Exception)
+        ]
+        registered = await run_in_threadpool(service.register_instruments_batch, [(inst, token) for _, inst, token in valid])
+        results: List[Any] = list(items)
+        for (index, _, _), result in zip(valid, registered):
+            results[index] = result
+        return _bulk_response(results, "instrument")
 
     @api.post("/payments/transactions")
-    def create_transaction(
+    async def create_transaction(
         payload: PaymentTransactionPayload = Body(...),
+        idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=255),
+        include_authorization_context: bool = _INCLUDE_AUTHORIZATION_CONTEXT,
         current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
     ):
         if _require_payment_approval and not payload.authorization_context.get("approved"):
             raise HTTPException(status_code=403, detail="payment requires explicit approval")
-        request = PaymentTransactionRequest(
-            person_id=payload.person_id,
-            instrument_id=payload.instrument_id,
-            amount=payload.amount,
-            currency=payload.currency,
-            description=payload.description,
-            counterparty=payload.counterparty,
-            authorization_context=payload.authorization_context,
-            surface=payload.surface,
+        request = _transaction_request_from_payload(payload)
+        if not idempotency_key:
+            with _provider_errors():
+                txn = await service.acreate_transaction(request)
+            return _transaction_response(txn, include_authorization_context)
+        try:
+            with _provider_errors():
+                txn, replayed = await service.acreate_transaction_idempotent(request, idempotency_key)
+        except IdempotencyConflict:
+            raise HTTPException(status_code=422, detail="idempotency key reused with a different payload")
+        except IdempotencyInProgress:
+            raise HTTPException(status_code=409, detail="a request with this idempotency key is in progress")
+        response = _transaction_response(txn, include_authorization_context)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    @api.post("/payments/transactions/bulk")
+    async def create_transactions_bulk(
+        request: Request,
+        include_authorization_context: bool = _INCLUDE_AUTHORIZATION_CONTEXT,
+        current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
+    ):
+        items: List[Any] = await _read_bulk_items(request, PaymentTransactionPayload)
+        for index, item in enumerate(items):
+            if not isinstance(item, Exception) and _require_payment_approval and not item.authorization_context.get("approved"):
+                items[index] = _ItemRejected("approval_required", "payment requires explicit approval")
+        valid = [(i, _transaction_request_from_payload(item)) for i, item in enumerate(items) if not isinstance(item, Exception)]
+        created = await run_in_threadpool(service.create_transactions_batch, [req for _, req in valid])
+        results: List[Any] = list(items)
+        for (index, _), result in zip(valid, created):
+            results[index] = result
+        return _bulk_response(results, "transaction", include_authorization_context=include_authorization_context)
+
+    @api.get("/payments/transactions")
+    async def list_transactions(
+        person_id: str | None = None,
+        instrument_id: str | None = None,
+        status: str | None = None,
+        counterparty: str | None = None,
+        created_after: float | None = Query(default=None, description="Inclusive lower bound (epoch seconds)"),
+        created_before: float | None = Query(default=None, description="Exclusive upper bound (epoch seconds)"),
+        limit: int = Query(default=50, ge=1, le=500),
+        cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+        include_authorization_context: bool = _INCLUDE_AUTHORIZATION_CONTEXT,
+        current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
+    ):
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        query = TransactionQuery(
+            person_id=person_id,
+            instrument_id=instrument_id,
+            status=status,
+            counterparty=counterparty,
+            created_after=created_after,
+            created_before=created_before,
+            cursor=after,
+            limit=limit,
         )
-        txn = service.create_transaction(request)
-        return {"ok": True, "transaction": txn.__dict__}
+        # Ledger-backed listings hit SQLite; keep them off the event loop.
+        if service.ledger is not None:
+            txns = await run_in_threadpool(service.list_transactions, query)
+        else:
+            txns = service.list_transactions(query)
+        next_cursor = encode_cursor(txns[-1]) if len(txns) == limit else None
+        rendered = [txn.to_dict(include_authorization_context=include_authorization_context) for txn in txns]
+        return PaymentJSONResponse({"ok": True, "transactions": rendered, "next_cursor": next_cursor})
 
     @api.get("/payments/transactions/{txn_id}")
-    def get_transaction_status(txn_id: str, current_user: Dict[str, Any] = Depends(auth_dependency)):
+    async def get_transaction_status(
+        txn_id: str,
+        include_authorization_context: bool = _INCLUDE_AUTHORIZATION_CONTEXT,
+        current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
+    ):
         try:
-            txn = service.get_transaction_status(txn_id)
+            with _provider_errors():
+                txn = await service.aget_transaction_status(txn_id)
         except KeyError:
             raise HTTPException(status_code=404, detail="transaction not found")
-        return {"ok": True, "transaction": txn.__dict__}
+        return _transaction_response(txn, include_authorization_context)
+
+    @api.post("/payments/reconciliations")
+    async def reconcile_settlement(
+        request: Request,
+        format: str | None = Query(default=None, pattern="^(csv|ndjson)$", description="Default: from Content-Type"),
+        fix: bool = Query(default=False, description="Apply settled statuses to mismatched transactions"),
+        created_after: float | None = Query(default=None, description="Report stored transactions missing from the file"),
+        created_before: float | None = None,
+        max_discrepancies: int = Query(default=100, ge=0, le=10000),
+        current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
+    ):
+        fmt = format or detect_format(request.headers.get("content-type"))
+        with tempfile.SpooledTemporaryFile(max_size=_reconcile_spool_bytes) as spool:
+            async for chunk in request.stream():
+                spool.write(chunk)
+            spool.seek(0)
+            try:
+                report = await run_in_threadpool(
+                    reconcile,
+                    read_settlement(spool, fmt),
+                    service.transactions,
+                    apply=service.apply_settled_status if fix else None,
+                    created_after=created_after,
+                    created_before=created_before,
+                    max_discrepancies=max_discrepancies,
+                )
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc))
+        return PaymentJSONResponse({"ok": True, **report})
+
+    @api.get("/payments/reports/totals")
+    async def transaction_totals(
+        group_by: str = Query(default="person,currency,day", description="Comma-separated: person, currency, day"),
+        convert_to: str | None = Query(default=None, description="Convert with UNISON_PAYMENTS_FX_RATES and combine currencies"),
+        status: str = Query(default="succeeded", description="Comma-separated statuses to include"),
+        created_after: float | None = None,
+        created_before: float | None = None,
+        current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
+    ):
+        by = [key.strip() for key in group_by.split(",") if key.strip()]
+
+        def report():
+            columns = snapshot(
+                service.transactions,
+                created_after=created_after,
+                created_before=created_before,
+                statuses=[value.strip() for value in status.split(",")],
+            )
+            return len(columns), totals(columns, by=by, convert_to=convert_to, fx=fx_rates)
+
+        try:
+            count, groups = await run_in_threadpool(report)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return PaymentJSONResponse({"ok": True, "transactions": count, "groups": groups})
+
+    @api.get("/payments/exports/transactions")
+    async def export_transactions(
+        format: str = Query(default="csv", pattern="^(csv|arrow|parquet)$", description="arrow and parquet need pyarrow"),
+        since: str | None = Query(default=None, description="X-Export-Watermark of the previous export"),
+        until: float | None = Query(default=None, description=f"Created before (default: {SETTLE_SECONDS:g}s ago)"),
+        current_user: Dict[str, Any] = Depends(auth_dependency),
+        service: PaymentService = Depends(_service),
+    ):
+        try:
+            export = Export(
+                service.transactions, format, since=since, until=time.time() - SETTLE_SECONDS if until is None else until
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        headers = {
+            "X-Export-Watermark": export.watermark,
+            "Content-Disposition": f'attachment; filename="transactions.{format}"',
+        }
+        return StreamingResponse(iter(export), media_type=export.content_type, headers=headers)
 
     @api.post("/payments/webhooks/{provider}")
-    async def provider_webhook(provider: str, request: Request):
+    async def provider_webhook(provider: str, request: Request, service: PaymentService = Depends(_service)):
         raw_body = await request.body()
         try:
-            payload = await request.json()
-        except Exception:
-            payload = {}
-        if isinstance(payload, dict):
-            payload["_raw_body"] = raw_body.decode("utf-8")
+            payload = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="webhook body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail="webhook body must be a JSON object")
         try:
-            txn = service.process_webhook(provider, payload)
+            service.verify_webhook(provider, raw_body, request.headers)
         except ValueError:
             raise HTTPException(status_code=404, detail="unknown provider")
+        except PermissionError:
+            raise HTTPException(status_code=401, detail="webhook verification failed")
+        if service.webhooks is not None:
+            try:
+                if service.ledger is not None:
+                    accepted = await run_in_threadpool(service.webhooks.submit, provider, raw_body, payload)
+                else:
+                    accepted = service.webhooks.submit(provider, raw_body, payload)
+            except WebhookQueueFull:
+                raise HTTPException(status_code=503, detail="webhook queue is full; retry later")
+            return PaymentJSONResponse({"ok": True, "accepted": True, "duplicate": not accepted}, status_code=202)
+        try:
+            with _provider_errors():
+                txn = await service.aprocess_webhook(provider, payload)
+        except HTTPException:
+            raise
         except KeyError:
             raise HTTPException(status_code=404, detail="transaction not found")
         except Exception as exc:
             raise HTTPException(status_code=400, detail=f"webhook processing failed: {exc}")
-        return {"ok": True, "transaction": txn.__dict__}
+        return _transaction_response(txn)
+
+    @api.get("/metrics")
+    def metrics(service: PaymentService = Depends(_service)):
+        return PlainTextResponse(service.telemetry.render(service.stats()), media_type="text/plain; version=0.0.4")
 
     app.include_router(api)
-    return service
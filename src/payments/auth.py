@@ -1,34 +1,103 @@
 from __future__ import annotations
 
+import copy
+import hashlib
 import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Dict, Any
-from fastapi import Depends, HTTPException, Header
-from jose import jwt, JWTError
+from fastapi import HTTPException, Header
+
+from .cache import TTLCache
+
+_TEST_USER = {"username": "test-user", "roles": ["admin"], "baton": "test-baton"}
+
+
+@dataclass(frozen=True)
+class AuthSettings:
+    secret: str | None
+    issuer: str
+    audience: str
+    disabled: bool = False
+    cache_size: int = 10000
+    cache_ttl: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "AuthSettings":
+        return cls(
+            secret=os.getenv("UNISON_AUTH_SECRET"),
+            issuer=os.getenv("UNISON_AUTH_ISSUER", "unison-auth"),
+            audience=os.getenv("UNISON_AUTH_AUDIENCE", "unison-internal"),
+            disabled=os.getenv("DISABLE_AUTH_FOR_TESTS", "false").lower() == "true",
+            cache_size=int(os.getenv("UNISON_AUTH_CACHE_SIZE", "10000")),
+            cache_ttl=float(os.getenv("UNISON_AUTH_CACHE_TTL", "300")),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_auth_settings() -> AuthSettings:
+    """Auth settings, read from the environment once per process."""
+    return AuthSettings.from_env()
+
+
+@lru_cache(maxsize=1)
+def get_token_cache() -> TTLCache[Dict[str, Any]] | None:
+    settings = get_auth_settings()
+    if settings.cache_size <= 0:
+        return None
+    return TTLCache(settings.cache_size, settings.cache_ttl)
+
+
+def reset_auth_settings() -> None:
+    """Drop cached settings and verified tokens (e.g. after changing env vars in tests)."""
+    get_auth_settings.cache_clear()
+    get_token_cache.cache_clear()
 
 
 def _decode_token(token: str) -> Dict[str, Any]:
-    secret = os.getenv("UNISON_AUTH_SECRET")
-    issuer = os.getenv("UNISON_AUTH_ISSUER", "unison-auth")
-    audience = os.getenv("UNISON_AUTH_AUDIENCE", "unison-internal")
-    if not secret:
+    settings = get_auth_settings()
+    if not settings.secret:
         raise RuntimeError("UNISON_AUTH_SECRET is required for payments auth")
-    return jwt.decode(token, secret, algorithms=["HS256"], issuer=issuer, audience=audience)
+    # jose loads its cryptography backends on import; only pay for that once a token arrives.
+    from jose import jwt
+
+    return jwt.decode(token, settings.secret, algorithms=["HS256"], issuer=settings.issuer, audience=settings.audience)
+
 
+def verify_token(token: str) -> Dict[str, Any]:
+    """Verify ``token``, reusing claims of recently verified tokens.
 
-def auth_dependency():
-    if os.getenv("DISABLE_AUTH_FOR_TESTS", "false").lower() == "true":
-        async def _test_user():
-            return {"username": "test-user", "roles": ["admin"], "baton": "test-baton"}
+    Only successfully verified tokens are cached, keyed by a SHA-256 of the token, and
+    never beyond the token's own ``exp``. Callers always get their own copy of the claims,
+    so a handler that changes them does not affect later requests with the same token.
+    """
+    cache = get_token_cache()
+    if cache is None:
+        return _decode_token(token)
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = cache.get(key)
+    if claims is not None:
+        return copy.deepcopy(claims)
+    claims = _decode_token(token)
+    ttl = cache.ttl
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(ttl, exp - time.time())
+    if ttl > 0:
+        cache.set(key, claims, ttl)
+    return copy.deepcopy(claims)
 
-        return _test_user
 
-    async def _dep(authorization: str = Header(None)):
-        if not authorization or not isinstance(authorization, str) or not authorization.startswith("Bearer "):
-            raise HTTPException(status_code=401, detail="missing or invalid auth")
-        token = authorization.split(" ", 1)[1]
-        try:
-            return _decode_token(token)
-        except JWTError:
-            raise HTTPException(status_code=401, detail="invalid token")
+async def auth_dependency(authorization: str | None = Header(None)) -> Dict[str, Any]:
+    if get_auth_settings().disabled:
+        return dict(_TEST_USER)
+    if not authorization or not isinstance(authorization, str) or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="missing or invalid auth")
+    token = authorization.split(" ", 1)[1]
+    from jose import JWTError
 
-    return _dep
+    try:
+        return verify_token(token)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="invalid token")
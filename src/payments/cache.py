@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterator, Tuple, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe LRU cache with per-entry expiry.
+
+    Entries are evicted when the cache exceeds ``max_entries`` (least recently used first)
+    or once their TTL elapses. Expired entries are dropped lazily on access and
+    opportunistically from the LRU head on every write, so memory stays bounded by
+    ``max_entries`` without a background sweeper.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 300.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        on_evict: Callable[[Hashable, V], None] | None = None,
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        # Called with the cache lock held whenever an entry is evicted or expires.
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> V | Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                self._evicted(key, value)
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: Hashable, default: Any = None) -> V | Any:
+        """Return a live value without touching recency or hit/miss counters."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[1] <= self._clock():
+                return default
+            return entry[0]
+
+    def set(self, key: Hashable, value: V, ttl: float | None = None) -> None:
+        now = self._clock()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            self._trim(now)
+
+    def pop(self, key: Hashable, default: Any = None) -> V | Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry; returns how many were removed."""
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items() if expires_at <= now]
+            for key in expired:
+                value, _ = self._data.pop(key)
+                self._evicted(key, value)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def values(self) -> Iterator[V]:
+        """Snapshot of live values in LRU order (oldest first); does not touch recency."""
+        now = self._clock()
+        with self._lock:
+            snapshot = [value for value, expires_at in self._data.values() if expires_at > now]
+        return iter(snapshot)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and entry[1] > self._clock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _trim(self, now: float) -> None:
+        # Expire a couple of entries from the LRU head per write, then enforce the size bound.
+        for _ in range(2):
+            if not self._data:
+                break
+            key, (value, expires_at) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            del self._data[key]
+            self.expirations += 1
+            self._evicted(key, value)
+        while len(self._data) > self.max_entries:
+            key, (value, _) = self._data.popitem(last=False)
+            self.evictions += 1
+            self._evicted(key, value)
+
+    def _evicted(self, key: Hashable, value: V) -> None:
+        if self._on_evict is not None:
+            self._on_evict(key, value)
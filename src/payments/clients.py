@@ -1,8 +1,15 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
-import httpx
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
 
 JsonDict = Dict[str, Any]
 HttpResult = Tuple[bool, int, Optional[JsonDict]]
@@ -12,32 +19,232 @@ def _merge_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
     return dict(headers or {})
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class ClientSettings:
+    """Connection pool and timeout settings shared by the sync and async clients.
+
+    Each client talks to a single host, so the pool limits are effectively per-host limits.
+    """
+
+    connect_timeout: float = 2.0
+    read_timeout: float = 2.0
+    write_timeout: float = 2.0
+    pool_timeout: float = 2.0
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "ClientSettings":
+        defaults = cls()
+        return cls(
+            connect_timeout=_env_float(f"{prefix}_CONNECT_TIMEOUT", defaults.connect_timeout),
+            read_timeout=_env_float(f"{prefix}_READ_TIMEOUT", defaults.read_timeout),
+            write_timeout=_env_float(f"{prefix}_WRITE_TIMEOUT", defaults.write_timeout),
+            pool_timeout=_env_float(f"{prefix}_POOL_TIMEOUT", defaults.pool_timeout),
+            max_connections=_env_int(f"{prefix}_MAX_CONNECTIONS", defaults.max_connections),
+            max_keepalive_connections=_env_int(f"{prefix}_MAX_KEEPALIVE", defaults.max_keepalive_connections),
+            keepalive_expiry=_env_float(f"{prefix}_KEEPALIVE_EXPIRY", defaults.keepalive_expiry),
+            http2=os.getenv(f"{prefix}_HTTP2", "false").lower() in {"1", "true", "yes", "on"},
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        import httpx  # deferred: httpx and its transports cost ~150ms at import
+
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout,
+        )
+
+    def limits(self) -> httpx.Limits:
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+def _result(resp: httpx.Response) -> HttpResult:
+    ok = resp.status_code < 300
+    body = resp.json() if resp.content else None
+    return ok, resp.status_code, body
+
+
 @dataclass
-class ServiceHttpClient:
+class _ServiceClientBase:
     host: str
     port: str
+    settings: ClientSettings = field(default_factory=ClientSettings)
+    transport: Any = field(default=None, repr=False)
 
-    def get(self, path: str, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+    @classmethod
+    def from_env(cls, prefix: str):
+        """A client for ``{prefix}_HOST``/``{prefix}_PORT`` with pool settings from the same
+        prefix, or None when either is unset."""
+        host = os.getenv(f"{prefix}_HOST")
+        port = os.getenv(f"{prefix}_PORT")
+        if not host or not port:
+            return None
+        return cls(host, port, settings=ClientSettings.from_env(prefix))
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        http2 = self.settings.http2
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested for %s but 'h2' is not installed; using HTTP/1.1", self.base_url)
+            http2 = False
+        kwargs: Dict[str, Any] = {
+            "base_url": self.base_url,
+            "timeout": self.settings.timeout(),
+            "limits": self.settings.limits(),
+            "http2": http2,
+        }
+        if self.transport is not None:
+            kwargs["transport"] = self.transport
+        return kwargs
+
+
+@dataclass
+class ServiceHttpClient(_ServiceClientBase):
+    """Pooled keep-alive client for a sibling Unison service.
+
+    The underlying ``httpx.Client`` is created on first use and reused for every request
+    until ``close()`` is called (normally from the server's shutdown hook).
+    """
+
+    _client: httpx.Client | None = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _get_client(self) -> httpx.Client:
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+
+                    self._client = httpx.Client(**self._client_kwargs())
+                client = self._client
+        return client
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        payload: JsonDict | None = None,
+        content: bytes | None = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> HttpResult:
         merged_headers = _merge_headers(headers)
         try:
-            resp = httpx.get(f"http://{self.host}:{self.port}{path}", headers=merged_headers or None, timeout=2.0)
-            ok = resp.status_code < 300
-            body = resp.json() if resp.content else None
-            return ok, resp.status_code, body
+            resp = self._get_client().request(
+                method, path, headers=merged_headers or None, json=payload, content=content
+            )
+            return _result(resp)
         except Exception:
             return False, 500, None
 
+    def get(self, path: str, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return self._request("GET", path, headers=headers)
+
     def post(self, path: str, payload: JsonDict, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return self._request("POST", path, payload=payload, headers=headers)
+
+    def put(self, path: str, payload: JsonDict, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return self._request("PUT", path, payload=payload, headers=headers)
+
+    def patch(self, path: str, payload: JsonDict, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return self._request("PATCH", path, payload=payload, headers=headers)
+
+    def post_content(self, path: str, content: bytes, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        """POST a pre-encoded body (e.g. gzip-compressed NDJSON); set Content-Type via ``headers``."""
+        return self._request("POST", path, content=content, headers=headers)
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+
+@dataclass
+class AsyncServiceHttpClient(_ServiceClientBase):
+    """Async counterpart of :class:`ServiceHttpClient` backed by a pooled ``httpx.AsyncClient``."""
+
+    _client: httpx.AsyncClient | None = field(default=None, init=False, repr=False)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Creation never awaits, so there is no interleaving to guard against on a single loop.
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(**self._client_kwargs())
+        return self._client
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        payload: JsonDict | None = None,
+        content: bytes | None = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> HttpResult:
         merged_headers = _merge_headers(headers)
         try:
-            resp = httpx.post(
-                f"http://{self.host}:{self.port}{path}",
-                headers=merged_headers or None,
-                json=payload,
-                timeout=2.0,
+            resp = await self._get_client().request(
+                method, path, headers=merged_headers or None, json=payload, content=content
             )
-            ok = resp.status_code < 300
-            body = resp.json() if resp.content else None
-            return ok, resp.status_code, body
+            return _result(resp)
         except Exception:
             return False, 500, None
+
+    async def get(self, path: str, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return await self._request("GET", path, headers=headers)
+
+    async def post(self, path: str, payload: JsonDict, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return await self._request("POST", path, payload=payload, headers=headers)
+
+    async def put(self, path: str, payload: JsonDict, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return await self._request("PUT", path, payload=payload, headers=headers)
+
+    async def patch(self, path: str, payload: JsonDict, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return await self._request("PATCH", path, payload=payload, headers=headers)
+
+    async def post_content(self, path: str, content: bytes, *, headers: Optional[Dict[str, str]] = None) -> HttpResult:
+        return await self._request("POST", path, content=content, headers=headers)
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
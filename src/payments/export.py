@@ -0,0 +1,240 @@
+"""Stream the transaction ledger out as chunked columnar files.
+
+An :class:`Export` reads ``TransactionStore.export_rows`` oldest first from a
+``(created_at, txn_id)`` watermark and encodes every ``chunk_rows`` rows as one Arrow
+record batch, Parquet row group or block of CSV lines, yielding the bytes as it goes, so
+memory is bounded by the chunk size whatever the ledger size. Arrow IPC and Parquet need
+``pyarrow``; CSV is always available. Run ``python -m payments.export --help`` for the
+command line; the API streams the same bytes from ``GET /payments/exports/transactions``.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Iterator, List, Sequence, Tuple
+
+from .store import EXPORT_COLUMNS, TransactionStore, decode_cursor, encode_position
+
+# pyarrow is optional (without it only CSV is available) and imported by the first Arrow
+# or Parquet export rather than at startup: it costs ~100ms to import.
+use_pyarrow = importlib.util.find_spec("pyarrow") is not None
+pa: Any = None
+pq: Any = None
+
+DEFAULT_CHUNK_ROWS = 50_000
+# Default ``until`` lag: rows newer than this may still be committing on another worker.
+SETTLE_SECONDS = 5.0
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def available_formats() -> Tuple[str, ...]:
+    return ("csv", "arrow", "parquet") if use_pyarrow else ("csv",)
+
+
+def _load_pyarrow() -> None:
+    global pa, pq
+    if pa is None:
+        import pyarrow
+        import pyarrow.parquet
+
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def _schema() -> "pa.Schema":
+    string = pa.string()
+    types = {"amount_minor": pa.int64(), "created_at": pa.float64()}
+    return pa.schema([(name, types.get(name, string)) for name in EXPORT_COLUMNS])
+
+
+class _Spool:
+    """Write-only file object that hands what was written since the last ``drain``."""
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class _CSVWriter:
+    def __init__(self, sink: _Spool):
+        self._sink = sink
+        self._text = io.StringIO()
+        self._csv = csv.writer(self._text, lineterminator="\n")
+        self._csv.writerow(EXPORT_COLUMNS)
+
+    def write_chunk(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._csv.writerows(rows)
+        self._sink.write(self._text.getvalue().encode("utf-8"))
+        self._text.seek(0)
+        self._text.truncate()
+
+    def close(self) -> None:
+        if self._text.tell():
+            self._sink.write(self._text.getvalue().encode("utf-8"))
+
+
+class _ArrowWriter:
+    def __init__(self, sink: _Spool, fmt: str):
+        _load_pyarrow()
+        self._schema = _schema()
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(sink, self._schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_stream(sink, self._schema)
+
+    def write_chunk(self, rows: List[Tuple[Any, ...]]) -> None:
+        columns = [pa.array(column, type=field.type) for column, field in zip(zip(*rows), self._schema)]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self._schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class Export:
+    """One export run over transactions after ``since`` and created before ``until``.
+
+    Iterating yields the encoded file in pieces. Afterwards ``rows`` is the number of rows
+    written and ``watermark`` the opaque position to pass as ``since`` next time:
+    ``until`` when one was given (so rows created right at the boundary are not lost),
+    otherwise the last exported row. Rows are picked by ``created_at`` only; status
+    changes to rows already exported are not exported again.
+    """
+
+    def __init__(
+        self,
+        store: TransactionStore,
+        fmt: str = "csv",
+        *,
+        since: str | None = None,
+        until: float | None = None,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    ):
+        if fmt not in available_formats():
+            raise ValueError(f"unsupported export format {fmt!r} (available: {', '.join(available_formats())})")
+        self.store = store
+        self.format = fmt
+        self.content_type = CONTENT_TYPES[fmt]
+        self._after = decode_cursor(since) if since else None
+        self.until = until
+        self.chunk_rows = max(1, chunk_rows)
+        self.rows = 0
+        self._last = self._after
+
+    @property
+    def watermark(self) -> str | None:
+        position = self._last
+        if self.until is not None and (position is None or position < (self.until, "")):
+            position = (self.until, "")
+        return encode_position(*position) if position is not None else None
+
+    def __iter__(self) -> Iterator[bytes]:
+        sink = _Spool()
+        writer = _CSVWriter(sink) if self.format == "csv" else _ArrowWriter(sink, self.format)
+        chunk: List[Tuple[Any, ...]] = []
+        for row in self.store.export_rows(self._after, self.until):
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                yield self._flush(writer, sink, chunk)
+                chunk = []
+        if chunk:
+            yield self._flush(writer, sink, chunk)
+        writer.close()
+        tail = sink.drain()
+        if tail:
+            yield tail
+
+    def _flush(self, writer: Any, sink: _Spool, chunk: List[Tuple[Any, ...]]) -> bytes:
+        writer.write_chunk(chunk)
+        self.rows += len(chunk)
+        last = chunk[-1]
+        self._last = (last[-1], last[0])
+        return sink.drain()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m payments.export",
+        description="Export ledger transactions created after a watermark as a CSV, Arrow IPC or Parquet file. "
+        "The next watermark is printed to stderr and, with --watermark-file, stored for the next run.",
+    )
+    parser.add_argument("output", help="output file, or - for stdout")
+    parser.add_argument("--format", choices=("csv", "arrow", "parquet"), help="default: from the file name, else csv")
+    parser.add_argument("--ledger", default=os.getenv("UNISON_PAYMENTS_LEDGER_PATH"), help="SQLite ledger path")
+    parser.add_argument("--since", help="watermark from a previous export (default: from --watermark-file, else all)")
+    parser.add_argument(
+        "--until", type=float, help=f"only transactions created before this epoch time (default: {SETTLE_SECONDS:g}s ago)"
+    )
+    parser.add_argument("--watermark-file", help="read the starting watermark from here and store the next one")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+    if not args.ledger:
+        parser.error("--ledger or UNISON_PAYMENTS_LEDGER_PATH is required")
+    fmt = args.format or _format_from_name(args.output)
+    since = args.since
+    if since is None and args.watermark_file and os.path.exists(args.watermark_file):
+        with open(args.watermark_file, encoding="utf-8") as handle:
+            since = handle.read().strip() or None
+
+    from .ledger import SQLiteLedger
+
+    ledger = SQLiteLedger(args.ledger)
+    try:
+        until = time.time() - SETTLE_SECONDS if args.until is None else args.until
+        export = Export(ledger, fmt, since=since, until=until, chunk_rows=args.chunk_rows)
+        output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            for data in export:
+                output.write(data)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+    except ValueError as exc:
+        parser.error(str(exc))
+    finally:
+        ledger.close()
+    if args.watermark_file:
+        with open(args.watermark_file, "w", encoding="utf-8") as handle:
+            handle.write(export.watermark + "\n")
+    print(json.dumps({"rows": export.rows, "watermark": export.watermark}), file=sys.stderr)
+    return 0
+
+
+def _format_from_name(name: str) -> str:
+    extension = os.path.splitext(name)[1].lower()
+    return {".arrow": "arrow", ".arrows": "arrow", ".parquet": "parquet"}.get(extension, "csv")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
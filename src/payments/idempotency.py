@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Generic, Tuple, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from .cache import TTLCache
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used with a different request payload."""
+
+
+class IdempotencyInProgress(Exception):
+    """A request with the same key is still running after ``wait_timeout``, or its stored
+    result can't be loaded yet; either way the caller should retry later."""
+
+
+def request_hash(payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class _InFlight:
+    request_hash: str
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class IdempotencyCache(Generic[T]):
+    """Deduplicates retried requests that carry the same idempotency key.
+
+    The first caller for a key runs the operation; concurrent callers with the same key
+    wait for it instead of running it again, and later callers get the completed result
+    replayed from a bounded TTL cache. Reusing a key with a different payload raises
+    :class:`IdempotencyConflict`. Failed operations are not cached, so a retry after an
+    error runs again.
+
+    ``backend`` optionally persists completed keys (see ``SQLiteLedger``) so replays
+    survive restarts and work across workers; results are stored there via ``encode``
+    and restored with ``decode``. The first caller also claims the key in ``backend``
+    before running, so a duplicate arriving at another worker waits for that result
+    rather than running the operation again. A claim left by a process that died
+    mid-request is taken over after ``claim_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 86400.0,
+        *,
+        wait_timeout: float = 10.0,
+        backend: Any | None = None,
+        encode: Callable[[T], str] | None = None,
+        decode: Callable[[str], T] | None = None,
+        claim_ttl: float = 60.0,
+    ):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.claim_ttl = claim_ttl
+        self.backend = backend
+        self._encode = encode
+        self._decode = decode
+        self._completed: TTLCache[Tuple[str, T]] = TTLCache(max_entries, ttl)
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.conflicts = 0
+        self.shared_replays = 0
+        self._stored = 0
+
+    @property
+    def _shared(self) -> bool:
+        return self.backend is not None and self._encode is not None and self._decode is not None
+
+    def execute(self, key: str, req_hash: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Run ``fn`` once per key; returns ``(result, replayed)``."""
+        while True:
+            completed, running, owner = self._claim(key, req_hash)
+            if completed is not None:
+                return completed[1], True
+            if owner:
+                break
+            if not running.done.wait(self.wait_timeout):
+                raise IdempotencyInProgress(key)
+            # Loop: either replay the finished result or, if it failed, take over.
+        try:
+            stored = self._claim_stored(key, req_hash)
+        except BaseException:
+            self._abandon(key, running)
+            raise
+        if stored is not None:
+            self._complete(key, req_hash, running, stored[1], store=False)
+            return stored[1], True
+        try:
+            result = fn()
+        except BaseException:
+            self._abandon(key, running, release=True)
+            raise
+        self._complete(key, req_hash, running, result)
+        return result, False
+
+    async def aexecute(self, key: str, req_hash: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Async :meth:`execute`; sync and async callers share keys and in-flight state."""
+        while True:
+            completed, running, owner = self._claim(key, req_hash)
+            if completed is not None:
+                return completed[1], True
+            if owner:
+                break
+            # Duplicates are rare, so parking a worker thread on the event is acceptable.
+            if not await run_in_threadpool(running.done.wait, self.wait_timeout):
+                raise IdempotencyInProgress(key)
+        try:
+            # Backend reads and the decoder (a status lookup) can block; keep them off the loop.
+            if self.backend is not None:
+                stored = await run_in_threadpool(self._claim_stored, key, req_hash)
+            else:
+                stored = self._claim_stored(key, req_hash)
+        except BaseException:
+            self._abandon(key, running)
+            raise
+        if stored is not None:
+            self._complete(key, req_hash, running, stored[1], store=False)
+            return stored[1], True
+        try:
+            result = await fn()
+        except BaseException:
+            self._abandon(key, running, release=True)
+            raise
+        self._complete(key, req_hash, running, result, store=False)
+        if self.backend is not None:
+            await run_in_threadpool(self._store, key, req_hash, result)
+        return result, False
+
+    def _claim(self, key: str, req_hash: str) -> Tuple[Tuple[str, T] | None, _InFlight | None, bool]:
+        """Returns ``(completed, running, owner)`` from memory only; the owner must then call
+        :meth:`_claim_stored` (outside the lock) before running the operation."""
+        with self._lock:
+            completed = self._completed.get(key)
+            if completed is not None:
+                self._check(completed[0], req_hash)
+                self.hits += 1
+                return completed, None, False
+            running = self._in_flight.get(key)
+            if running is None:
+                running = self._in_flight[key] = _InFlight(req_hash)
+                return None, running, True
+            self._check(running.request_hash, req_hash)
+            self.waits += 1
+            return None, running, False
+
+    def _claim_stored(self, key: str, req_hash: str) -> Tuple[str, T] | None:
+        """A result ``backend`` already holds for ``key``, else ``None`` once the key is claimed there.
+
+        Runs in the in-process owner without ``_lock`` held, since it reads SQLite and the
+        decoder may call the provider; duplicates in this process wait on the owner meanwhile.
+        """
+        completed = self._load(key)
+        if completed is None and self._shared:
+            completed = self._claim_shared(key, req_hash)
+        with self._lock:
+            if completed is None:
+                self.misses += 1
+            else:
+                self._check(completed[0], req_hash)
+                self.hits += 1
+        return completed
+
+    def _claim_shared(self, key: str, req_hash: str) -> Tuple[str, T] | None:
+        """Claim ``key`` in ``backend``; returns a result another process completed instead.
+
+        Waits up to ``wait_timeout`` while another process holds the claim.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.01
+        while True:
+            now = time.time()
+            row = self.backend.claim_idempotency_key(
+                key, req_hash, stale_before=now - self.claim_ttl, expired_before=now - self.ttl
+            )
+            if row is None:
+                return None
+            stored_hash, encoded = row
+            with self._lock:
+                self._check(stored_hash, req_hash)
+            if encoded:
+                value = self._decode_stored(key, encoded)
+                self.shared_replays += 1
+                return stored_hash, value
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress(key)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    def _abandon(self, key: str, running: _InFlight, release: bool = False) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+        running.done.set()
+        if release and self._shared:
+            try:
+                self.backend.release_idempotency_key(key)
+            except Exception as exc:
+                # The claim goes stale after claim_ttl and is taken over then.
+                logger.warning("releasing idempotency claim %s failed: %s", key, exc)
+
+    def _complete(self, key: str, req_hash: str, running: _InFlight, result: T, store: bool = True) -> None:
+        with self._lock:
+            self._completed.set(key, (req_hash, result))
+            self._in_flight.pop(key, None)
+        running.done.set()
+        if store:
+            self._store(key, req_hash, result)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._completed),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "conflicts": self.conflicts,
+            "shared_replays": self.shared_replays,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _check(self, stored_hash: str, req_hash: str) -> None:
+        if stored_hash != req_hash:
+            self.conflicts += 1
+            raise IdempotencyConflict("idempotency key reused with a different payload")
+
+    def _load(self, key: str) -> Tuple[str, T] | None:
+        if self.backend is None or self._decode is None:
+            return None
+        row = self.backend.get_idempotency_key(key, max_age=self.ttl)
+        if row is None:
+            return None
+        stored_hash, encoded = row
+        return stored_hash, self._decode_stored(key, encoded)
+
+    def _decode_stored(self, key: str, encoded: str) -> T:
+        """Decode a stored result; one that can't be read right now is never treated as missing.
+
+        The key did complete, so running the operation again would repeat it (a second
+        charge); the caller gets :class:`IdempotencyInProgress` and can retry later.
+        """
+        try:
+            return self._decode(encoded)
+        except Exception as exc:
+            logger.warning("idempotency key %s: stored result could not be loaded: %r", key, exc)
+            raise IdempotencyInProgress(key) from exc
+
+    def _store(self, key: str, req_hash: str, result: T) -> None:
+        if self.backend is None or self._encode is None:
+            return
+        now = time.time()
+        self.backend.put_idempotency_key(key, req_hash, self._encode(result), now)
+        self._stored += 1
+        if self._stored % 1000 == 0:
+            self.backend.purge_idempotency_keys(now - self.ttl)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+from .models import PaymentTransaction
+
+IndexKey = Tuple[float, str]
+
+
+class TransactionIndex:
+    """Secondary indexes over in-memory transactions: person, instrument and time.
+
+    Each index is a list of ``(created_at, txn_id)`` keys kept in sorted order, so a
+    query bisects to its time range and walks newest-first without touching unrelated
+    transactions. Removals only drop the primary entry; stale keys are skipped during
+    scans and compacted away once they outnumber the live ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, str, str]] = {}
+        self._timeline: List[IndexKey] = []
+        self._by_person: Dict[str, List[IndexKey]] = {}
+        self._by_instrument: Dict[str, List[IndexKey]] = {}
+        self._stale = 0
+
+    def add(self, txn: PaymentTransaction) -> None:
+        entry = (txn.created_at, txn.person_id, txn.instrument_id)
+        key = (txn.created_at, txn.txn_id)
+        with self._lock:
+            previous = self._entries.get(txn.txn_id)
+            if previous == entry:
+                return
+            if previous is not None:
+                self._stale += 1
+            self._entries[txn.txn_id] = entry
+            _insert(self._timeline, key)
+            _insert(self._by_person.setdefault(txn.person_id, []), key)
+            _insert(self._by_instrument.setdefault(txn.instrument_id, []), key)
+
+    def discard(self, txn_id: str) -> None:
+        with self._lock:
+            if self._entries.pop(txn_id, None) is None:
+                return
+            self._stale += 1
+            if self._stale > max(1024, len(self._entries)):
+                self._compact()
+
+    def scan(
+        self,
+        *,
+        person_id: str | None = None,
+        instrument_id: str | None = None,
+        created_after: float | None = None,
+        created_before: float | None = None,
+        before: IndexKey | None = None,
+        limit: int = 100,
+    ) -> List[IndexKey]:
+        """Return up to ``limit`` live ``(created_at, txn_id)`` keys newest-first, strictly older than ``before``."""
+        with self._lock:
+            if instrument_id is not None:
+                keys = self._by_instrument.get(instrument_id, [])
+            elif person_id is not None:
+                keys = self._by_person.get(person_id, [])
+            else:
+                keys = self._timeline
+            upper = (created_before, "") if created_before is not None else None
+            if before is not None and (upper is None or before < upper):
+                upper = before
+            pos = bisect_left(keys, upper) if upper is not None else len(keys)
+            found: List[IndexKey] = []
+            while pos > 0 and len(found) < limit:
+                pos -= 1
+                created_at, txn_id = keys[pos]
+                if created_after is not None and created_at < created_after:
+                    break
+                entry = self._entries.get(txn_id)
+                if entry is None or entry[0] != created_at:
+                    continue
+                if person_id is not None and entry[1] != person_id:
+                    continue
+                if found and found[-1] == keys[pos]:
+                    # A re-added key can appear twice until the next compaction.
+                    continue
+                found.append(keys[pos])
+            return found
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _compact(self) -> None:
+        live = sorted((entry[0], txn_id, entry[1], entry[2]) for txn_id, entry in self._entries.items())
+        self._timeline = [(created_at, txn_id) for created_at, txn_id, _, _ in live]
+        self._by_person = {}
+        self._by_instrument = {}
+        for created_at, txn_id, person_id, instrument_id in live:
+            self._by_person.setdefault(person_id, []).append((created_at, txn_id))
+            self._by_instrument.setdefault(instrument_id, []).append((created_at, txn_id))
+        self._stale = 0
+
+
+def _insert(keys: List[IndexKey], key: IndexKey) -> None:
+    # Transactions mostly arrive in created_at order, so appending is the common case.
+    if not keys or keys[-1] < key:
+        keys.append(key)
+    else:
+        insort(keys, key)
@@ -0,0 +1,583 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from .models import PaymentInstrument, PaymentStatus, PaymentTransaction
+from .money import to_minor
+from .store import EXPORT_COLUMNS, TransactionQuery, TransactionStore, status_value
+from .webhooks import WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        txn_id TEXT PRIMARY KEY,
+        person_id TEXT NOT NULL,
+        instrument_id TEXT NOT NULL,
+        amount REAL NOT NULL,
+        amount_minor INTEGER,
+        currency TEXT NOT NULL,
+        status TEXT NOT NULL,
+        description TEXT,
+        counterparty TEXT,
+        provider TEXT,
+        authorization_context TEXT,
+        metadata TEXT,
+        created_at REAL NOT NULL
+    )
+    """,
+    # txn_id is the keyset tie-breaker, so it is part of every listing index.
+    "CREATE INDEX IF NOT EXISTS idx_transactions_person ON transactions (person_id, created_at, txn_id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_instrument ON transactions (instrument_id, created_at, txn_id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_created ON transactions (created_at, txn_id)",
+    """
+    CREATE TABLE IF NOT EXISTS instruments (
+        instrument_id TEXT PRIMARY KEY,
+        person_id TEXT NOT NULL,
+        provider TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        display_name TEXT,
+        brand TEXT,
+        last4 TEXT,
+        expiry TEXT,
+        handle TEXT,
+        metadata TEXT,
+        created_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_instruments_person ON instruments (person_id)",
+    """
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        idempotency_key TEXT PRIMARY KEY,
+        request_hash TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_idempotency_created ON idempotency_keys (created_at)",
+    """
+    CREATE TABLE IF NOT EXISTS webhook_events (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        provider TEXT NOT NULL,
+        event_id TEXT NOT NULL,
+        txn_id TEXT,
+        raw_body BLOB NOT NULL,
+        received_at REAL NOT NULL,
+        processed_at REAL
+    )
+    """,
+    # Dedupe index: a provider event is accepted once.
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_webhook_events_event ON webhook_events (provider, event_id)",
+    "CREATE INDEX IF NOT EXISTS idx_webhook_events_pending ON webhook_events (processed_at, seq)",
+    # Named leases shared by every process using the ledger (e.g. webhook replay at startup).
+    """
+    CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+)
+
+# ``amount_minor`` (integer minor units) is authoritative; ``amount`` is kept in major units
+# for anything reading the table directly and is written but never read back.
+_TXN_COLUMNS = (
+    "txn_id, person_id, instrument_id, amount_minor, currency, status, description, counterparty, "
+    "provider, authorization_context, metadata, created_at"
+)
+_INSTRUMENT_COLUMNS = (
+    "instrument_id, person_id, provider, kind, display_name, brand, last4, expiry, handle, metadata, created_at"
+)
+
+# Statements are module constants so sqlite3's statement cache prepares each one once per connection.
+_UPSERT_TXN = f"""
+    INSERT INTO transactions ({_TXN_COLUMNS}, amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(txn_id) DO UPDATE SET
+        status = excluded.status,
+        description = excluded.description,
+        counterparty = excluded.counterparty,
+        provider = excluded.provider,
+        metadata = excluded.metadata
+"""
+_SELECT_TXN = f"SELECT {_TXN_COLUMNS} FROM transactions WHERE txn_id = ?"
+# Oldest-first keyset page after a (created_at, txn_id) position. The row-value comparison
+# lets SQLite seek idx_transactions_created to the position instead of scanning up to it.
+_SCAN_PAGE = 10000
+_SCAN = f"""
+    SELECT {{columns}} FROM transactions
+    WHERE (created_at, txn_id) > (?, ?) AND created_at < ?
+    ORDER BY created_at, txn_id LIMIT {_SCAN_PAGE}
+"""
+_SCAN_AMOUNTS = _SCAN.format(columns="person_id, currency, status, amount_minor, created_at, txn_id")
+_EXPORT_ROWS = _SCAN.format(columns=", ".join(EXPORT_COLUMNS))
+# Stay well under SQLite's bound-parameter limit.
+_GET_MANY_CHUNK = 500
+_DELETE_TXN = "DELETE FROM transactions WHERE txn_id = ?"
+# amount_minor backfill (see SQLiteLedger._migrate), one transaction per chunk.
+_BACKFILL_CHUNK = 10000
+_SELECT_UNMIGRATED = f"SELECT txn_id, amount, currency FROM transactions WHERE amount_minor IS NULL LIMIT {_BACKFILL_CHUNK}"
+_BACKFILL_MINOR = "UPDATE transactions SET amount_minor = ? WHERE txn_id = ?"
+_UPSERT_INSTRUMENT = f"""
+    INSERT OR REPLACE INTO instruments ({_INSTRUMENT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SELECT_INSTRUMENT = f"SELECT {_INSTRUMENT_COLUMNS} FROM instruments WHERE instrument_id = ?"
+_UPSERT_IDEMPOTENCY = """
+    INSERT OR REPLACE INTO idempotency_keys (idempotency_key, request_hash, response, created_at) VALUES (?, ?, ?, ?)
+"""
+_SELECT_IDEMPOTENCY = (
+    "SELECT request_hash, response FROM idempotency_keys WHERE idempotency_key = ? AND created_at >= ? AND response != ''"
+)
+# A claim is a row with an empty response. It can be taken over once it is stale (its
+# owner died mid-request) or, like any row, once it has expired.
+_CLAIM_IDEMPOTENCY = """
+    INSERT INTO idempotency_keys (idempotency_key, request_hash, response, created_at) VALUES (?, ?, '', ?)
+    ON CONFLICT(idempotency_key) DO UPDATE SET
+        request_hash = excluded.request_hash, response = '', created_at = excluded.created_at
+    WHERE (idempotency_keys.response = '' AND idempotency_keys.created_at < ?) OR idempotency_keys.created_at < ?
+"""
+_SELECT_IDEMPOTENCY_ROW = "SELECT request_hash, response FROM idempotency_keys WHERE idempotency_key = ?"
+_RELEASE_IDEMPOTENCY = "DELETE FROM idempotency_keys WHERE idempotency_key = ? AND response = ''"
+_PURGE_IDEMPOTENCY = "DELETE FROM idempotency_keys WHERE created_at < ?"
+_INSERT_WEBHOOK = """
+    INSERT OR IGNORE INTO webhook_events (provider, event_id, txn_id, raw_body, received_at) VALUES (?, ?, ?, ?, ?)
+"""
+_MARK_WEBHOOK = "UPDATE webhook_events SET processed_at = ? WHERE seq = ?"
+# Keyset pages of unprocessed deliveries (idx_webhook_events_pending); bodies can be large.
+_WEBHOOK_PAGE = 500
+_PENDING_WEBHOOKS = (
+    "SELECT seq, provider, event_id, txn_id, raw_body, received_at FROM webhook_events "
+    f"WHERE processed_at IS NULL AND seq > ? ORDER BY seq LIMIT {_WEBHOOK_PAGE}"
+)
+_PURGE_WEBHOOKS = "DELETE FROM webhook_events WHERE processed_at IS NOT NULL AND received_at < ?"
+_CLAIM_LEASE = """
+    INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+    WHERE leases.expires_at < ? OR leases.owner = excluded.owner
+"""
+
+
+def _dumps(value: Dict[str, Any] | None) -> str | None:
+    return json.dumps(value, separators=(",", ":")) if value else None
+
+
+def _loads(value: str | None) -> Dict[str, Any]:
+    return json.loads(value) if value else {}
+
+
+def txn_to_row(txn: PaymentTransaction) -> Tuple[Any, ...]:
+    return (
+        txn.txn_id,
+        txn.person_id,
+        txn.instrument_id,
+        txn.amount_minor,
+        txn.currency,
+        status_value(txn.status),
+        txn.description,
+        txn.counterparty,
+        txn.provider,
+        _dumps(txn._authorization_context),
+        _dumps(txn._metadata),
+        txn.created_at,
+        txn.amount,
+    )
+
+
+def row_to_txn(row: Tuple[Any, ...]) -> PaymentTransaction:
+    return PaymentTransaction(
+        txn_id=row[0],
+        person_id=row[1],
+        instrument_id=row[2],
+        amount=None,
+        amount_minor=row[3],
+        currency=row[4],
+        status=PaymentStatus(row[5]),
+        description=row[6],
+        counterparty=row[7],
+        provider=row[8],
+        authorization_context=_loads(row[9]),
+        metadata=_loads(row[10]),
+        created_at=row[11],
+    )
+
+
+def _instrument_to_row(instrument: PaymentInstrument) -> Tuple[Any, ...]:
+    return (
+        instrument.instrument_id,
+        instrument.person_id,
+        instrument.provider,
+        instrument.kind,
+        instrument.display_name,
+        instrument.brand,
+        instrument.last4,
+        instrument.expiry,
+        instrument.handle,
+        _dumps(instrument._metadata),
+        instrument.created_at,
+    )
+
+
+def _row_to_instrument(row: Tuple[Any, ...]) -> PaymentInstrument:
+    return PaymentInstrument(
+        instrument_id=row[0],
+        person_id=row[1],
+        provider=row[2],
+        kind=row[3],
+        display_name=row[4],
+        brand=row[5],
+        last4=row[6],
+        expiry=row[7],
+        handle=row[8],
+        metadata=_loads(row[9]),
+        created_at=row[10],
+    )
+
+
+class _InstrumentTable:
+    """Dict-like view over the ledger's instrument table, as used by ``PaymentService``."""
+
+    def __init__(self, ledger: "SQLiteLedger"):
+        self._ledger = ledger
+
+    def get(self, instrument_id: str, default: Any = None) -> PaymentInstrument | Any:
+        instrument = self._ledger.get_instrument(instrument_id)
+        return default if instrument is None else instrument
+
+    def __getitem__(self, instrument_id: str) -> PaymentInstrument:
+        instrument = self._ledger.get_instrument(instrument_id)
+        if instrument is None:
+            raise KeyError(instrument_id)
+        return instrument
+
+    def __setitem__(self, instrument_id: str, instrument: PaymentInstrument) -> None:
+        self._ledger.put_instrument(instrument)
+
+    def __contains__(self, instrument_id: str) -> bool:
+        return self._ledger.get_instrument(instrument_id) is not None
+
+
+class SQLiteLedger(TransactionStore):
+    """Durable SQLite (WAL) ledger for instruments and transactions.
+
+    Writes are applied inside an open transaction and committed as a group once
+    ``group_commit_size`` writes are pending or ``group_commit_interval`` seconds have
+    passed, so one fsync covers many writes. Reads go through the same connection and
+    therefore see uncommitted writes from this process; other processes see them after
+    the next group commit. A crash can lose at most the current uncommitted group, i.e.
+    roughly ``group_commit_interval`` seconds of writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        group_commit_size: int = 256,
+        group_commit_interval: float = 0.01,
+        synchronous: str = "NORMAL",
+    ):
+        self.path = path
+        self.group_commit_size = max(1, group_commit_size)
+        self.group_commit_interval = group_commit_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._commits = 0
+        self._closed = threading.Event()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._migrate()
+        self.instruments = _InstrumentTable(self)
+        self._flusher: threading.Thread | None = None
+        if group_commit_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="payments-ledger", daemon=True)
+            self._flusher.start()
+
+    def _migrate(self) -> None:
+        """Add and backfill ``amount_minor`` on ledgers created before amounts were stored as integers."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(transactions)")}
+        if "amount_minor" not in columns:
+            self._conn.execute("ALTER TABLE transactions ADD COLUMN amount_minor INTEGER")
+        while True:
+            rows = self._conn.execute(_SELECT_UNMIGRATED).fetchall()
+            if not rows:
+                return
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                _BACKFILL_MINOR, [(to_minor(amount, currency), txn_id) for txn_id, amount, currency in rows]
+            )
+            self._conn.execute("COMMIT")
+
+    # Transactions -----------------------------------------------------------------
+
+    def get(self, txn_id: str) -> PaymentTransaction | None:
+        with self._lock:
+            row = self._conn.execute(_SELECT_TXN, (txn_id,)).fetchone()
+        return row_to_txn(row) if row else None
+
+    def get_many(self, txn_ids: Iterable[str]) -> Dict[str, PaymentTransaction]:
+        return {row[0]: row_to_txn(row) for row in self._select_many(_TXN_COLUMNS, txn_ids)}
+
+    def get_summaries(self, txn_ids: Iterable[str]) -> Dict[str, Tuple[int, str, str]]:
+        return {row[0]: row[1:] for row in self._select_many("txn_id, amount_minor, currency, status", txn_ids)}
+
+    def _select_many(self, columns: str, txn_ids: Iterable[str]) -> List[Tuple[Any, ...]]:
+        ids = list(txn_ids)
+        rows: List[Tuple[Any, ...]] = []
+        for start in range(0, len(ids), _GET_MANY_CHUNK):
+            chunk = ids[start:start + _GET_MANY_CHUNK]
+            sql = f"SELECT {columns} FROM transactions WHERE txn_id IN ({','.join('?' * len(chunk))})"
+            with self._lock:
+                rows.extend(self._conn.execute(sql, chunk).fetchall())
+        return rows
+
+    def scan_amounts(
+        self, created_after: float | None = None, created_before: float | None = None
+    ) -> Iterator[Tuple[str, str, str, int, float]]:
+        after = float("-inf") if created_after is None else created_after
+        for rows in self._scan(_SCAN_AMOUNTS, (after, ""), created_before, 4, 5):
+            for row in rows:
+                yield row[:5]
+
+    def export_rows(
+        self, after: Tuple[float, str] | None = None, created_before: float | None = None
+    ) -> Iterator[Tuple[Any, ...]]:
+        for rows in self._scan(_EXPORT_ROWS, after or (float("-inf"), ""), created_before, 10, 0):
+            yield from rows
+
+    def _scan(
+        self, sql: str, after: Tuple[float, str], created_before: float | None, at: int, txn: int
+    ) -> Iterator[List[Tuple[Any, ...]]]:
+        """Keyset pages of ``sql``; ``at``/``txn`` locate created_at and txn_id in its rows.
+
+        The lock is released between pages.
+        """
+        created_at, last = after
+        before = float("inf") if created_before is None else created_before
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, (created_at, last, before)).fetchall()
+            if rows:
+                yield rows
+            if len(rows) < _SCAN_PAGE:
+                return
+            created_at, last = rows[-1][at], rows[-1][txn]
+
+    def put(self, txn: PaymentTransaction) -> None:
+        self._write(_UPSERT_TXN, txn_to_row(txn))
+
+    def put_many(self, txns) -> None:
+        rows = [txn_to_row(txn) for txn in txns]
+        with self._lock:
+            self._begin()
+            self._conn.executemany(_UPSERT_TXN, rows)
+            self._pending += len(rows)
+            if self._pending >= self.group_commit_size:
+                self._commit()
+
+    def delete(self, txn_id: str) -> None:
+        self._write(_DELETE_TXN, (txn_id,))
+
+    def query(self, query: TransactionQuery) -> List[PaymentTransaction]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, value in (
+            ("person_id", query.person_id),
+            ("instrument_id", query.instrument_id),
+            ("status", query.status),
+            ("counterparty", query.counterparty),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if query.created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(query.created_after)
+        if query.created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(query.created_before)
+        if query.cursor is not None:
+            clauses.append("(created_at < ? OR (created_at = ? AND txn_id < ?))")
+            params.extend((query.cursor[0], query.cursor[0], query.cursor[1]))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        # One statement text per filter combination, so these stay in the statement cache too.
+        sql = f"SELECT {_TXN_COLUMNS} FROM transactions{where} ORDER BY created_at DESC, txn_id DESC LIMIT ?"
+        params.append(query.limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [row_to_txn(row) for row in rows]
+
+    def __iter__(self) -> Iterator[PaymentTransaction]:
+        # Keyset-paginate so iteration never holds the lock (or a cursor) for the whole table.
+        last = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {_TXN_COLUMNS} FROM transactions WHERE txn_id > ? ORDER BY txn_id LIMIT 1000", (last,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row_to_txn(row)
+            last = rows[-1][0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    # Instruments ------------------------------------------------------------------
+
+    def get_instrument(self, instrument_id: str) -> PaymentInstrument | None:
+        with self._lock:
+            row = self._conn.execute(_SELECT_INSTRUMENT, (instrument_id,)).fetchone()
+        return _row_to_instrument(row) if row else None
+
+    def put_instrument(self, instrument: PaymentInstrument) -> None:
+        self._write(_UPSERT_INSTRUMENT, _instrument_to_row(instrument))
+
+    # Idempotency keys -------------------------------------------------------------
+
+    def get_idempotency_key(self, key: str, *, max_age: float) -> Tuple[str, str] | None:
+        with self._lock:
+            row = self._conn.execute(_SELECT_IDEMPOTENCY, (key, time.time() - max_age)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def put_idempotency_key(self, key: str, request_hash: str, response: str, created_at: float) -> None:
+        self._write(_UPSERT_IDEMPOTENCY, (key, request_hash, response, created_at))
+
+    def claim_idempotency_key(
+        self, key: str, request_hash: str, *, stale_before: float, expired_before: float
+    ) -> Tuple[str, str] | None:
+        """Claim ``key`` for a request about to run; None when claimed.
+
+        Otherwise returns the existing row's ``(request_hash, response)``, where an empty
+        ``response`` means another process holds the claim. Claims older than
+        ``stale_before`` and rows older than ``expired_before`` are taken over. Commits
+        immediately so other processes sharing the ledger see the claim.
+        """
+        with self._lock:
+            self._begin()
+            cursor = self._conn.execute(_CLAIM_IDEMPOTENCY, (key, request_hash, time.time(), stale_before, expired_before))
+            row = None if cursor.rowcount else self._conn.execute(_SELECT_IDEMPOTENCY_ROW, (key,)).fetchone()
+            self._commit()
+        return (row[0], row[1]) if row else None
+
+    def release_idempotency_key(self, key: str) -> None:
+        """Drop an unfinished claim on ``key`` so a retry can run."""
+        with self._lock:
+            self._begin()
+            self._conn.execute(_RELEASE_IDEMPOTENCY, (key,))
+            self._commit()
+
+    def purge_idempotency_keys(self, older_than: float) -> None:
+        self._write(_PURGE_IDEMPOTENCY, (older_than,))
+
+    # Webhook deliveries -----------------------------------------------------------
+
+    def put_webhook_event(
+        self, provider: str, event_id: str, txn_id: str | None, raw_body: bytes, received_at: float
+    ) -> int | None:
+        """Record a delivery and return its sequence number, or None for a duplicate.
+
+        Commits immediately: the delivery is acknowledged to the provider right after.
+        """
+        with self._lock:
+            self._begin()
+            cursor = self._conn.execute(_INSERT_WEBHOOK, (provider, event_id, txn_id, raw_body, received_at))
+            self._commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def mark_webhook_event_processed(self, seq: int, processed_at: float) -> None:
+        self._write(_MARK_WEBHOOK, (processed_at, seq))
+
+    def pending_webhook_events(self, after_seq: int = 0) -> Iterator[WebhookDelivery]:
+        """Unprocessed deliveries in ``seq`` order, read in keyset pages.
+
+        The lock is released between pages, and only one page of bodies is held at a time.
+        """
+        while True:
+            with self._lock:
+                rows = self._conn.execute(_PENDING_WEBHOOKS, (after_seq,)).fetchall()
+            for seq, provider, event_id, txn_id, raw, received in rows:
+                yield WebhookDelivery(
+                    provider=provider,
+                    event_id=event_id,
+                    txn_id=txn_id,
+                    raw_body=bytes(raw),
+                    seq=seq,
+                    received_at=received,
+                )
+            if len(rows) < _WEBHOOK_PAGE:
+                return
+            after_seq = rows[-1][0]
+
+    def purge_webhook_events(self, older_than: float) -> None:
+        self._write(_PURGE_WEBHOOKS, (older_than,))
+
+    # Leases -----------------------------------------------------------------------
+
+    def claim_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take (or renew) the lease ``name`` for ``ttl`` seconds unless another owner holds it.
+
+        Commits immediately so other processes sharing the ledger see the claim.
+        """
+        now = time.time()
+        with self._lock:
+            self._begin()
+            cursor = self._conn.execute(_CLAIM_LEASE, (name, owner, now + ttl, now))
+            self._commit()
+        return cursor.rowcount > 0
+
+    # Lifecycle --------------------------------------------------------------------
+
+    def flush(self) -> None:
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"pending_writes": self._pending, "group_commits": self._commits}
+
+    def _begin(self) -> None:
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+
+    def _commit(self) -> None:
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+            self._commits += 1
+        self._pending = 0
+
+    def _write(self, sql: str, params: Tuple[Any, ...]) -> None:
+        with self._lock:
+            self._begin()
+            self._conn.execute(sql, params)
+            self._pending += 1
+            if self._pending >= self.group_commit_size:
+                self._commit()
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.group_commit_interval):
+            try:
+                with self._lock:
+                    if self._pending:
+                        self._commit()
+            except sqlite3.Error as exc:
+                logger.warning("ledger group commit failed: %s", exc)
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, List, Tuple
+
+from .models import PaymentTransaction
+from .money import to_major, to_minor
+from .store import status_value
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("person", "instrument")
+METRICS = ("amount", "count")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_RULE = re.compile(r"^(person|instrument):(amount|count):([0-9.]+)([A-Za-z]{3})?/([0-9.]+)([smhd]?)$")
+
+
+class LimitExceeded(Exception):
+    """A charge would exceed a spend or velocity limit; it was rejected before the provider call."""
+
+    def __init__(self, message: str, rule: "LimitRule", retry_after: float):
+        super().__init__(message)
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class LimitRule:
+    """At most ``limit`` (amount, or number of charges) per ``scope`` key within ``window`` seconds.
+
+    Amounts are never summed across currencies: an amount rule caps each currency
+    separately at ``limit`` major units, or only ``currency`` when it is set.
+    """
+
+    scope: str
+    metric: str
+    limit: float
+    window: float
+    currency: str | None = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.scope}:{self.metric}:{self.limit:g}{self.currency or ''}/{self.window:g}s"
+
+    @classmethod
+    def parse(cls, spec: str) -> "LimitRule":
+        """``scope:metric:limit[currency]/window``, e.g. ``person:amount:1000/1d``,
+        ``person:amount:500EUR/1d`` or ``instrument:count:5/1m``."""
+        match = _RULE.match(spec.strip())
+        if not match:
+            raise ValueError(f"invalid limit rule {spec!r} (expected e.g. person:amount:1000/1d)")
+        scope, metric, limit, currency, window, unit = match.groups()
+        if currency and metric != "amount":
+            raise ValueError(f"limit rule {spec!r}: only amount limits take a currency")
+        seconds = float(window) * _UNITS[unit or "s"]
+        if seconds <= 0:
+            raise ValueError(f"limit rule {spec!r} needs a positive window")
+        return cls(scope, metric, float(limit), seconds, currency.upper() if currency else None)
+
+
+class _Segment:
+    """Where one rule's ring of buckets lives inside a key's ``array``: ``[head, total, b0..bN-1]``."""
+
+    __slots__ = ("rule", "offset", "buckets", "width", "_limits")
+
+    def __init__(self, rule: LimitRule, offset: int, buckets: int):
+        self.rule = rule
+        self.offset = offset
+        self.buckets = buckets
+        self.width = rule.window / buckets
+        self._limits: Dict[str, float] = {}
+
+    def limit(self, currency: str) -> float:
+        """The rule's limit in counter units: charges, or minor units of ``currency``."""
+        if self.rule.metric == "count":
+            return self.rule.limit
+        limit = self._limits.get(currency)
+        if limit is None:
+            limit = self._limits[currency] = float(to_minor(self.rule.limit, currency))
+        return limit
+
+    def applies(self, currency: str) -> bool:
+        return self.rule.currency is None or self.rule.currency == currency
+
+
+def _advance(state: array, seg: _Segment, epoch: int) -> None:
+    """Roll the ring forward to ``epoch``, dropping buckets that left the window."""
+    o = seg.offset
+    head = int(state[o])
+    if epoch <= head:
+        return
+    n = seg.buckets
+    if epoch - head >= n:
+        for i in range(o + 1, o + 2 + n):
+            state[i] = 0.0
+    else:
+        for e in range(head + 1, epoch + 1):
+            i = o + 2 + e % n
+            state[o + 1] -= state[i]
+            state[i] = 0.0
+    state[o] = epoch
+
+
+def _add(state: array, seg: _Segment, epoch: int, value: float) -> None:
+    """Add ``value`` to the bucket for ``epoch`` if it is still inside the ring."""
+    o = seg.offset
+    if epoch <= state[o] - seg.buckets:
+        return
+    i = o + 2 + epoch % seg.buckets
+    state[i] = max(0.0, state[i] + value)
+    state[o + 1] = max(0.0, state[o + 1] + value)
+
+
+class _Scope:
+    """Bucketed sliding-window counters for the rules of one scope and metric, one ``array`` per key.
+
+    Keys live in two generations that rotate every ``max_window`` seconds; a key idle
+    for a whole generation has nothing left in its windows and is dropped with it, so
+    memory follows the active keys without sweeping.
+    """
+
+    def __init__(self, rules: List[LimitRule], buckets: int, clock: Callable[[], float]):
+        self.segments: List[_Segment] = []
+        offset = 0
+        for rule in rules:
+            self.segments.append(_Segment(rule, offset, buckets))
+            offset += buckets + 2
+        self._template = array("d", bytes(8 * offset))
+        self.max_window = max((rule.window for rule in rules), default=0.0)
+        self._clock = clock
+        self._current: Dict[Hashable, array] = {}
+        self._previous: Dict[Hashable, array] = {}
+        self._rotated_at = clock()
+
+    def state(self, key: Hashable) -> array:
+        state = self._current.get(key)
+        if state is None:
+            now = self._clock()
+            if now - self._rotated_at >= self.max_window:
+                self._previous, self._current = self._current, {}
+                self._rotated_at = now
+            state = self._previous.pop(key, None)
+            if state is None:
+                state = array("d", self._template)
+            self._current[key] = state
+        return state
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
+
+
+class Reservation:
+    """What ``LimitsEngine.reserve`` recorded, so a charge that did not happen can give it back."""
+
+    __slots__ = ("person_id", "instrument_id", "amount_minor", "currency", "at")
+
+    def __init__(self, person_id: str, instrument_id: str, amount_minor: int, currency: str, at: float):
+        self.person_id = person_id
+        self.instrument_id = instrument_id
+        self.amount_minor = amount_minor
+        self.currency = currency
+        self.at = at
+
+
+class LimitsEngine:
+    """Per-person and per-instrument spend and velocity limits on O(1) sliding-window counters.
+
+    Each rule's window is split into ``buckets`` fixed buckets kept in a ring with a
+    running total, so a decision touches a handful of floats no matter how much history a
+    person has. Buckets leave the window whole, which makes the window up to one bucket
+    longer than configured: limits can bite slightly early, never late. Count rules keep
+    one set of counters per key; amount rules keep one per key and currency, summing
+    integer minor units.
+
+    ``reserve`` checks every rule for the charge and records it (amount and count) only if
+    all pass, raising :class:`LimitExceeded` otherwise. ``release`` gives the amount back
+    when the charge failed; the count stays, since velocity limits count attempts.
+    Counters live in process memory: ``rebuild`` reloads them from stored transactions on
+    startup, and separate server processes each enforce their own.
+    """
+
+    def __init__(
+        self, rules: Iterable[LimitRule], *, buckets: int = 10, clock: Callable[[], float] = time.time
+    ):
+        self.rules = list(rules)
+        self.buckets = max(1, buckets)
+        self._clock = clock
+        # scope -> (count counters keyed by id, amount counters keyed by (id, currency))
+        self._scopes = {
+            scope: tuple(
+                _Scope([r for r in self.rules if r.scope == scope and r.metric == metric], self.buckets, clock)
+                for metric in ("count", "amount")
+            )
+            for scope in SCOPES
+        }
+        self.max_window = max((rule.window for rule in self.rules), default=0.0)
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.rejections: Dict[str, int] = {rule.name: 0 for rule in self.rules}
+
+    @classmethod
+    def from_spec(cls, spec: str, **kwargs: Any) -> "LimitsEngine":
+        """Rules from a comma-separated list of ``LimitRule.parse`` specs."""
+        return cls([LimitRule.parse(part) for part in spec.split(",") if part.strip()], **kwargs)
+
+    def _counters(self, person_id: str, instrument_id: str, currency: str) -> Iterator[Tuple[str, _Scope, array]]:
+        for scope_name, key in (("person", person_id), ("instrument", instrument_id)):
+            counts, amounts = self._scopes[scope_name]
+            if counts.segments:
+                yield scope_name, counts, counts.state(key)
+            if amounts.segments:
+                yield scope_name, amounts, amounts.state((key, currency))
+
+    def reserve(self, person_id: str, instrument_id: str, amount_minor: int, currency: str) -> Reservation:
+        """Check and record a charge of ``amount_minor`` minor units of ``currency``."""
+        if amount_minor <= 0:
+            raise ValueError(f"charge amount must be positive, got {amount_minor}")
+        now = self._clock()
+        currency = currency.upper()
+        with self._lock:
+            self.checks += 1
+            counters = list(self._counters(person_id, instrument_id, currency))
+            for scope_name, scope, state in counters:
+                for seg in scope.segments:
+                    if not seg.applies(currency):
+                        continue
+                    epoch = int(now // seg.width)
+                    _advance(state, seg, epoch)
+                    increment = amount_minor if seg.rule.metric == "amount" else 1.0
+                    if state[seg.offset + 1] + increment > seg.limit(currency):
+                        self.rejections[seg.rule.name] += 1
+                        raise LimitExceeded(
+                            f"{scope_name} limit {seg.rule.name} exceeded",
+                            seg.rule,
+                            (epoch + 1) * seg.width - now,
+                        )
+            for _, scope, state in counters:
+                for seg in scope.segments:
+                    if seg.applies(currency):
+                        _add(state, seg, int(now // seg.width), amount_minor if seg.rule.metric == "amount" else 1.0)
+        return Reservation(person_id, instrument_id, amount_minor, currency, now)
+
+    def release(self, reservation: Reservation) -> None:
+        with self._lock:
+            for scope_name, key in (("person", reservation.person_id), ("instrument", reservation.instrument_id)):
+                amounts = self._scopes[scope_name][1]
+                segments = [seg for seg in amounts.segments if seg.applies(reservation.currency)]
+                if segments:
+                    state = amounts.state((key, reservation.currency))
+                    for seg in segments:
+                        _add(state, seg, int(reservation.at // seg.width), -reservation.amount_minor)
+
+    def record(self, txn: PaymentTransaction) -> None:
+        """Count a stored transaction at its ``created_at`` (failed ones count as attempts only)."""
+        at = txn.created_at
+        if at <= self._clock() - self.max_window:
+            return
+        failed = status_value(txn.status) == "failed"
+        currency = txn.currency.upper()
+        with self._lock:
+            for _, scope, state in self._counters(txn.person_id, txn.instrument_id, currency):
+                for seg in scope.segments:
+                    if not seg.applies(currency):
+                        continue
+                    epoch = int(at // seg.width)
+                    _advance(state, seg, epoch)
+                    if seg.rule.metric == "count":
+                        _add(state, seg, epoch, 1.0)
+                    elif not failed:
+                        _add(state, seg, epoch, txn.amount_minor)
+
+    def rebuild(self, transactions: Iterable[PaymentTransaction]) -> int:
+        """Reload counters from stored transactions (any order); returns how many were counted."""
+        counted = 0
+        cutoff = self._clock() - self.max_window
+        for txn in transactions:
+            if txn.created_at > cutoff:
+                self.record(txn)
+                counted += 1
+        return counted
+
+    def usage(self, scope: str, key: str, currency: str = "USD") -> Dict[str, float]:
+        """Current window totals per rule for one key, amounts in major units of ``currency``."""
+        now = self._clock()
+        currency = currency.upper()
+        with self._lock:
+            counts, amounts = self._scopes[scope]
+            totals = {}
+            for target, state_key in ((counts, key), (amounts, (key, currency))):
+                state = target.state(state_key) if target.segments else None
+                for seg in target.segments:
+                    if not seg.applies(currency):
+                        continue
+                    _advance(state, seg, int(now // seg.width))
+                    total = state[seg.offset + 1]
+                    totals[seg.rule.name] = to_major(int(total), currency) if seg.rule.metric == "amount" else total
+            return totals
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rules": len(self.rules),
+                "person_counters": sum(len(scope) for scope in self._scopes["person"]),
+                "instrument_counters": sum(len(scope) for scope in self._scopes["instrument"]),
+                "checks": self.checks,
+                "rejections": dict(self.rejections),
+            }
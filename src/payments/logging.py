@@ -1,19 +1,64 @@
 from __future__ import annotations
 
+import gzip
+import json
 import logging
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, List
 
 logger = logging.getLogger(__name__)
 
+BATCH_PATH = "/payments/events/batch"
+
+
+def encode_batch(events: List[Dict[str, Any]], *, compress: bool = True) -> bytes:
+    """Encode events as newline-delimited JSON, gzip-compressed unless ``compress`` is False."""
+    body = "\n".join(json.dumps(event, separators=(",", ":")) for event in events).encode("utf-8")
+    return gzip.compress(body, compresslevel=5) if compress else body
+
 
 class PaymentEventLogger:
-    """Best-effort emitter for payment events (e.g., to context-graph)."""
+    """Best-effort emitter for payment events (e.g., to context-graph).
 
-    def __init__(self, client=None):
-        self.client = client
+    With ``batch_size`` set, events are buffered and flushed by a background thread to
+    ``POST /payments/events/batch`` as NDJSON whenever ``batch_size`` events are pending or
+    the oldest pending event is ``flush_interval`` seconds old. ``close()`` flushes the rest.
+    """
 
-    def log_event(
+    def __init__(
         self,
+        client=None,
+        *,
+        batch_size: int | None = None,
+        flush_interval: float = 0.05,
+        max_buffer: int = 100000,
+        compress: bool = True,
+    ):
+        self.client = client
+        self.batch_size = batch_size if batch_size and batch_size > 0 else None
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.compress = compress
+        self._buffer: List[Dict[str, Any]] = []
+        self._first_at = 0.0
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        self._stats = {
+            "batches_sent": 0,
+            "batches_failed": 0,
+            "events_sent": 0,
+            "events_failed": 0,
+            "events_dropped": 0,
+        }
+
+    @property
+    def batching(self) -> bool:
+        return self.batch_size is not None and self.client is not None
+
+    @staticmethod
+    def build_event(
         *,
         event_type: str,
         subject_id: str,
@@ -25,8 +70,8 @@ class PaymentEventLogger:
         counterparty: str | None = None,
         surface: str | None = None,
         instrument_kind: str | None = None,
-    ) -> None:
-        payload: Dict[str, Any] = {
+    ) -> Dict[str, Any]:
+        return {
             "event_type": event_type,
             "subject_id": subject_id,
             "person_id": person_id,
@@ -38,12 +83,102 @@ class PaymentEventLogger:
             "surface": surface,
             "instrument_kind": instrument_kind,
         }
+
+    def send_event(self, payload: Dict[str, Any]) -> None:
+        """Deliver one event, raising on failure so callers (e.g. the outbox) can retry."""
         if not self.client:
             logger.debug("payment event (local): %s", payload)
             return
+        ok, status_code, _ = self.client.post("/payments/events", payload)
+        if not ok or status_code >= 300:
+            raise RuntimeError(f"payment event emit failed: status={status_code} ok={ok}")
+
+    def log_event(self, **fields: Any) -> None:
+        payload = self.build_event(**fields)
+        if self.batching:
+            self._enqueue(payload)
+            return
+        try:
+            self.send_event(payload)
+        except Exception as exc:
+            logger.debug("payment event emit failed: %s payload=%s", exc, payload)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(self._stats, pending=len(self._buffer))
+
+    def flush(self) -> None:
+        """Synchronously send everything currently buffered."""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._send_batch(batch)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _enqueue(self, payload: Dict[str, Any]) -> None:
+        with self._cond:
+            if self._closing or len(self._buffer) >= self.max_buffer:
+                self._stats["events_dropped"] += 1
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="payments-events", daemon=True)
+                self._thread.start()
+            if not self._buffer:
+                self._first_at = time.monotonic()
+                self._cond.notify_all()
+            self._buffer.append(payload)
+            if len(self._buffer) == self.batch_size:
+                self._cond.notify_all()
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        batch = self._buffer[: self.batch_size]
+        del self._buffer[: self.batch_size]
+        if self._buffer:
+            self._first_at = time.monotonic()
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._buffer or self._closing)
+                if self._closing:
+                    return
+                deadline = self._first_at + self.flush_interval
+                self._cond.wait_for(
+                    lambda: len(self._buffer) >= self.batch_size or self._closing,
+                    max(0.0, deadline - time.monotonic()),
+                )
+                if self._closing:
+                    return
+                batch = self._take_batch()
+            self._send_batch(batch)
+
+    def _send_batch(self, batch: List[Dict[str, Any]]) -> None:
+        headers = {"Content-Type": "application/x-ndjson"}
+        if self.compress:
+            headers["Content-Encoding"] = "gzip"
         try:
-            ok, status_code, _ = self.client.post("/payments/events", payload)
-            if not ok or status_code >= 300:
-                logger.debug("payment event emit failed: status=%s ok=%s payload=%s", status_code, ok, payload)
+            ok, status_code, _ = self.client.post_content(
+                BATCH_PATH, encode_batch(batch, compress=self.compress), headers=headers
+            )
         except Exception as exc:
-            logger.debug("payment event emit exception: %s", exc)
+            ok, status_code = False, 0
+            logger.debug("payment event batch exception: %s", exc)
+        with self._cond:
+            if ok and status_code < 300:
+                self._stats["batches_sent"] += 1
+                self._stats["events_sent"] += len(batch)
+                return
+            self._stats["batches_failed"] += 1
+            self._stats["events_failed"] += len(batch)
+        logger.warning("payment event batch failed: status=%s events=%s", status_code, len(batch))
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, Any
+from typing import Any, Dict, Tuple
 import time
 
+from .money import to_major, to_minor
+
 
 class PaymentStatus(str, Enum):
     CREATED = "created"
@@ -13,45 +14,236 @@ class PaymentStatus(str, Enum):
     FAILED = "failed"
 
 
-@dataclass
-class PaymentInstrument:
-    instrument_id: str
-    person_id: str
-    provider: str
-    kind: str
-    display_name: str | None = None
-    brand: str | None = None
-    last4: str | None = None
-    expiry: str | None = None
-    handle: str | None = None
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    created_at: float = field(default_factory=lambda: time.time())
-
-
-@dataclass
-class PaymentTransactionRequest:
-    person_id: str
-    instrument_id: str
-    amount: float
-    currency: str = "USD"
-    description: str | None = None
-    counterparty: str | None = None
-    authorization_context: Dict[str, Any] = field(default_factory=dict)
-    provider_token: str | None = None
-    surface: str | None = None
-
-
-@dataclass
-class PaymentTransaction:
-    txn_id: str
-    person_id: str
-    instrument_id: str
-    amount: float
-    currency: str
-    status: PaymentStatus
-    description: str | None = None
-    counterparty: str | None = None
-    provider: str | None = None
-    authorization_context: Dict[str, Any] = field(default_factory=dict)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    created_at: float = field(default_factory=lambda: time.time())
+def _status_value(status: Any) -> Any:
+    return status.value if isinstance(status, Enum) else status
+
+
+def _lazy_dict(slot: str) -> property:
+    """A dict attribute stored in ``slot`` that is only allocated on first access."""
+
+    def get(self) -> Dict[str, Any]:
+        value = getattr(self, slot)
+        if value is None:
+            value = {}
+            setattr(self, slot, value)
+        return value
+
+    def set(self, value: Dict[str, Any] | None) -> None:
+        setattr(self, slot, value or None)
+
+    return property(get, set)
+
+
+def _amount() -> property:
+    """Major-unit view of the integer ``amount_minor`` slot, scaled by the record's ``currency``.
+
+    Reads give the closest float (for JSON and display); writes accept int, float, str or
+    Decimal and are stored exactly. Totals should be computed on ``amount_minor``.
+    """
+
+    def get(self) -> float:
+        return to_major(self.amount_minor, self.currency)
+
+    def set(self, value: Any) -> None:
+        self.amount_minor = to_minor(value, self.currency)
+
+    return property(get, set)
+
+
+class _Model:
+    """Slotted record base: no per-instance ``__dict__``; ``_fields`` drives repr and equality.
+
+    Optional dict attributes (``metadata``, ``authorization_context``) are stored as
+    ``None`` until something reads or writes them, so most records never allocate them.
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __repr__(self) -> str:
+        body = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({body})"
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None  # type: ignore[assignment]  # mutable, like the dataclasses these replaced
+
+
+class PaymentInstrument(_Model):
+    __slots__ = (
+        "instrument_id",
+        "person_id",
+        "provider",
+        "kind",
+        "display_name",
+        "brand",
+        "last4",
+        "expiry",
+        "handle",
+        "_metadata",
+        "created_at",
+    )
+    _fields = tuple(name.lstrip("_") for name in __slots__)
+
+    def __init__(
+        self,
+        instrument_id: str,
+        person_id: str,
+        provider: str,
+        kind: str,
+        display_name: str | None = None,
+        brand: str | None = None,
+        last4: str | None = None,
+        expiry: str | None = None,
+        handle: str | None = None,
+        metadata: Dict[str, Any] | None = None,
+        created_at: float | None = None,
+    ):
+        self.instrument_id = instrument_id
+        self.person_id = person_id
+        self.provider = provider
+        self.kind = kind
+        self.display_name = display_name
+        self.brand = brand
+        self.last4 = last4
+        self.expiry = expiry
+        self.handle = handle
+        self._metadata = metadata or None
+        self.created_at = time.time() if created_at is None else created_at
+
+    metadata = _lazy_dict("_metadata")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready representation used by the API responses."""
+        return {
+            "instrument_id": self.instrument_id,
+            "person_id": self.person_id,
+            "provider": self.provider,
+            "kind": self.kind,
+            "display_name": self.display_name,
+            "brand": self.brand,
+            "last4": self.last4,
+            "expiry": self.expiry,
+            "handle": self.handle,
+            "metadata": self._metadata or {},
+            "created_at": self.created_at,
+        }
+
+
+class PaymentTransactionRequest(_Model):
+    __slots__ = (
+        "person_id",
+        "instrument_id",
+        "amount_minor",
+        "currency",
+        "description",
+        "counterparty",
+        "_authorization_context",
+        "provider_token",
+        "surface",
+    )
+    _fields = tuple(name.lstrip("_") for name in __slots__)
+
+    def __init__(
+        self,
+        person_id: str,
+        instrument_id: str,
+        amount: Any,
+        currency: str = "USD",
+        description: str | None = None,
+        counterparty: str | None = None,
+        authorization_context: Dict[str, Any] | None = None,
+        provider_token: str | None = None,
+        surface: str | None = None,
+        amount_minor: int | None = None,
+    ):
+        self.person_id = person_id
+        self.instrument_id = instrument_id
+        self.currency = currency
+        self.amount_minor = to_minor(amount, currency) if amount_minor is None else amount_minor
+        self.description = description
+        self.counterparty = counterparty
+        self._authorization_context = authorization_context or None
+        self.provider_token = provider_token
+        self.surface = surface
+
+    amount = _amount()
+    authorization_context = _lazy_dict("_authorization_context")
+
+
+class PaymentTransaction(_Model):
+    __slots__ = (
+        "txn_id",
+        "person_id",
+        "instrument_id",
+        "amount_minor",
+        "currency",
+        "status",
+        "description",
+        "counterparty",
+        "provider",
+        "_authorization_context",
+        "_metadata",
+        "created_at",
+    )
+    _fields = tuple(name.lstrip("_") for name in __slots__)
+
+    def __init__(
+        self,
+        txn_id: str,
+        person_id: str,
+        instrument_id: str,
+        amount: Any,
+        currency: str,
+        status: PaymentStatus,
+        description: str | None = None,
+        counterparty: str | None = None,
+        provider: str | None = None,
+        authorization_context: Dict[str, Any] | None = None,
+        metadata: Dict[str, Any] | None = None,
+        created_at: float | None = None,
+        amount_minor: int | None = None,
+    ):
+        self.txn_id = txn_id
+        self.person_id = person_id
+        self.instrument_id = instrument_id
+        self.currency = currency
+        self.amount_minor = to_minor(amount, currency) if amount_minor is None else amount_minor
+        self.status = status
+        self.description = description
+        self.counterparty = counterparty
+        self.provider = provider
+        self._authorization_context = authorization_context or None
+        self._metadata = metadata or None
+        self.created_at = time.time() if created_at is None else created_at
+
+    amount = _amount()
+    authorization_context = _lazy_dict("_authorization_context")
+    metadata = _lazy_dict("_metadata")
+
+    def to_dict(self, *, include_authorization_context: bool = False) -> Dict[str, Any]:
+        """JSON-ready representation used by the API responses.
+
+        ``authorization_context`` can carry approval details supplied by the caller, so it
+        is only echoed back when asked for.
+        """
+        data = {
+            "txn_id": self.txn_id,
+            "person_id": self.person_id,
+            "instrument_id": self.instrument_id,
+            "amount": to_major(self.amount_minor, self.currency),
+            "amount_minor": self.amount_minor,
+            "currency": self.currency,
+            "status": _status_value(self.status),
+            "description": self.description,
+            "counterparty": self.counterparty,
+            "provider": self.provider,
+            "metadata": self._metadata or {},
+            "created_at": self.created_at,
+        }
+        if include_authorization_context:
+            data["authorization_context"] = self._authorization_context or {}
+        return data
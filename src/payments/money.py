@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Any
+
+# ISO 4217 minor-unit exponents that differ from the usual 2 (cents).
+CURRENCY_EXPONENTS = {
+    "BIF": 0, "CLP": 0, "DJF": 0, "GNF": 0, "ISK": 0, "JPY": 0, "KMF": 0, "KRW": 0, "PYG": 0,
+    "RWF": 0, "UGX": 0, "UYI": 0, "VND": 0, "VUV": 0, "XAF": 0, "XOF": 0, "XPF": 0,
+    "BHD": 3, "IQD": 3, "JOD": 3, "KWD": 3, "LYD": 3, "OMR": 3, "TND": 3,
+    "CLF": 4, "UYW": 4,
+}
+DEFAULT_EXPONENT = 2
+_SCALES = [10**n for n in range(5)]
+
+
+def exponent(currency: str | None) -> int:
+    """Number of decimal places in ``currency``'s minor unit (2 unless listed in ``CURRENCY_EXPONENTS``)."""
+    if not currency:
+        return DEFAULT_EXPONENT
+    return CURRENCY_EXPONENTS.get(currency.upper(), DEFAULT_EXPONENT)
+
+
+def to_minor(amount: Any, currency: str | None, *, strict: bool = False) -> int:
+    """``amount`` in major units (int, float, str or Decimal) as an integer count of minor units.
+
+    Floats are read through their shortest repr, so ``19.99`` is 1999 cents rather than
+    the binary value just below it. Extra precision is rounded half up, or raises
+    ValueError with ``strict`` (used for caller-supplied amounts).
+    """
+    scale = _SCALES[exponent(currency)]
+    if type(amount) is int:
+        return amount * scale
+    if type(amount) is float and amount == amount and abs(amount) < 1e15:
+        # Fast path: if a whole number of minor units maps back to this exact float, that
+        # number is what the float's shortest repr spells.
+        minor = round(amount * scale)
+        if minor / scale == amount:
+            return minor
+    try:
+        value = amount if isinstance(amount, Decimal) else Decimal(repr(amount) if isinstance(amount, float) else str(amount))
+        scaled = value.scaleb(exponent(currency))
+        minor = scaled.to_integral_value(rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError) as exc:
+        raise ValueError(f"invalid amount {amount!r}") from exc
+    if not minor.is_finite():
+        raise ValueError(f"invalid amount {amount!r}")
+    if strict and minor != scaled:
+        raise ValueError(f"{currency} amounts have at most {exponent(currency)} decimal places")
+    return int(minor)
+
+
+def from_minor(minor: int, currency: str | None) -> Decimal:
+    """Exact major-unit amount for ``minor`` units of ``currency``."""
+    return Decimal(minor).scaleb(-exponent(currency))
+
+
+def to_major(minor: int, currency: str | None) -> float:
+    """``minor`` units as a float in major units: the closest float to the exact amount, for JSON."""
+    return minor / _SCALES[exponent(currency)]
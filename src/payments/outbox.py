@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+_POLICIES = {DROP_OLDEST, DROP_NEWEST, BLOCK}
+
+
+@dataclass
+class _OutboxItem:
+    name: str
+    fn: Callable[[], Any]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class Outbox:
+    """Bounded in-process queue that runs side effects on a background worker thread.
+
+    Items run in FIFO order on a single worker, so effects queued for the same request
+    (profile write, event) keep their relative order. A failing item is retried with
+    exponential backoff and jitter up to ``max_attempts`` before it is counted as
+    failed. When the queue is full the ``policy`` decides what happens:
+    ``drop_oldest`` evicts the head, ``drop_newest`` rejects the new item and ``block``
+    waits up to ``block_timeout`` seconds for room before rejecting it.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: int = 10000,
+        policy: str = DROP_OLDEST,
+        max_attempts: int = 5,
+        backoff_base: float = 0.1,
+        backoff_max: float = 5.0,
+        block_timeout: float = 1.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if policy not in _POLICIES:
+            raise ValueError(f"unknown outbox policy '{policy}'")
+        self.max_size = max_size
+        self.policy = policy
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.block_timeout = block_timeout
+        self._sleep = sleep
+        self._queue: Deque[_OutboxItem] = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        self._busy = False
+        self._enqueued = 0
+        self._processed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._retries = 0
+        self._last_lag = 0.0
+
+    def start(self) -> "Outbox":
+        with self._cond:
+            if self._thread is None:
+                self._closing = False
+                self._thread = threading.Thread(target=self._run, name="payments-outbox", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, name: str, fn: Callable[[], Any]) -> bool:
+        """Queue ``fn``; returns False when the item was rejected by the full-queue policy."""
+        with self._cond:
+            if self._closing:
+                self._dropped += 1
+                logger.debug("outbox closed; dropping %s", name)
+                return False
+            if len(self._queue) >= self.max_size:
+                if self.policy == DROP_OLDEST:
+                    evicted = self._queue.popleft()
+                    self._dropped += 1
+                    logger.debug("outbox full; dropped oldest %s", evicted.name)
+                elif self.policy == BLOCK:
+                    self._cond.wait_for(lambda: len(self._queue) < self.max_size or self._closing, self.block_timeout)
+                if len(self._queue) >= self.max_size or self._closing:
+                    self._dropped += 1
+                    logger.debug("outbox full; rejected %s", name)
+                    return False
+            self._queue.append(_OutboxItem(name, fn))
+            self._enqueued += 1
+            self._cond.notify_all()
+        return True
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every queued item has been processed; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop accepting work, drain what is queued (up to ``timeout``) and stop the worker."""
+        self.join(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            oldest = self._queue[0].enqueued_at if self._queue else None
+            return {
+                "depth": len(self._queue),
+                "max_size": self.max_size,
+                "policy": self.policy,
+                "enqueued": self._enqueued,
+                "processed": self._processed,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "retries": self._retries,
+                "lag_seconds": time.monotonic() - oldest if oldest is not None else 0.0,
+                "last_lag_seconds": self._last_lag,
+            }
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * (0.5 + random.random() / 2)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._queue or self._closing)
+                if not self._queue:
+                    return
+                item = self._queue.popleft()
+                self._busy = True
+                self._last_lag = time.monotonic() - item.enqueued_at
+                self._cond.notify_all()
+            self._execute(item)
+
+    def _execute(self, item: _OutboxItem) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                item.fn()
+            except Exception as exc:
+                if attempt >= self.max_attempts or self._closing:
+                    with self._cond:
+                        self._failed += 1
+                    logger.debug("outbox %s failed after %s attempts: %s", item.name, attempt, exc)
+                    return
+                with self._cond:
+                    self._retries += 1
+                self._sleep(self._backoff(attempt))
+            else:
+                with self._cond:
+                    self._processed += 1
+                return
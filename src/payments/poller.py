@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pending state per transaction is one int: ``due_tick << _SHIFT | attempt``. Tick 0 marks
+# a transaction whose poll is in flight.
+_SHIFT = 8
+_MAX_ATTEMPTS = (1 << _SHIFT) - 1
+
+
+class _Wheel:
+    """One provider's schedule: txn ids bucketed by due tick, with a heap of the non-empty ticks."""
+
+    __slots__ = ("buckets", "ticks")
+
+    def __init__(self) -> None:
+        self.buckets: Dict[int, List[str]] = {}
+        self.ticks: List[int] = []
+
+    def add(self, tick: int, txn_id: str) -> bool:
+        """Schedule ``txn_id`` at ``tick``; True when ``tick`` is a new bucket."""
+        bucket = self.buckets.get(tick)
+        if bucket is None:
+            self.buckets[tick] = [txn_id]
+            heapq.heappush(self.ticks, tick)
+            return True
+        bucket.append(txn_id)
+        return False
+
+    def next_tick(self) -> int | None:
+        return self.ticks[0] if self.ticks else None
+
+
+class StatusPoller:
+    """Polls providers for transactions still ``created`` or ``authorized`` until they settle.
+
+    ``track(txn_id, provider)`` schedules a transaction. Due transactions are handed to
+    ``check(provider, txn_ids)`` in batches of up to ``batch_size`` for one provider, on a
+    pool of ``workers`` threads (at most ``workers`` batches in flight). ``check`` returns
+    ``{txn_id: settled}``; ids it leaves out count as failed polls. Unsettled and failed
+    transactions are polled again after an exponential backoff with jitter (``base_delay``
+    doubling up to ``max_delay``) and dropped after ``max_attempts`` polls.
+
+    Schedules are kept per provider in a timing wheel of ``resolution``-second ticks (see
+    :class:`_Wheel`) plus one dict of packed ints, about 100 bytes per pending transaction
+    besides its id, with a single scheduler thread however many are pending. ``forget``
+    just drops the dict entry; the stale wheel entry is skipped when its tick comes up.
+    """
+
+    def __init__(
+        self,
+        check: Callable[[str, List[str]], Dict[str, bool]],
+        *,
+        workers: int = 4,
+        batch_size: int = 100,
+        base_delay: float = 30.0,
+        max_delay: float = 900.0,
+        max_attempts: int = 30,
+        max_tracked: int = 2_000_000,
+        resolution: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.check = check
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max(1, min(max_attempts, _MAX_ATTEMPTS))
+        self.max_tracked = max_tracked
+        self.resolution = resolution
+        self._clock = clock
+        self._pending: Dict[str, int] = {}
+        self._wheels: Dict[str, _Wheel] = {}
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._closing = False
+        self._in_flight = 0
+        self._polled = 0
+        self._batches = 0
+        self._settled = 0
+        self._failures = 0
+        self._expired = 0
+        self._rejected = 0
+        self._stale = 0
+
+    def start(self) -> "StatusPoller":
+        with self._cond:
+            if self._thread is None:
+                self._closing = False
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="payments-status-poll")
+                self._thread = threading.Thread(target=self._run, name="payments-status-poller", daemon=True)
+                self._thread.start()
+        return self
+
+    def track(self, txn_id: str, provider: str, delay: float | None = None) -> bool:
+        """Poll ``txn_id`` at ``provider`` after ``delay`` (default: the first backoff step).
+
+        Returns False when it is already tracked or ``max_tracked`` transactions are.
+        """
+        with self._cond:
+            if txn_id in self._pending:
+                return False
+            if len(self._pending) >= self.max_tracked:
+                self._rejected += 1
+                return False
+            if self._schedule(provider, txn_id, 0, delay):
+                self._cond.notify()
+        return True
+
+    def forget(self, txn_id: str) -> None:
+        """Stop polling ``txn_id`` (e.g. a webhook settled it); an in-flight poll's result is ignored."""
+        with self._cond:
+            self._pending.pop(txn_id, None)
+
+    def __contains__(self, txn_id: str) -> bool:
+        return txn_id in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until nothing is tracked or in flight; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop scheduling polls and wait up to ``timeout`` for the batches in flight."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+            executor, self._executor = self._executor, None
+        if thread is not None:
+            thread.join(timeout)
+        if executor is not None:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._in_flight, timeout)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = self._tick(self._clock())
+            due = [wheel.next_tick() for wheel in self._wheels.values() if wheel.ticks]
+            overdue = max(0, now - min(due)) * self.resolution if due else 0.0
+            return {
+                "tracked": len(self._pending),
+                "max_tracked": self.max_tracked,
+                "providers": len(self._wheels),
+                "in_flight_batches": self._in_flight,
+                "workers": self.workers,
+                "polled": self._polled,
+                "batches": self._batches,
+                "settled": self._settled,
+                "failures": self._failures,
+                "expired": self._expired,
+                "rejected": self._rejected,
+                "stale_entries": self._stale,
+                "overdue_seconds": overdue,
+            }
+
+    def _tick(self, at: float) -> int:
+        return max(1, math.ceil(at / self.resolution))
+
+    def _schedule(self, provider: str, txn_id: str, attempt: int, delay: float | None = None) -> bool:
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * (2**attempt)) * (0.5 + random.random() / 2)
+        tick = self._tick(self._clock() + delay)
+        self._pending[txn_id] = tick << _SHIFT | attempt
+        wheel = self._wheels.get(provider)
+        if wheel is None:
+            wheel = self._wheels[provider] = _Wheel()
+        return wheel.add(tick, txn_id)
+
+    def _next_batch(self, now: int) -> Tuple[str, List[str]] | None:
+        # Serve the provider whose oldest due tick is earliest, so one busy provider
+        # cannot starve the others.
+        due = [(wheel.ticks[0], name) for name, wheel in self._wheels.items() if wheel.ticks and wheel.ticks[0] <= now]
+        if not due:
+            return None
+        provider = min(due)[1]
+        wheel = self._wheels[provider]
+        batch: List[str] = []
+        pending = self._pending
+        while wheel.ticks and wheel.ticks[0] <= now and len(batch) < self.batch_size:
+            tick = wheel.ticks[0]
+            bucket = wheel.buckets[tick]
+            while bucket and len(batch) < self.batch_size:
+                txn_id = bucket.pop()
+                state = pending.get(txn_id)
+                if state is None or state >> _SHIFT != tick:
+                    self._stale += 1
+                    continue
+                pending[txn_id] = state & _MAX_ATTEMPTS
+                batch.append(txn_id)
+            if not bucket:
+                del wheel.buckets[tick]
+                heapq.heappop(wheel.ticks)
+        if not wheel.ticks:
+            del self._wheels[provider]
+        return (provider, batch) if batch else None
+
+    def _wait_time(self, now: float) -> float | None:
+        ticks = [wheel.ticks[0] for wheel in self._wheels.values() if wheel.ticks]
+        if not ticks:
+            return None
+        return max(0.0, min(ticks) * self.resolution - now)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closing:
+                        return
+                    now = self._clock()
+                    work = self._next_batch(self._tick(now)) if self._in_flight < self.workers else None
+                    if work is not None:
+                        break
+                    # Sleep until the next due tick, a new earlier tick, or a free worker.
+                    self._cond.wait(self._wait_time(now) if self._in_flight < self.workers else None)
+                self._in_flight += 1
+                self._batches += 1
+                self._polled += len(work[1])
+                executor = self._executor
+            executor.submit(self._poll, *work)
+
+    def _poll(self, provider: str, txn_ids: List[str]) -> None:
+        try:
+            results = self.check(provider, txn_ids)
+        except Exception as exc:
+            logger.warning("status poll of %d %s transactions failed: %s", len(txn_ids), provider, exc)
+            results = {}
+        with self._cond:
+            try:
+                self._settle(provider, txn_ids, results)
+            finally:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def _settle(self, provider: str, txn_ids: List[str], results: Dict[str, bool]) -> None:
+        pending = self._pending
+        for txn_id in txn_ids:
+            settled = results.get(txn_id)
+            if settled:
+                self._settled += 1
+            state = pending.get(txn_id)
+            if state is None or state >> _SHIFT:
+                continue  # forgotten (e.g. settled by a webhook) while the poll was in flight
+            if settled:
+                del pending[txn_id]
+                continue
+            if settled is None:
+                self._failures += 1
+            attempt = state + 1
+            if attempt >= self.max_attempts:
+                del pending[txn_id]
+                self._expired += 1
+                logger.warning("giving up polling %s transaction %s after %d attempts", provider, txn_id, attempt)
+                continue
+            self._schedule(provider, txn_id, attempt)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+MERGE_PATCH_CONTENT_TYPE = "application/merge-patch+json"
+
+
+def merge_patch(target: Any, patch: Any) -> Any:
+    """Apply an RFC 7386 JSON merge patch to ``target`` and return the result.
+
+    Objects are merged recursively, ``null`` deletes a member and any other value
+    (including arrays) replaces the target value. ``target`` is not modified.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def upsert_instruments(payments: Any, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The ``payments.instruments`` list with ``entries`` replacing items of the same
+    ``instrument_id`` and the rest appended.
+
+    Entries found under ``payments.instruments_by_id`` (written by earlier versions of
+    :class:`ProfilePatcher`) are folded into the list too; writers then drop that key.
+    """
+    payments = payments if isinstance(payments, dict) else {}
+    instruments = payments.get("instruments") if isinstance(payments.get("instruments"), list) else []
+    legacy = payments.get("instruments_by_id") if isinstance(payments.get("instruments_by_id"), dict) else {}
+    updates = {**legacy, **{entry["instrument_id"]: entry for entry in entries}}
+    instruments = [i for i in instruments if i.get("instrument_id") not in updates]
+    instruments.extend(updates.values())
+    return instruments
+
+
+class _Batch:
+    __slots__ = ("entries", "done", "error", "leader")
+
+    def __init__(self) -> None:
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.done = threading.Event()
+        self.error: BaseException | None = None
+        self.leader = False
+
+
+class _PersonState:
+    __slots__ = ("pending", "flushing")
+
+    def __init__(self) -> None:
+        self.pending: _Batch | None = None
+        self.flushing = False
+
+
+class ProfilePatcher:
+    """Writes instrument entries into person profiles as JSON merge patches.
+
+    Each write reads the profile and sends a ``PATCH /profile/{person_id}`` with an
+    ``application/merge-patch+json`` body that replaces only ``payments.instruments`` (a
+    merge patch replaces arrays whole, so the entries are merged into the list read), and
+    leaves the rest of the profile alone. Writes for one person are serialized and
+    group-committed: entries that arrive while a write for that person is in flight (or
+    within ``window`` seconds of the first one) are sent together in the next single
+    PATCH, so concurrent registrations in this process do not overwrite each other.
+    """
+
+    def __init__(
+        self, client: Any, *, window: float = 0.0, sleep: Callable[[float], None] = time.sleep
+    ):
+        self.client = client
+        self.window = window
+        self._sleep = sleep
+        self._persons: Dict[str, _PersonState] = {}
+        self._cond = threading.Condition()
+        self.writes = 0
+        self.entries_written = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def upsert(self, person_id: str, entries: List[Dict[str, Any]]) -> None:
+        """Write ``entries`` (keyed by ``instrument_id``) and wait until they are stored.
+
+        Raises ``RuntimeError`` when the PATCH carrying them fails.
+        """
+        batch, leader = self._stage(person_id, entries, lead=True)
+        if leader:
+            if self.window > 0:
+                self._sleep(self.window)
+            self._flush(person_id, batch)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+
+    def stage(self, person_id: str, entries: List[Dict[str, Any]]) -> None:
+        """Queue ``entries`` without writing them; a later :meth:`flush` sends them."""
+        self._stage(person_id, entries, lead=False)
+
+    def flush(self, person_id: str) -> None:
+        """Send the entries staged for ``person_id``, if any (a no-op once already sent).
+
+        A failed write puts its entries back, under any staged since, and re-raises so the
+        caller (e.g. the outbox) can retry.
+        """
+        with self._cond:
+            state = self._persons.get(person_id)
+            batch = state.pending if state is not None else None
+            if batch is None or batch.leader:
+                return
+            batch.leader = True
+        self._flush(person_id, batch, restore=True)
+        if batch.error is not None:
+            raise batch.error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "writes": self.writes,
+                "entries_written": self.entries_written,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+                "pending_persons": sum(1 for s in self._persons.values() if s.pending is not None),
+            }
+
+    def _stage(self, person_id: str, entries: List[Dict[str, Any]], *, lead: bool) -> Tuple[_Batch, bool]:
+        with self._cond:
+            state = self._persons.get(person_id)
+            if state is None:
+                state = self._persons[person_id] = _PersonState()
+            batch = state.pending
+            if batch is None:
+                batch = state.pending = _Batch()
+            elif batch.entries:
+                self.coalesced += 1
+            for entry in entries:
+                batch.entries[entry["instrument_id"]] = entry
+            leader = lead and not batch.leader
+            if leader:
+                batch.leader = True
+            return batch, leader
+
+    def _flush(self, person_id: str, batch: _Batch, *, restore: bool = False) -> None:
+        with self._cond:
+            state = self._persons[person_id]
+            # One write per person at a time; whatever arrives meanwhile joins the next batch.
+            self._cond.wait_for(lambda: not state.flushing)
+            if state.pending is batch:
+                state.pending = None
+            state.flushing = True
+        try:
+            self._write(person_id, batch.entries)
+        except BaseException as exc:
+            batch.error = exc
+        with self._cond:
+            state.flushing = False
+            if batch.error is None:
+                self.writes += 1
+                self.entries_written += len(batch.entries)
+            else:
+                self.failures += 1
+                if restore:
+                    retry = state.pending
+                    if retry is None:
+                        retry = state.pending = _Batch()
+                    retry.entries = {**batch.entries, **retry.entries}
+            if state.pending is None:
+                del self._persons[person_id]
+            self._cond.notify_all()
+        batch.done.set()
+
+    def _write(self, person_id: str, entries: Dict[str, Dict[str, Any]]) -> None:
+        ok, status, body = self.client.get(f"/profile/{person_id}")
+        if not ok and status != 404:
+            # Never patch a list we failed to read.
+            raise RuntimeError(f"profile read failed: status={status}")
+        profile = body.get("profile") if ok and isinstance(body, dict) else None
+        payments = profile.get("payments") if isinstance(profile, dict) else None
+        update: Dict[str, Any] = {"instruments": upsert_instruments(payments, entries.values())}
+        if isinstance(payments, dict) and "instruments_by_id" in payments:
+            update["instruments_by_id"] = None
+        patch = {"profile": {"payments": update}}
+        ok, status, _ = self.client.patch(
+            f"/profile/{person_id}", patch, headers={"Content-Type": MERGE_PATCH_CONTENT_TYPE}
+        )
+        if not ok:
+            raise RuntimeError(f"profile patch failed: status={status}")
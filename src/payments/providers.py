@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
+import threading
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Protocol, runtime_checkable
+
+from anyio import from_thread
+from fastapi.concurrency import run_in_threadpool
 
 from .models import PaymentInstrument, PaymentTransaction, PaymentTransactionRequest, PaymentStatus
+from .store import InMemoryTransactionStore, TransactionStore
 
 
 class PaymentProvider:
     """Provider interface for payment operations."""
 
     name: str = "mock"
+    # Providers that only touch local memory set this to False so the async path calls
+    # them inline instead of hopping to a worker thread.
+    blocking: bool = True
 
     def register_instrument(self, instrument: PaymentInstrument) -> PaymentInstrument:  # pragma: no cover - interface
         raise NotImplementedError
@@ -23,14 +33,122 @@ class PaymentProvider:
     def handle_webhook(self, payload: Dict[str, Any]) -> PaymentTransaction:  # pragma: no cover - interface
         raise NotImplementedError
 
+    def verify_webhook(self, raw_body: bytes, headers: Mapping[str, str]) -> bool:
+        """Authenticate a delivery (e.g. check its signature) before it is accepted."""
+        return True
+
+
+@runtime_checkable
+class AsyncPaymentProvider(Protocol):
+    """Provider interface for non-blocking payment operations."""
+
+    name: str
+
+    async def register_instrument(self, instrument: PaymentInstrument) -> PaymentInstrument: ...
+
+    async def create_transaction(self, request: PaymentTransactionRequest) -> PaymentTransaction: ...
+
+    async def get_status(self, txn_id: str) -> PaymentTransaction: ...
+
+    async def handle_webhook(self, payload: Dict[str, Any]) -> PaymentTransaction: ...
+
+
+def is_async_provider(provider: Any) -> bool:
+    return inspect.iscoroutinefunction(getattr(provider, "create_transaction", None))
+
+
+class SyncProviderAdapter:
+    """Exposes a sync :class:`PaymentProvider` as an :class:`AsyncPaymentProvider`.
+
+    Blocking providers run in the threadpool; non-blocking ones are called inline.
+    """
+
+    def __init__(self, provider: PaymentProvider):
+        self.provider = provider
+        self.name = provider.name
+
+    async def _call(self, fn, *args):
+        if getattr(self.provider, "blocking", True):
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def register_instrument(self, instrument: PaymentInstrument) -> PaymentInstrument:
+        return await self._call(self.provider.register_instrument, instrument)
+
+    async def create_transaction(self, request: PaymentTransactionRequest) -> PaymentTransaction:
+        return await self._call(self.provider.create_transaction, request)
+
+    async def get_status(self, txn_id: str) -> PaymentTransaction:
+        return await self._call(self.provider.get_status, txn_id)
+
+    async def handle_webhook(self, payload: Dict[str, Any]) -> PaymentTransaction:
+        return await self._call(self.provider.handle_webhook, payload)
+
+
+class AsyncProviderAdapter(PaymentProvider):
+    """Exposes an :class:`AsyncPaymentProvider` to sync code paths.
+
+    From worker threads started by the async app (e.g. via ``run_in_threadpool``, as the
+    bulk endpoints do) calls are sent back to the app's event loop. Other threads, such as
+    the webhook workers, have no loop to return to and run each call on a fresh one.
+    """
+
+    def __init__(self, provider: AsyncPaymentProvider):
+        self.provider = provider
+        self.name = provider.name
+        self._threads = threading.local()
+
+    def _run(self, fn, *args):
+        in_worker = getattr(self._threads, "in_worker", None)
+        if in_worker is None:
+            try:
+                from_thread.run_sync(_noop)
+                in_worker = True
+            except RuntimeError:
+                in_worker = False
+            self._threads.in_worker = in_worker
+        if in_worker:
+            return from_thread.run(fn, *args)
+        return asyncio.run(fn(*args))
+
+    def register_instrument(self, instrument: PaymentInstrument) -> PaymentInstrument:
+        return self._run(self.provider.register_instrument, instrument)
+
+    def create_transaction(self, request: PaymentTransactionRequest) -> PaymentTransaction:
+        return self._run(self.provider.create_transaction, request)
+
+    def get_status(self, txn_id: str) -> PaymentTransaction:
+        return self._run(self.provider.get_status, txn_id)
+
+    def handle_webhook(self, payload: Dict[str, Any]) -> PaymentTransaction:
+        return self._run(self.provider.handle_webhook, payload)
+
+    def verify_webhook(self, raw_body: bytes, headers: Mapping[str, str]) -> bool:
+        verify = getattr(self.provider, "verify_webhook", None)
+        return verify(raw_body, headers) if verify is not None else True
+
+
+def _noop() -> None:
+    return None
+
+
+def as_async_provider(provider: PaymentProvider | AsyncPaymentProvider) -> AsyncPaymentProvider:
+    return provider if is_async_provider(provider) else SyncProviderAdapter(provider)
+
+
+def as_sync_provider(provider: PaymentProvider | AsyncPaymentProvider) -> PaymentProvider:
+    return AsyncProviderAdapter(provider) if is_async_provider(provider) else provider
+
 
 class MockPaymentProvider(PaymentProvider):
     """In-memory provider for dev/test flows."""
 
     name = "mock"
+    blocking = False
 
-    def __init__(self):
-        self._transactions: Dict[str, PaymentTransaction] = {}
+    def __init__(self, store: TransactionStore | None = None):
+        # Pass the service's store to avoid keeping every transaction twice.
+        self._transactions = store if store is not None else InMemoryTransactionStore()
 
     def register_instrument(self, instrument: PaymentInstrument) -> PaymentInstrument:
         # No-op; return as-is
@@ -42,7 +160,8 @@ class MockPaymentProvider(PaymentProvider):
             txn_id=txn_id,
             person_id=request.person_id,
             instrument_id=request.instrument_id,
-            amount=request.amount,
+            amount=None,
+            amount_minor=request.amount_minor,
             currency=request.currency,
             status=PaymentStatus.SUCCEEDED,
             description=request.description,
@@ -50,13 +169,14 @@ class MockPaymentProvider(PaymentProvider):
             provider=self.name,
             authorization_context=request.authorization_context,
         )
-        self._transactions[txn_id] = txn
+        self._transactions.put(txn)
         return txn
 
     def get_status(self, txn_id: str) -> PaymentTransaction:
-        if txn_id not in self._transactions:
+        txn = self._transactions.get(txn_id)
+        if txn is None:
             raise KeyError("transaction not found")
-        return self._transactions[txn_id]
+        return txn
 
     def handle_webhook(self, payload: Dict[str, Any]) -> PaymentTransaction:
         # Mock provider trusts incoming payload; real providers should verify signature.
@@ -66,12 +186,12 @@ class MockPaymentProvider(PaymentProvider):
             txn_id=txn_id,
             person_id=payload.get("person_id", "unknown"),
             instrument_id=payload.get("instrument_id", "unknown"),
-            amount=float(payload.get("amount", 0)),
+            amount=payload.get("amount", 0),
             currency=payload.get("currency", "USD"),
             status=PaymentStatus(status) if isinstance(status, str) else status,
             description=payload.get("description"),
             counterparty=payload.get("counterparty"),
             provider=self.name,
         )
-        self._transactions[txn_id] = txn
+        self._transactions.put(txn)
         return txn
@@ -0,0 +1,357 @@
+"""Reconcile stored transactions against a provider settlement file.
+
+The file (CSV with a header row, or NDJSON) is parsed lazily into
+:class:`SettlementRecord` tuples, matched against the store in batches of ``txn_id``
+lookups and turned into a stream of discrepancy dicts, so memory stays bounded by the
+batch size whatever the file size. Run ``python -m payments.reconcile --help`` for the
+command line; the API exposes the same pipeline at ``POST /payments/reconciliations``.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sys
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+from .models import PaymentStatus, PaymentTransaction
+from .money import to_major, to_minor
+from .responses import orjson
+from .store import TransactionQuery, TransactionStore, iter_query, status_value
+
+logger = logging.getLogger(__name__)
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Column / key names accepted for each field, first match wins.
+_FIELD_ALIASES: Dict[str, Sequence[str]] = {
+    "txn_id": ("txn_id", "transaction_id", "reference", "id"),
+    "amount": ("amount", "settled_amount", "gross_amount"),
+    "currency": ("currency", "settled_currency"),
+    "status": ("status", "settlement_status", "state"),
+}
+# Provider settlement vocabularies mapped onto PaymentStatus values; anything else is not compared.
+_STATUS_ALIASES = {
+    "settled": "succeeded",
+    "paid": "succeeded",
+    "captured": "succeeded",
+    "completed": "succeeded",
+    "declined": "failed",
+    "rejected": "failed",
+    "reversed": "failed",
+}
+_STATUSES = {status.value for status in PaymentStatus}
+
+
+class SettlementRecord(NamedTuple):
+    line: int
+    txn_id: str | None
+    amount: Decimal | None
+    currency: str | None
+    status: str | None
+    error: str | None = None
+
+
+def _amount(value: Any) -> Decimal | None:
+    """The exact settled amount: text is parsed as written, JSON numbers through their repr."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"invalid amount {value!r}")
+    try:
+        amount = Decimal(repr(value) if isinstance(value, float) else str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid amount {value!r}") from None
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount {value!r}")
+    return amount
+
+
+def _major(amount: Decimal | None) -> float | None:
+    # Reports stay JSON numbers, like the stored amounts beside them.
+    return float(amount) if amount is not None else None
+
+
+def _currency(value: Any) -> str | None:
+    return value.upper() if value else None
+
+
+def _status(value: Any) -> str | None:
+    if not value:
+        return None
+    value = value.lower()
+    value = _STATUS_ALIASES.get(value, value)
+    return value if value in _STATUSES else None
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[SettlementRecord]:
+    """Records from CSV text lines; the header row names the columns (see ``_FIELD_ALIASES``)."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [name.strip().lower() for name in header]
+    columns = {field: next((names.index(a) for a in aliases if a in names), None) for field, aliases in _FIELD_ALIASES.items()}
+    if columns["txn_id"] is None:
+        raise ValueError(f"settlement file has no txn_id column (expected one of {', '.join(_FIELD_ALIASES['txn_id'])})")
+    txn_col, amount_col, currency_col, status_col = (columns[f] for f in ("txn_id", "amount", "currency", "status"))
+    for row in reader:
+        if not row:
+            continue
+        try:
+            yield SettlementRecord(
+                reader.line_num,
+                row[txn_col] or None,
+                _amount(row[amount_col]) if amount_col is not None else None,
+                _currency(row[currency_col]) if currency_col is not None else None,
+                _status(row[status_col]) if status_col is not None else None,
+            )
+        except (IndexError, ValueError) as exc:
+            yield SettlementRecord(reader.line_num, None, None, None, None, f"unreadable row: {exc}")
+
+
+def _pick(document: Dict[str, Any], field: str) -> Any:
+    for alias in _FIELD_ALIASES[field]:
+        if alias in document:
+            return document[alias]
+    return None
+
+
+def parse_ndjson(lines: Iterable[bytes | str]) -> Iterator[SettlementRecord]:
+    """Records from NDJSON lines, one settlement object per line; blank lines are skipped."""
+    for line, raw in enumerate(lines, 1):
+        if not raw.strip():
+            continue
+        try:
+            document = _loads(raw)
+            if not isinstance(document, dict):
+                raise ValueError("expected a JSON object")
+            txn_id = _pick(document, "txn_id")
+            yield SettlementRecord(
+                line,
+                str(txn_id) if txn_id is not None else None,
+                _amount(_pick(document, "amount")),
+                _currency(_pick(document, "currency")),
+                _status(_pick(document, "status")),
+            )
+        except (TypeError, ValueError) as exc:
+            yield SettlementRecord(line, None, None, None, None, f"unreadable line: {exc}")
+
+
+def detect_format(hint: str | None) -> str:
+    """``ndjson`` or ``csv`` from a file name or content type (CSV when unsure)."""
+    hint = (hint or "").lower()
+    return "ndjson" if any(marker in hint for marker in ("ndjson", "jsonl", "json")) else "csv"
+
+
+def read_settlement(stream: IO[bytes], fmt: str) -> Iterator[SettlementRecord]:
+    """Parse a binary settlement stream (``fmt`` is ``csv`` or ``ndjson``) lazily."""
+    if fmt == "ndjson":
+        return parse_ndjson(stream)
+    if fmt != "csv":
+        raise ValueError(f"unknown settlement format {fmt!r}")
+    return parse_csv(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+
+
+def _batches(records: Iterable[SettlementRecord], size: int) -> Iterator[List[SettlementRecord]]:
+    iterator = iter(records)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _local(txn: PaymentTransaction) -> Dict[str, Any]:
+    return {"amount": txn.amount, "currency": txn.currency, "status": status_value(txn.status)}
+
+
+class Reconciler:
+    """Matches settlement records against ``store`` by ``txn_id``, amount, currency and status.
+
+    ``run`` yields one dict per discrepancy:
+
+    - ``missing``: settled by the provider but not stored here;
+    - ``mismatch``: stored with a different amount, currency or status (``fields`` holds
+      the local and settled values);
+    - ``extra``: stored here, inside ``created_after``/``created_before``, but absent from
+      the file (only checked when a window is given; the file's IDs are then kept in memory);
+    - ``invalid``: a line that could not be parsed.
+
+    Amounts are compared in integer minor units of the stored currency: a settled amount
+    is rounded to the currency's minor unit and must be within ``tolerance`` units (exact
+    by default) of the stored one. With ``apply`` (e.g.
+    ``PaymentService.apply_settled_status``), a status mismatch on an otherwise matching
+    transaction is corrected and reported with ``fixed: true``. Counts are kept in ``summary``.
+    """
+
+    def __init__(
+        self,
+        store: TransactionStore,
+        *,
+        apply: Callable[[PaymentTransaction, str], Any] | None = None,
+        batch_size: int = 1000,
+        tolerance: int = 0,
+    ):
+        self.store = store
+        self.apply = apply
+        self.batch_size = max(1, batch_size)
+        self.tolerance = max(0, tolerance)
+        self.summary: Dict[str, int] = dict.fromkeys(
+            ("records", "matched", "missing", "mismatched", "extra", "invalid", "fixed", "fix_failed"), 0
+        )
+
+    def run(
+        self,
+        records: Iterable[SettlementRecord],
+        *,
+        created_after: float | None = None,
+        created_before: float | None = None,
+    ) -> Iterator[Dict[str, Any]]:
+        seen: set | None = set() if created_after is not None or created_before is not None else None
+        for batch in _batches(records, self.batch_size):
+            ids = [record.txn_id for record in batch if record.txn_id is not None]
+            if seen is not None:
+                seen.update(ids)
+            yield from self._compare(batch, self.store.get_summaries(ids))
+        if seen is not None:
+            yield from self._extras(seen, created_after, created_before)
+
+    def _compare(self, batch: List[SettlementRecord], stored: Dict[str, Tuple[int, str, str]]) -> Iterator[Dict[str, Any]]:
+        summary = self.summary
+        summary["records"] += len(batch)
+        matched = 0
+        tolerance = self.tolerance
+        for record in batch:
+            if record.txn_id is None:
+                summary["invalid"] += 1
+                yield {"kind": "invalid", "line": record.line, "error": record.error or "missing txn_id"}
+                continue
+            local = stored.get(record.txn_id)
+            if local is None:
+                summary["missing"] += 1
+                settled = {"amount": _major(record.amount), "currency": record.currency, "status": record.status}
+                yield {"kind": "missing", "line": record.line, "txn_id": record.txn_id, "settled": settled}
+                continue
+            amount_minor, currency, status = local
+            fields: Dict[str, Dict[str, Any]] = {}
+            if record.amount is not None and abs(amount_minor - to_minor(record.amount, currency)) > tolerance:
+                fields["amount"] = {"local": to_major(amount_minor, currency), "settled": _major(record.amount)}
+            if record.currency is not None and currency.upper() != record.currency:
+                fields["currency"] = {"local": currency, "settled": record.currency}
+            if record.status is not None and status != record.status:
+                fields["status"] = {"local": status, "settled": record.status}
+            if not fields:
+                matched += 1
+                continue
+            summary["mismatched"] += 1
+            discrepancy = {"kind": "mismatch", "line": record.line, "txn_id": record.txn_id, "fields": fields}
+            if self.apply is not None and list(fields) == ["status"]:
+                discrepancy["fixed"] = self._fix(record.txn_id, record.status)
+            yield discrepancy
+        summary["matched"] += matched
+
+    def _fix(self, txn_id: str, status: str) -> bool:
+        try:
+            txn = self.store.get(txn_id)
+            if txn is None:
+                raise LookupError("transaction disappeared")
+            self.apply(txn, status)
+        except Exception as exc:
+            logger.warning("reconciliation could not update %s to %s: %s", txn_id, status, exc)
+            self.summary["fix_failed"] += 1
+            return False
+        self.summary["fixed"] += 1
+        return True
+
+    def _extras(self, seen: set, created_after: float | None, created_before: float | None) -> Iterator[Dict[str, Any]]:
+        query = TransactionQuery(created_after=created_after, created_before=created_before, limit=1000)
+        for txn in iter_query(self.store, query):
+            if txn.txn_id not in seen:
+                self.summary["extra"] += 1
+                yield {"kind": "extra", "txn_id": txn.txn_id, "local": _local(txn)}
+
+
+def reconcile(
+    records: Iterable[SettlementRecord],
+    store: TransactionStore,
+    *,
+    apply: Callable[[PaymentTransaction, str], Any] | None = None,
+    created_after: float | None = None,
+    created_before: float | None = None,
+    max_discrepancies: int = 100,
+) -> Dict[str, Any]:
+    """Run a reconciliation and return the summary with the first ``max_discrepancies`` discrepancies."""
+    reconciler = Reconciler(store, apply=apply)
+    discrepancies: List[Dict[str, Any]] = []
+    total = 0
+    for discrepancy in reconciler.run(records, created_after=created_after, created_before=created_before):
+        total += 1
+        if len(discrepancies) < max_discrepancies:
+            discrepancies.append(discrepancy)
+    return {"summary": reconciler.summary, "discrepancies": discrepancies, "truncated": total > len(discrepancies)}
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m payments.reconcile",
+        description="Compare the ledger with a provider settlement file. Discrepancies are written as NDJSON, "
+        "the summary to stderr; exits 1 when there are any.",
+    )
+    parser.add_argument("file", help="settlement file (CSV or NDJSON), or - for stdin")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="default: from the file name")
+    parser.add_argument("--ledger", default=os.getenv("UNISON_PAYMENTS_LEDGER_PATH"), help="SQLite ledger path")
+    parser.add_argument("--fix", action="store_true", help="apply settled statuses (emits transaction events)")
+    parser.add_argument("--created-after", type=float, help="report stored transactions missing from the file from here")
+    parser.add_argument("--created-before", type=float)
+    parser.add_argument("--output", help="discrepancies file (default stdout)")
+    args = parser.parse_args(argv)
+    if not args.ledger:
+        parser.error("--ledger or UNISON_PAYMENTS_LEDGER_PATH is required")
+
+    from .ledger import SQLiteLedger
+
+    ledger = SQLiteLedger(args.ledger)
+    store: TransactionStore = ledger
+    apply = service = event_client = None
+    if args.fix:
+        from .api import build_payment_service
+        from .clients import ServiceHttpClient
+
+        event_client = ServiceHttpClient.from_env("UNISON_CONTEXT_GRAPH")
+        service = build_payment_service(event_client=event_client, ledger=ledger)
+        store = service.transactions
+        apply = service.apply_settled_status
+
+    stream = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    reconciler = Reconciler(store, apply=apply)
+    try:
+        records = read_settlement(stream, args.format or detect_format(args.file))
+        for discrepancy in reconciler.run(
+            records, created_after=args.created_after, created_before=args.created_before
+        ):
+            output.write(json.dumps(discrepancy, separators=(",", ":")) + "\n")
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        if output is not sys.stdout:
+            output.close()
+        if service is not None:
+            service.close()
+        else:
+            ledger.close()
+        if event_client is not None:
+            event_client.close()
+    summary = reconciler.summary
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if any(summary[key] for key in ("missing", "mismatched", "extra", "invalid")) else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,461 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import inspect
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List
+
+from .clients import ClientSettings
+from .providers import AsyncPaymentProvider, AsyncProviderAdapter, PaymentProvider, is_async_provider
+from .resilience import AdaptiveLimiter, CircuitBreaker, CircuitOpen
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "unison_payments.providers"
+BUILTIN_PROVIDERS: Dict[str, str] = {"mock": "payments.providers:MockPaymentProvider"}
+
+
+class UnknownProvider(ValueError):
+    """No provider is registered (or installed) under the requested name."""
+
+
+class ProviderBusy(Exception):
+    """The provider stayed at its concurrency limit for the whole ``queue_timeout``."""
+
+
+class ProviderTimeout(Exception):
+    """The provider did not answer within its timeout budget."""
+
+
+def _load_target(target: str | Callable[..., Any]) -> Callable[..., Any]:
+    if callable(target):
+        return target
+    module_name, _, attr = target.partition(":")
+    obj: Any = importlib.import_module(module_name)
+    for part in attr.split(".") if attr else ():
+        obj = getattr(obj, part)
+    return obj
+
+
+def _env_prefix(name: str) -> str:
+    return "UNISON_PAYMENTS_PROVIDER_" + "".join(c if c.isalnum() else "_" for c in name.upper())
+
+
+class RoutedProvider:
+    """One registered provider with its own concurrency limit, timeout and worker threads.
+
+    Implements :class:`AsyncPaymentProvider`; ``sync`` is the :class:`PaymentProvider`
+    view used by threadpool code paths. Both paths share the in-flight limit: calls over
+    ``max_concurrency`` wait up to ``queue_timeout`` seconds for a slot (by default the
+    call ``timeout``, or indefinitely without one; ``0`` fails fast) before raising
+    :class:`ProviderBusy`, and calls exceeding ``timeout`` raise :class:`ProviderTimeout`.
+    A call that timed out keeps its slot until the provider call actually returns, so the
+    limit bounds real concurrency. Blocking providers run on a private pool of
+    ``max_concurrency`` threads, never the shared Starlette threadpool. The provider
+    itself is built on first use.
+
+    With a ``limiter`` the in-flight cap follows :class:`AdaptiveLimiter` (never above
+    ``max_concurrency``); with a ``breaker`` calls fail fast with :class:`CircuitOpen`
+    while the provider is failing. Lookup errors (``KeyError``/``ValueError``) are
+    answers, not provider failures, and do not count against the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        *,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+        queue_timeout: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        limiter: AdaptiveLimiter | None = None,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.queue_timeout = timeout if queue_timeout is None else queue_timeout
+        self.breaker = breaker
+        self.limiter = limiter
+        self._factory = factory
+        self._provider: Any = None
+        self._adapter: AsyncProviderAdapter | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        # Called as on_call(provider, method, latency, error) after every provider call.
+        self.on_call: Callable[[str, str, float, BaseException | None], None] | None = None
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.sync = _SyncView(self)
+
+    @property
+    def loaded(self) -> bool:
+        return self._provider is not None
+
+    def load(self) -> Any:
+        if self._provider is None:
+            with self._lock:
+                if self._provider is None:
+                    provider = self._factory()
+                    if is_async_provider(provider):
+                        self._adapter = AsyncProviderAdapter(provider)
+                    elif getattr(provider, "blocking", True):
+                        # Unlimited providers get as many threads as Starlette's default threadpool.
+                        workers = self.max_concurrency or 40
+                        self._executor = ThreadPoolExecutor(workers, thread_name_prefix=f"payments-{self.name}")
+                    self._provider = provider
+                    logger.info("payment provider '%s' loaded", self.name)
+        return self._provider
+
+    # AsyncPaymentProvider -----------------------------------------------------------
+
+    async def register_instrument(self, instrument):
+        return await self.call("register_instrument", instrument)
+
+    async def create_transaction(self, request):
+        return await self.call("create_transaction", request)
+
+    async def get_status(self, txn_id):
+        return await self.call("get_status", txn_id)
+
+    async def handle_webhook(self, payload):
+        return await self.call("handle_webhook", payload)
+
+    async def call(self, method: str, *args: Any) -> Any:
+        provider = self.load()
+        await self._aacquire()
+        start = time.perf_counter()
+        error: BaseException | None = None
+        running: Future | None = None
+        try:
+            if self._adapter is not None:
+                return await asyncio.wait_for(getattr(provider, method)(*args), self.timeout)
+            fn = getattr(provider, method)
+            if self._executor is None:
+                return fn(*args)
+            running = self._executor.submit(fn, *args)
+            return await asyncio.wait_for(asyncio.wrap_future(running), self.timeout)
+        except asyncio.TimeoutError:
+            error = self._timeout_error()
+            raise error from None
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._release(method, time.perf_counter() - start, error, running)
+
+    def call_sync(self, method: str, *args: Any) -> Any:
+        provider = self.load()
+        self._acquire()
+        start = time.perf_counter()
+        error: BaseException | None = None
+        running: Future | None = None
+        try:
+            if self._adapter is not None:
+                return self._adapter._run(self._bounded, getattr(provider, method), *args)
+            fn = getattr(provider, method)
+            if self._executor is None:
+                return fn(*args)
+            running = self._executor.submit(fn, *args)
+            return running.result(self.timeout)
+        except (asyncio.TimeoutError, FutureTimeout):
+            error = self._timeout_error()
+            raise error from None
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._release(method, time.perf_counter() - start, error, running)
+
+    async def _bounded(self, fn, *args):
+        return await asyncio.wait_for(fn(*args), self.timeout)
+
+    def verify_webhook(self, raw_body: bytes, headers) -> bool:
+        verify = getattr(self.load(), "verify_webhook", None)
+        return verify(raw_body, headers) if verify is not None else True
+
+    @property
+    def limit(self) -> int | None:
+        if self.limiter is None:
+            return self.max_concurrency
+        if self.max_concurrency is None:
+            return self.limiter.limit
+        return min(self.limiter.limit, self.max_concurrency)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "loaded": self.loaded,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            "queue_timeout": self.queue_timeout,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+        if self.limiter is not None:
+            stats["limiter"] = self.limiter.stats()
+        if self.breaker is not None:
+            stats["breaker"] = self.breaker.stats()
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            provider, self._provider = self._provider, None
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        close = getattr(provider, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as exc:
+                logger.debug("closing provider '%s' failed: %s", self.name, exc)
+
+    def _has_slot(self) -> bool:
+        limit = self.limit
+        return limit is None or self.in_flight < limit
+
+    def _admit(self) -> None:
+        # Called with _lock held once a slot is free.
+        if self.breaker is not None and not self.breaker.allow():
+            raise CircuitOpen(f"provider '{self.name}' circuit is open", self.breaker.retry_after())
+        self.in_flight += 1
+        self.calls += 1
+
+    def _busy(self) -> ProviderBusy:
+        self.rejected += 1
+        return ProviderBusy(f"provider '{self.name}' is at its concurrency limit")
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if not self._has_slot() and not self._slots.wait_for(self._has_slot, self.queue_timeout):
+                raise self._busy()
+            self._admit()
+
+    async def _aacquire(self) -> None:
+        # Poll rather than park on _slots, which would block the event loop.
+        deadline = None if self.queue_timeout is None else time.monotonic() + self.queue_timeout
+        delay = 0.001
+        while True:
+            with self._lock:
+                if self._has_slot():
+                    self._admit()
+                    return
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise self._busy()
+            await asyncio.sleep(delay if remaining is None else min(delay, remaining))
+            delay = min(delay * 2, 0.02)
+
+    def _free_slot(self, _future: Future | None = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._slots.notify()
+
+    def _release(
+        self, method: str, latency: float, error: BaseException | None, running: Future | None = None
+    ) -> None:
+        failed = isinstance(error, Exception) and not isinstance(error, (LookupError, ValueError))
+        with self._lock:
+            if running is None:
+                self.in_flight -= 1
+                self._slots.notify()
+            in_flight = self.in_flight
+            if isinstance(error, ProviderTimeout):
+                self.timeouts += 1
+        if running is not None:
+            # A worker thread still running the call keeps its slot until it returns
+            # (the callback runs right away if it already has).
+            running.add_done_callback(self._free_slot)
+        if self.breaker is not None:
+            # Lookup/validation errors are answers from a healthy provider; anything that is
+            # not an Exception (cancellation, interpreter exit) says nothing either way, so it
+            # only returns the probe slot it may hold.
+            if error is None or isinstance(error, Exception):
+                self.breaker.record(not failed)
+            else:
+                self.breaker.release_probe()
+        if self.limiter is not None:
+            self.limiter.on_sample(latency, not failed, in_flight)
+        if self.on_call is not None:
+            self.on_call(self.name, method, latency, error)
+
+    def _timeout_error(self) -> ProviderTimeout:
+        return ProviderTimeout(f"provider '{self.name}' timed out after {self.timeout}s")
+
+
+class _SyncView(PaymentProvider):
+    def __init__(self, routed: RoutedProvider):
+        self._routed = routed
+        self.name = routed.name
+
+    def register_instrument(self, instrument):
+        return self._routed.call_sync("register_instrument", instrument)
+
+    def create_transaction(self, request):
+        return self._routed.call_sync("create_transaction", request)
+
+    def get_status(self, txn_id):
+        return self._routed.call_sync("get_status", txn_id)
+
+    def handle_webhook(self, payload):
+        return self._routed.call_sync("handle_webhook", payload)
+
+    def verify_webhook(self, raw_body, headers):
+        return self._routed.verify_webhook(raw_body, headers)
+
+
+class ProviderRegistry:
+    """Named payment providers, built lazily and routed by name.
+
+    Providers are registered as factories (a callable or a ``"module:attr"`` import path),
+    so nothing is imported until a request needs it. Names not registered explicitly are
+    looked up in the ``unison_payments.providers`` entry point group on first use. Factories
+    receive ``store`` and ``client_settings`` (the provider's own HTTP pool settings, read
+    from ``UNISON_PAYMENTS_PROVIDER_<NAME>_*``) when their signature accepts them.
+    """
+
+    def __init__(self, default: str = "mock", *, store: Any | None = None):
+        self.default = default
+        self.store = store
+        self._providers: Dict[str, RoutedProvider] = {}
+        self._missing: set = set()
+        self._lock = threading.Lock()
+        self._on_call: Callable[[str, str, float, BaseException | None], None] | None = None
+
+    def register(
+        self,
+        name: str,
+        factory: str | Callable[..., Any],
+        *,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+        queue_timeout: float | None = None,
+        breaker: CircuitBreaker | None = None,
+        limiter: AdaptiveLimiter | None = None,
+        options: Dict[str, Any] | None = None,
+    ) -> RoutedProvider:
+        routed = RoutedProvider(
+            name,
+            lambda: self._build(name, factory, options or {}),
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            queue_timeout=queue_timeout,
+            breaker=breaker,
+            limiter=limiter,
+        )
+        routed.on_call = self._on_call
+        with self._lock:
+            self._providers[name] = routed
+        return routed
+
+    def add(self, provider: PaymentProvider | AsyncPaymentProvider, **limits: Any) -> RoutedProvider:
+        """Register an already-built provider under its ``name``."""
+        return self.register(provider.name, lambda: provider, **limits)
+
+    def get(self, name: str | None = None) -> RoutedProvider:
+        """The provider registered as ``name`` (the default when None); raises :class:`UnknownProvider`."""
+        name = name or self.default
+        routed = self._providers.get(name)
+        if routed is None:
+            routed = self._discover(name)
+        if routed is None:
+            raise UnknownProvider(f"unknown provider '{name}'")
+        return routed
+
+    def observe(self, callback: Callable[[str, str, float, BaseException | None], None] | None) -> None:
+        """Report every provider call as ``callback(provider, method, latency, error)``."""
+        with self._lock:
+            self._on_call = callback
+            for routed in self._providers.values():
+                routed.on_call = callback
+
+    def names(self) -> List[str]:
+        return list(self._providers)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._providers
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: routed.stats() for name, routed in list(self._providers.items())}
+
+    def close(self) -> None:
+        for routed in list(self._providers.values()):
+            routed.close()
+
+    @classmethod
+    def from_env(cls, *, store: Any | None = None) -> "ProviderRegistry":
+        """Build from ``UNISON_PAYMENTS_PROVIDER`` (default) and ``UNISON_PAYMENTS_PROVIDERS``.
+
+        ``UNISON_PAYMENTS_PROVIDERS`` is a comma-separated list of ``name`` or
+        ``name=module:attr`` entries; per-provider limits come from
+        ``UNISON_PAYMENTS_PROVIDER_<NAME>_MAX_CONCURRENCY``, ``_TIMEOUT``, ``_QUEUE_TIMEOUT``,
+        ``_ADAPTIVE``, ``_BREAKER_FAILURES`` and ``_BREAKER_RESET``.
+        """
+        registry = cls(os.getenv("UNISON_PAYMENTS_PROVIDER", "mock"), store=store)
+        entries = [e.strip() for e in os.getenv("UNISON_PAYMENTS_PROVIDERS", "").split(",") if e.strip()]
+        targets = dict(BUILTIN_PROVIDERS)
+        for entry in entries:
+            name, _, target = entry.partition("=")
+            if target:
+                targets[name.strip()] = target.strip()
+        for name in {registry.default, *targets}:
+            if name in targets:
+                registry.register(name, targets[name], **registry._limits_from_env(name))
+        return registry
+
+    @staticmethod
+    def _limits_from_env(name: str) -> Dict[str, Any]:
+        prefix = _env_prefix(name)
+        max_concurrency = int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "32"))
+        timeout = float(os.getenv(f"{prefix}_TIMEOUT", "30"))
+        limits: Dict[str, Any] = {"max_concurrency": max_concurrency or None, "timeout": timeout or None}
+        queue_timeout = os.getenv(f"{prefix}_QUEUE_TIMEOUT")
+        if queue_timeout:
+            limits["queue_timeout"] = float(queue_timeout)
+        if os.getenv(f"{prefix}_ADAPTIVE", "true").lower() in {"1", "true", "yes", "on"}:
+            limits["limiter"] = AdaptiveLimiter(
+                initial=min(16, max_concurrency or 16), max_limit=max_concurrency or 256
+            )
+        failures = int(os.getenv(f"{prefix}_BREAKER_FAILURES", "5"))
+        if failures > 0:
+            limits["breaker"] = CircuitBreaker(
+                failure_threshold=failures, reset_timeout=float(os.getenv(f"{prefix}_BREAKER_RESET", "30"))
+            )
+        return limits
+
+    def _build(self, name: str, factory: str | Callable[..., Any], options: Dict[str, Any]) -> Any:
+        target = _load_target(factory)
+        kwargs = dict(options)
+        try:
+            params = inspect.signature(target).parameters
+        except (TypeError, ValueError):
+            params = {}
+        if "store" in params and self.store is not None:
+            kwargs.setdefault("store", self.store)
+        if "client_settings" in params:
+            kwargs.setdefault("client_settings", ClientSettings.from_env(_env_prefix(name)))
+        return target(**kwargs)
+
+    def _discover(self, name: str) -> RoutedProvider | None:
+        if name in self._missing:
+            return None
+        from importlib.metadata import entry_points
+
+        for entry in entry_points(group=ENTRY_POINT_GROUP):
+            if entry.name == name:
+                return self.register(name, entry.value, **self._limits_from_env(name))
+        # Remember misses so unknown names (e.g. bogus webhook paths) do not rescan entry points.
+        with self._lock:
+            if len(self._missing) < 1024:
+                self._missing.add(name)
+        return None
@@ -0,0 +1,267 @@
+"""Transaction totals by person, currency and day over a columnar snapshot of the store.
+
+``snapshot`` scans the store once into a few integer columns (persons and currencies are
+dictionary-encoded); ``totals`` groups them with NumPy array operations when it is
+installed and with a plain dict otherwise. Both paths give identical results: amounts are
+summed exactly as integer minor units per currency, and an optional :class:`FXRates`
+table converts each group total in one pass before groups in different currencies are
+combined.
+"""
+from __future__ import annotations
+
+import datetime
+import importlib.util
+from array import array
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from .money import exponent
+from .store import TransactionStore
+
+# numpy is optional (totals fall back to a pure-Python group-by); ``totals`` imports it
+# on first use. Tests and benchmarks set ``use_numpy = False`` to force the fallback.
+np: Any = None
+use_numpy = importlib.util.find_spec("numpy") is not None
+
+GROUP_KEYS = ("person", "currency", "day")
+_DAY = 86400
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+class FXRates:
+    """Exchange rates as ``base`` units per one unit of each currency (``base`` itself is 1)."""
+
+    def __init__(self, base: str, rates: Dict[str, float]):
+        self.base = base.upper()
+        self.rates = {currency.upper(): float(rate) for currency, rate in rates.items()}
+        self.rates[self.base] = 1.0
+
+    @classmethod
+    def from_spec(cls, spec: str, base: str = "USD") -> "FXRates":
+        """Comma-separated ``CUR=rate`` pairs, e.g. ``EUR=1.08,JPY=0.0067`` against ``base``."""
+        rates = {}
+        for part in spec.split(","):
+            if not part.strip():
+                continue
+            currency, sep, rate = part.partition("=")
+            if not sep:
+                raise ValueError(f"invalid FX rate {part!r} (expected CUR=rate)")
+            rates[currency.strip()] = float(rate)
+        return cls(base, rates)
+
+    def factor(self, currency: str, target: str) -> float:
+        """Multiplier from minor units of ``currency`` to minor units of ``target``."""
+        missing = [c for c in (currency, target) if c.upper() not in self.rates]
+        if missing:
+            raise ValueError(f"no FX rate for {', '.join(missing)}")
+        rate = self.rates[currency.upper()] / self.rates[target.upper()]
+        return rate * 10.0 ** (exponent(target) - exponent(currency))
+
+
+class TransactionColumns:
+    """Columnar transaction snapshot: one ``array('q')`` per column, persons and currencies as codes."""
+
+    def __init__(self) -> None:
+        self.persons: List[str] = []
+        self.currencies: List[str] = []
+        self._person_codes: Dict[str, int] = {}
+        self._currency_codes: Dict[str, int] = {}
+        self.person = array("q")
+        self.currency = array("q")
+        self.day = array("q")
+        self.amount_minor = array("q")
+
+    def append(self, person_id: str, currency: str, amount_minor: int, created_at: float) -> None:
+        code = self._person_codes.get(person_id)
+        if code is None:
+            code = self._person_codes[person_id] = len(self.persons)
+            self.persons.append(person_id)
+        self.person.append(code)
+        code = self._currency_codes.get(currency)
+        if code is None:
+            code = self._currency_codes[currency] = len(self.currencies)
+            self.currencies.append(currency)
+        self.currency.append(code)
+        self.day.append(int(created_at // _DAY))
+        self.amount_minor.append(amount_minor)
+
+    def __len__(self) -> int:
+        return len(self.amount_minor)
+
+
+def snapshot(
+    store: TransactionStore,
+    *,
+    created_after: float | None = None,
+    created_before: float | None = None,
+    statuses: Iterable[str] = ("succeeded",),
+) -> TransactionColumns:
+    """Columns for the transactions in the window whose status is in ``statuses``."""
+    wanted = frozenset(statuses)
+    columns = TransactionColumns()
+    append = columns.append
+    for person_id, currency, status, amount_minor, created_at in store.scan_amounts(created_after, created_before):
+        if status in wanted:
+            append(person_id, currency.upper(), amount_minor, created_at)
+    return columns
+
+
+def totals(
+    columns: TransactionColumns,
+    *,
+    by: Sequence[str] = GROUP_KEYS,
+    convert_to: str | None = None,
+    fx: FXRates | None = None,
+) -> List[Dict[str, Any]]:
+    """Total and count per group of ``by`` keys (a subset of ``GROUP_KEYS``), sorted by key.
+
+    Without ``convert_to`` the totals stay in each transaction's currency, so ``by`` must
+    include ``currency``. With it, each per-currency group total is converted once with
+    ``fx`` (rounded half to even into ``convert_to``'s minor units) and then combined;
+    grouping by ``currency`` then reports it as ``source_currency``.
+    """
+    by = tuple(by)
+    unknown = set(by) - set(GROUP_KEYS)
+    if unknown:
+        raise ValueError(f"unknown group keys {sorted(unknown)} (expected {', '.join(GROUP_KEYS)})")
+    if convert_to is None and "currency" not in by:
+        raise ValueError("totals across currencies need convert_to")
+    if convert_to is not None and fx is None:
+        raise ValueError("convert_to needs an FX rate table")
+    # Always split by currency first so every sum is exact in a single currency.
+    keys = tuple(key for key in GROUP_KEYS if key in by or key == "currency")
+    out = tuple(key for key in GROUP_KEYS if key in by)
+    factors = None
+    if convert_to is not None:
+        factors = [fx.factor(currency, convert_to) for currency in columns.currencies]
+    group = _python_totals
+    if use_numpy:
+        _load_numpy()
+        group = _numpy_totals
+    return _render(columns, out, *group(columns, keys, out, factors), convert_to)
+
+
+def _load_numpy() -> None:
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+
+
+def _ranks(names: List[str]) -> List[int]:
+    """``rank[code]``: position of each dictionary code's name in sorted order."""
+    ranks = [0] * len(names)
+    for rank, code in enumerate(sorted(range(len(names)), key=names.__getitem__)):
+        ranks[code] = rank
+    return ranks
+
+
+def _rank_tables(columns: TransactionColumns) -> Dict[str, List[int] | None]:
+    return {"person": _ranks(columns.persons), "currency": _ranks(columns.currencies), "day": None}
+
+
+def _python_totals(
+    columns: TransactionColumns, keys: Tuple[str, ...], out: Tuple[str, ...], factors: List[float] | None
+) -> Tuple[List[Tuple[int, ...]], List[int], List[int]]:
+    sums: Dict[Tuple[int, ...], List[int]] = {}
+    for key in zip(*(getattr(columns, name) for name in keys), columns.amount_minor):
+        group = sums.get(key[:-1])
+        if group is None:
+            sums[key[:-1]] = [key[-1], 1]
+        else:
+            group[0] += key[-1]
+            group[1] += 1
+    currency = keys.index("currency")
+    tables = _rank_tables(columns)
+    keep = [(keys.index(name), tables[name]) for name in out]
+    combined: Dict[Tuple[int, ...], List[int]] = {}
+    for key, (total, count) in sums.items():
+        if factors is not None:
+            total = round(total * factors[key[currency]])
+        ranked = tuple(key[i] if table is None else table[key[i]] for i, table in keep)
+        group = combined.get(ranked)
+        if group is None:
+            combined[ranked] = [total, count]
+        else:
+            group[0] += total
+            group[1] += count
+    ordered = sorted(combined)
+    return ordered, [combined[key][0] for key in ordered], [combined[key][1] for key in ordered]
+
+
+def _numpy_group(cols: List[Any], values: List[Any]) -> Tuple[List[Any], List[Any]]:
+    """Segmented sums of ``values`` per distinct row of ``cols``, ordered by ``cols``."""
+    # One composite int64 key per row, then a single sort and reduceat.
+    composite = np.zeros(len(values[0]), dtype=np.int64)
+    for col in cols:
+        low = int(col.min())
+        composite *= int(col.max()) - low + 1
+        composite += col - low
+    order = np.argsort(composite)
+    ordered = composite[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    first = order[starts]
+    return [col[first] for col in cols], [np.add.reduceat(value[order], starts) for value in values]
+
+
+def _numpy_totals(
+    columns: TransactionColumns, keys: Tuple[str, ...], out: Tuple[str, ...], factors: List[float] | None
+) -> Tuple[List[Tuple[int, ...]], List[int], List[int]]:
+    if not len(columns):
+        return [], [], []
+    tables = _rank_tables(columns)
+    # Group on sort ranks rather than codes, so the sorted groups come out in report order.
+    cols = {}
+    for name in keys:
+        col = np.frombuffer(getattr(columns, name), dtype=np.int64)
+        cols[name] = col if tables[name] is None else np.asarray(tables[name], dtype=np.int64)[col]
+    amounts = np.frombuffer(columns.amount_minor, dtype=np.int64)
+    group_cols, (sums, counts) = _numpy_group([cols[name] for name in keys], [amounts, np.ones_like(amounts)])
+    if factors is not None:
+        by_rank = np.empty(len(factors), dtype=np.float64)
+        by_rank[tables["currency"]] = factors
+        sums = np.rint(sums * by_rank[group_cols[keys.index("currency")]]).astype(np.int64)
+    group_cols = [group_cols[keys.index(name)] for name in out]
+    if len(out) < len(keys):
+        if out:
+            group_cols, (sums, counts) = _numpy_group(group_cols, [sums, counts])
+        else:
+            group_cols, sums, counts = [], sums.sum(keepdims=True), counts.sum(keepdims=True)
+    return list(zip(*(col.tolist() for col in group_cols))) or [()] * len(sums), sums.tolist(), counts.tolist()
+
+
+def _render(
+    columns: TransactionColumns,
+    out: Tuple[str, ...],
+    groups: List[Tuple[int, ...]],
+    sums: List[int],
+    counts: List[int],
+    convert_to: str | None,
+) -> List[Dict[str, Any]]:
+    names = {
+        "person": ("person_id", sorted(columns.persons)),
+        "currency": ("source_currency" if convert_to is not None else "currency", sorted(columns.currencies)),
+        "day": ("day", {}),
+    }
+    scales = {currency: 10 ** exponent(currency) for currency in columns.currencies}
+    if convert_to is not None:
+        scales[convert_to.upper()] = 10 ** exponent(convert_to)
+    rows = []
+    for key, total, count in zip(groups, sums, counts):
+        row: Dict[str, Any] = {}
+        for name, value in zip(out, key):
+            field, table = names[name]
+            if name == "day":
+                label = table.get(value)
+                if label is None:
+                    label = table[value] = (_EPOCH + datetime.timedelta(days=value)).isoformat()
+                row[field] = label
+            else:
+                row[field] = table[value]
+        currency = row["currency"] if convert_to is None else convert_to.upper()
+        row["currency"] = currency
+        row["amount"] = total / scales[currency]
+        row["amount_minor"] = total
+        row["count"] = count
+        rows.append(row)
+    return rows
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """The provider's circuit is open; the call was rejected without reaching the provider."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    ``failure_threshold`` consecutive failures open the circuit; while open every call is
+    rejected. After ``reset_timeout`` seconds the circuit goes half-open and lets up to
+    ``half_open_max_calls`` probe calls through: a successful probe closes it, a failed
+    one opens it again. A probe that ends without an outcome (e.g. a cancelled call) must
+    hand its slot back with :meth:`release_probe`.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.transitions: Dict[str, int] = {}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now; counts a rejection when it may not."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if success:
+                self._failures = 0
+                if self._state == HALF_OPEN:
+                    self._transition(CLOSED)
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._transition(OPEN)
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot taken by :meth:`allow` without recording an outcome."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+            }
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        key = f"{self._state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self._state = state
+        self._probes = 0
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit driven by observed latency.
+
+    The limit grows by ``increase / limit`` per successful call while the caller is
+    actually using at least half of it (roughly +``increase`` per round trip), and is
+    multiplied by ``decrease`` on a failure or when latency exceeds ``latency_tolerance``
+    times the baseline (the lowest recent latency, as in TCP Vegas). Latencies under
+    ``latency_floor`` never count as congestion, so jitter on sub-millisecond calls does
+    not shrink the limit. Decreases happen at most once per baseline interval so a burst
+    of slow calls counts as one congestion signal.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_floor: float = 0.005,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.latency_floor = latency_floor
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self._clock = clock
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._lock = threading.Lock()
+        self.baseline: float | None = None
+        self._last_decrease = float("-inf")
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def on_sample(self, latency: float, ok: bool, in_flight: int) -> None:
+        with self._lock:
+            if ok:
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    # Let the baseline drift up slowly if the provider gets permanently slower.
+                    self.baseline += (latency - self.baseline) * 0.01
+            threshold = max(self.latency_floor, (self.baseline or 0.0) * self.latency_tolerance)
+            congested = not ok or (self.baseline is not None and latency > threshold)
+            if congested:
+                now = self._clock()
+                if now - self._last_decrease >= (self.baseline or 0.0):
+                    self._limit = max(float(self.min_limit), self._limit * self.decrease)
+                    self._last_decrease = now
+                    self.decreases += 1
+            elif in_flight + 1 >= self._limit / 2 and self._limit < self.max_limit:
+                self._limit = min(float(self.max_limit), self._limit + self.increase / self._limit)
+                self.increases += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": int(self._limit),
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "baseline_latency": self.baseline,
+                "increases": self.increases,
+                "decreases": self.decreases,
+            }
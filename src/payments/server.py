@@ -2,43 +2,148 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from .api import register_payment_routes
-from .clients import ServiceHttpClient
-
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Unison Payments", version="0.1.0")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+def _drain_timeout() -> float:
+    return float(os.getenv("UNISON_PAYMENTS_DRAIN_TIMEOUT", "30"))
+
+
+_start_lock = threading.Lock()
+
+
+def start_service(app: FastAPI):
+    """Build the HTTP clients and payment service as ``app.state.service``; later calls return it.
+
+    The HTTP clients are imported here rather than at module level, keeping
+    ``import payments.server`` cheap.
+    """
+    with _start_lock:
+        service = getattr(app.state, "service", None)
+        if service is not None:
+            return service
+        from .api import build_payment_service
+        from .clients import AsyncServiceHttpClient, ServiceHttpClient
+
+        context_client = ServiceHttpClient.from_env("UNISON_CONTEXT")
+        storage_client = ServiceHttpClient.from_env("UNISON_STORAGE")
+        # Vault reads on the async request path use their own non-blocking pool.
+        async_storage_client = AsyncServiceHttpClient.from_env("UNISON_STORAGE")
+        event_client = ServiceHttpClient.from_env("UNISON_CONTEXT_GRAPH")
+        app.state.service = build_payment_service(
+            context_client=context_client,
+            storage_client=storage_client,
+            event_client=event_client,
+            async_storage_client=async_storage_client,
+        )
+        app.state.clients = (context_client, storage_client, event_client, async_storage_client)
+        return app.state.service
+
+
+async def stop_service(app: FastAPI) -> None:
+    """Drain and close ``app.state.service`` and its HTTP clients, if it was started."""
+    with _start_lock:
+        service, app.state.service = getattr(app.state, "service", None), None
+        clients, app.state.clients = getattr(app.state, "clients", ()), ()
+    if service is None:
+        return
+    # The server has stopped accepting requests and finished in-flight ones by now;
+    # drain queued webhooks, outbox work and buffered events before closing clients.
+    await run_in_threadpool(service.close, _drain_timeout())
+    context_client, storage_client, event_client, async_storage_client = clients
+    for client in (context_client, storage_client, event_client):
+        if client is not None:
+            client.close()
+    if async_storage_client is not None:
+        await async_storage_client.aclose()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the payment service in each worker at startup; drain and close it on shutdown.
+
+    Nothing with threads or sockets is created at import time or by :func:`create_app`,
+    so the app is safe to build in a supervisor process that forks or spawns workers.
+    """
+    start_service(app)
+    try:
+        yield
+    finally:
+        await stop_service(app)
 
 
-@app.get("/health")
 def health():
     return {"ok": True}
 
 
-def _build_client_from_env(prefix: str) -> ServiceHttpClient | None:
-    host = os.getenv(f"{prefix}_HOST")
-    port = os.getenv(f"{prefix}_PORT")
-    if not host or not port:
-        return None
-    return ServiceHttpClient(host, port)
+def create_app() -> FastAPI:
+    """A new payments app: CORS, ``/health``, the payment routes and the :func:`lifespan` that starts the service.
 
+    Importing this module has no side effects; logging is configured here (a no-op if
+    the host already did). Routes are registered once, here, so the OpenAPI schema does
+    not depend on the lifespan; handlers reach the service through ``app.state``.
+    """
+    from .api import add_payment_routes
 
-context_client = _build_client_from_env("UNISON_CONTEXT")
-storage_client = _build_client_from_env("UNISON_STORAGE")
+    logging.basicConfig(level=logging.INFO)
+    app = FastAPI(title="Unison Payments", version="0.1.0", lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_api_route("/health", health, methods=["GET"])
+    app.state.service = None
+    app.state.start_service = lambda: start_service(app)
+    add_payment_routes(app)
+    return app
 
-register_payment_routes(app, context_client=context_client, storage_client=storage_client)
 
-if __name__ == "__main__":  # pragma: no cover
+_app: FastAPI | None = None
+
+
+def __getattr__(name: str):
+    # ``payments.server:app`` keeps working for uvicorn and existing imports: one shared
+    # app, created on first access.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main() -> None:
+    """Production entry point (``python -m payments.server``).
+
+    Runs ``UNISON_PAYMENTS_WORKERS`` uvicorn worker processes (default 1). More than one
+    worker needs ``UNISON_PAYMENTS_LEDGER_PATH``: the SQLite ledger is the state they share.
+    On SIGTERM uvicorn stops accepting connections and waits up to
+    ``UNISON_PAYMENTS_DRAIN_TIMEOUT`` seconds for in-flight requests before shutdown drains
+    queued work.
+    """
     import uvicorn
 
-    uvicorn.run("payments.server:app", host="0.0.0.0", port=8089, reload=True)
+    workers = int(os.getenv("UNISON_PAYMENTS_WORKERS", "1"))
+    if workers > 1 and not os.getenv("UNISON_PAYMENTS_LEDGER_PATH"):
+        raise SystemExit("UNISON_PAYMENTS_WORKERS > 1 requires UNISON_PAYMENTS_LEDGER_PATH (shared state)")
+    uvicorn.run(
+        "payments.server:create_app",
+        factory=True,
+        host=os.getenv("UNISON_PAYMENTS_HOST", "0.0.0.0"),
+        port=int(os.getenv("UNISON_PAYMENTS_PORT", "8089")),
+        workers=workers,
+        timeout_graceful_shutdown=int(_drain_timeout()),
+        log_level=os.getenv("UNISON_PAYMENTS_LOG_LEVEL", "info"),
+    )
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
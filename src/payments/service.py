@@ -1,96 +1,494 @@
 from __future__ import annotations
 
+import copy
 import logging
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Mapping, Tuple
 
-from .models import PaymentInstrument, PaymentTransaction, PaymentTransactionRequest
-from .providers import PaymentProvider
+from fastapi.concurrency import run_in_threadpool
+
+from .models import PaymentInstrument, PaymentStatus, PaymentTransaction, PaymentTransactionRequest
+from .providers import AsyncPaymentProvider, PaymentProvider
+from .poller import StatusPoller
+from .registry import ProviderBusy, ProviderRegistry, RoutedProvider
 from .logging import PaymentEventLogger
+from .idempotency import IdempotencyCache, request_hash
+from .ledger import SQLiteLedger
+from .limits import LimitsEngine, Reservation
+from .outbox import Outbox
+from .profile import ProfilePatcher, upsert_instruments
+from .resilience import CircuitOpen
+from .store import InMemoryTransactionStore, TransactionQuery, TransactionStore, is_terminal, status_value
+from .telemetry import Telemetry
+from .vault import VaultTokenCache
+from .webhooks import WebhookQueue
 
 logger = logging.getLogger(__name__)
 
+# Status progression: a polled status only replaces a stored one that is earlier.
+_STATUS_ORDER = {"created": 0, "authorized": 1, "succeeded": 2, "failed": 2}
+
 
 class PaymentService:
-    """Coordinates provider calls, vault access, and event logging."""
+    """Coordinates provider calls, vault access, and event logging.
+
+    Methods prefixed with ``a`` are the async request path: they await the provider and
+    keep blocking client I/O off the event loop. ``provider`` is a :class:`ProviderRegistry`
+    or a single sync or async provider; calls are routed by the instrument's ``provider``.
+    """
 
     def __init__(
         self,
-        provider: PaymentProvider,
+        provider: ProviderRegistry | PaymentProvider | AsyncPaymentProvider,
         logger: PaymentEventLogger | None = None,
         context_client: Any | None = None,
         storage_client: Any | None = None,
+        outbox: Outbox | None = None,
+        store: TransactionStore | None = None,
+        ledger: SQLiteLedger | None = None,
+        idempotency: IdempotencyCache[PaymentTransaction] | None = None,
+        async_storage_client: Any | None = None,
+        webhooks: WebhookQueue | None = None,
+        vault_cache: VaultTokenCache | None = None,
+        profile_patcher: ProfilePatcher | None = None,
+        telemetry: Telemetry | None = None,
+        limits: LimitsEngine | None = None,
+        poller: StatusPoller | None = None,
     ):
-        self.provider = provider
+        if not isinstance(provider, ProviderRegistry):
+            registry = ProviderRegistry(provider.name)
+            registry.add(provider)
+            provider = registry
+        self.providers = provider
         self.logger = logger or PaymentEventLogger()
         self.context_client = context_client
         self.storage_client = storage_client
-        self._instruments: Dict[str, PaymentInstrument] = {}
-        self._transactions: Dict[str, PaymentTransaction] = {}
+        # Optional AsyncServiceHttpClient for vault reads on the async path.
+        self.async_storage_client = async_storage_client
+        self.outbox = outbox
+        self.ledger = ledger
+        self._instruments: Dict[str, PaymentInstrument] | Any = ledger.instruments if ledger is not None else {}
+        if store is None:
+            store = InMemoryTransactionStore(backend=ledger)
+        self._transactions = store
+        self.idempotency = idempotency
+        self.webhooks = webhooks
+        # Opt-in: caches vault tokens in memory so repeat charges skip the storage round trip.
+        self.vault_cache = vault_cache
+        # Opt-in: per-instrument merge-patch profile writes instead of read-modify-write.
+        self.profile_patcher = profile_patcher
+        # Opt-in: spend and velocity limits, checked before the vault read and provider call.
+        self.limits = limits
+        # Opt-in: polls providers for transactions left created/authorized (missed webhooks).
+        self.poller = poller
+        self.telemetry = telemetry or Telemetry(metrics=False)
+        if self.telemetry.metrics:
+            self.providers.observe(self.telemetry.observe_provider_call)
 
     def register_instrument(self, instrument: PaymentInstrument, token: str | None = None) -> PaymentInstrument:
-        registered = self.provider.register_instrument(instrument)
-        vault_key = self._store_instrument_secret(registered, token)
-        if vault_key:
-            registered.metadata["vault_key"] = vault_key
-        self._instruments[registered.instrument_id] = registered
-        self._persist_instrument_metadata(registered)
-        self.logger.log_event(
-            event_type="PaymentInstrumentRegistered",
-            subject_id=registered.instrument_id,
-            person_id=registered.person_id,
-            provider=registered.provider,
-            status="registered",
-            instrument_kind=registered.kind,
-        )
-        return registered
+        with self.telemetry.span("payments.register_instrument", provider=instrument.provider):
+            self._forget_instrument_secret(instrument)
+            with self.telemetry.span("payments.provider.register_instrument"):
+                registered = self.providers.get(instrument.provider).sync.register_instrument(instrument)
+            if self.outbox:
+                self._queue_instrument_side_effects(registered, token)
+            else:
+                self._apply_instrument_side_effects(registered, token)
+            self._log_event(**self._instrument_event(registered))
+            return registered
+
+    async def aregister_instrument(self, instrument: PaymentInstrument, token: str | None = None) -> PaymentInstrument:
+        with self.telemetry.span("payments.register_instrument", provider=instrument.provider):
+            self._forget_instrument_secret(instrument)
+            with self.telemetry.span("payments.provider.register_instrument"):
+                registered = await self.providers.get(instrument.provider).register_instrument(instrument)
+            if self.outbox and token and self.storage_client:
+                await run_in_threadpool(self._queue_instrument_side_effects, registered, token)
+            elif self.outbox:
+                self._queue_instrument_side_effects(registered, token)
+            elif self.storage_client or self.context_client:
+                await run_in_threadpool(self._apply_instrument_side_effects, registered, token)
+            else:
+                self._instruments[registered.instrument_id] = registered
+            await self._alog_event(**self._instrument_event(registered))
+            return registered
 
     def create_transaction(self, request: PaymentTransactionRequest) -> PaymentTransaction:
+        start = time.perf_counter()
         instrument = self.get_instrument(request.instrument_id)
-        if not request.provider_token:
-            token = self._load_instrument_secret(instrument)
-            request.provider_token = token
-        txn = self.provider.create_transaction(request)
-        self._transactions[txn.txn_id] = txn
-        self.logger.log_event(
-            event_type=self._event_type_for_status(txn.status),
-            subject_id=txn.txn_id,
-            person_id=txn.person_id,
-            provider=txn.provider,
-            status=txn.status.value if hasattr(txn.status, "value") else str(txn.status),
-            amount=txn.amount,
-            currency=txn.currency,
-            counterparty=txn.counterparty,
-            surface=request.surface,
-            instrument_kind=instrument.kind if instrument else None,
+        txn = None
+        with self.telemetry.span("payments.create_transaction", surface=request.surface):
+            reservation = self._reserve_limits(request)
+            try:
+                if not request.provider_token:
+                    token = self._load_instrument_secret(instrument)
+                    request.provider_token = token
+                with self.telemetry.span("payments.provider.create_transaction"):
+                    txn = self._route(instrument).sync.create_transaction(request)
+                self._transactions.put(txn)
+                self._track_pending(txn)
+                self._log_event(**self._transaction_event(txn, request.surface, instrument))
+                return txn
+            finally:
+                self._release_limits(reservation, txn)
+                self._observe_transaction(start, instrument, request.surface, txn)
+
+    async def acreate_transaction(self, request: PaymentTransactionRequest) -> PaymentTransaction:
+        start = time.perf_counter()
+        instrument = self.get_instrument(request.instrument_id)
+        txn = None
+        with self.telemetry.span("payments.create_transaction", surface=request.surface):
+            reservation = self._reserve_limits(request)
+            try:
+                if not request.provider_token:
+                    request.provider_token = await self._aload_instrument_secret(instrument)
+                with self.telemetry.span("payments.provider.create_transaction"):
+                    txn = await self._route(instrument).create_transaction(request)
+                self._transactions.put(txn)
+                self._track_pending(txn)
+                await self._alog_event(**self._transaction_event(txn, request.surface, instrument))
+                return txn
+            finally:
+                self._release_limits(reservation, txn)
+                self._observe_transaction(start, instrument, request.surface, txn)
+
+    def _reserve_limits(self, request: PaymentTransactionRequest) -> Reservation | None:
+        if self.limits is None:
+            return None
+        return self.limits.reserve(request.person_id, request.instrument_id, request.amount_minor, request.currency)
+
+    def _release_limits(self, reservation: Reservation | None, txn: PaymentTransaction | None) -> None:
+        # Declined or errored charges keep their velocity count but give the amount back.
+        if reservation is not None and (txn is None or status_value(txn.status) == "failed"):
+            self.limits.release(reservation)
+
+    def _observe_transaction(
+        self, start: float, instrument: PaymentInstrument | None, surface: str | None, txn: PaymentTransaction | None
+    ) -> None:
+        if not self.telemetry.metrics:
+            return
+        provider = instrument.provider if instrument else self.providers.default
+        status = status_value(txn.status) if txn is not None else "error"
+        self.telemetry.transactions.observe(time.perf_counter() - start, provider, surface or "none", status)
+
+    def stats(self) -> Dict[str, Any]:
+        """``stats()`` of the configured components, keyed by component (as on ``/metrics``)."""
+        stats: Dict[str, Any] = {"providers": self.providers.stats()}
+        components = (
+            "store", "outbox", "idempotency", "webhooks", "poller", "vault_cache", "profile_patcher", "limits",
+            "logger",
         )
-        return txn
+        for name in components:
+            component = self._transactions if name == "store" else getattr(self, name)
+            if component is not None and hasattr(component, "stats"):
+                stats[name] = component.stats()
+        return stats
+
+    def register_instruments_batch(
+        self, items: List[Tuple[PaymentInstrument, str | None]]
+    ) -> List[PaymentInstrument | Exception]:
+        """Register many instruments; results line up with ``items`` (an exception per failed item).
+
+        Profile updates are grouped by ``person_id`` so each person's profile is read and
+        written once for the whole batch instead of once per instrument.
+        """
+        results: List[PaymentInstrument | Exception] = []
+        by_person: Dict[str, List[PaymentInstrument]] = {}
+        for instrument, token in items:
+            self._forget_instrument_secret(instrument)
+            try:
+                registered = self.providers.get(instrument.provider).sync.register_instrument(instrument)
+                vault_key = self._store_instrument_secret(registered, token)
+                if vault_key:
+                    registered.metadata["vault_key"] = vault_key
+                self._instruments[registered.instrument_id] = registered
+            except Exception as exc:
+                results.append(exc)
+                continue
+            by_person.setdefault(registered.person_id, []).append(registered)
+            results.append(registered)
+        if self.context_client:
+            for person_id, instruments in by_person.items():
+                if self.outbox:
+                    self._queue_profile_update(person_id, instruments)
+                    continue
+                try:
+                    self._write_person_instruments(person_id, instruments)
+                except Exception as exc:
+                    logger.debug("payment instrument metadata persistence failed for %s: %s", person_id, exc)
+        for instruments in by_person.values():
+            for registered in instruments:
+                self._log_event(**self._instrument_event(registered))
+        return results
+
+    def create_transactions_batch(
+        self, requests: List[PaymentTransactionRequest]
+    ) -> List[PaymentTransaction | Exception]:
+        """Create many transactions; results line up with ``requests``.
+
+        Instruments and vault tokens are resolved once per instrument for the whole batch.
+        """
+        instruments: Dict[str, PaymentInstrument | None] = {}
+        tokens: Dict[str, str | None] = {}
+        results: List[PaymentTransaction | Exception] = []
+        for request in requests:
+            txn = reservation = None
+            try:
+                reservation = self._reserve_limits(request)
+                if request.instrument_id not in instruments:
+                    instruments[request.instrument_id] = self.get_instrument(request.instrument_id)
+                instrument = instruments[request.instrument_id]
+                if not request.provider_token:
+                    if request.instrument_id not in tokens:
+                        tokens[request.instrument_id] = self._load_instrument_secret(instrument)
+                    request.provider_token = tokens[request.instrument_id]
+                txn = self._route(instrument).sync.create_transaction(request)
+                self._transactions.put(txn)
+                self._track_pending(txn)
+            except Exception as exc:
+                results.append(exc)
+                continue
+            finally:
+                self._release_limits(reservation, txn)
+            self._log_event(**self._transaction_event(txn, request.surface, instrument))
+            results.append(txn)
+        return results
+
+    def create_transaction_idempotent(
+        self, request: PaymentTransactionRequest, idempotency_key: str
+    ) -> Tuple[PaymentTransaction, bool]:
+        """Create at most one transaction per (person, key); returns ``(txn, replayed)``.
+
+        Raises ``IdempotencyConflict`` when the key was used for a different request and
+        ``IdempotencyInProgress`` when the original request is still running.
+        """
+        if self.idempotency is None:
+            return self.create_transaction(request), False
+        key, fingerprint = self._idempotency_key(request, idempotency_key)
+        return self.idempotency.execute(key, fingerprint, lambda: self.create_transaction(request))
+
+    async def acreate_transaction_idempotent(
+        self, request: PaymentTransactionRequest, idempotency_key: str
+    ) -> Tuple[PaymentTransaction, bool]:
+        if self.idempotency is None:
+            return await self.acreate_transaction(request), False
+        key, fingerprint = self._idempotency_key(request, idempotency_key)
+        return await self.idempotency.aexecute(key, fingerprint, lambda: self.acreate_transaction(request))
+
+    @staticmethod
+    def _idempotency_key(request: PaymentTransactionRequest, idempotency_key: str) -> Tuple[str, str]:
+        fingerprint = request_hash(
+            {
+                "person_id": request.person_id,
+                "instrument_id": request.instrument_id,
+                "amount": request.amount,
+                "currency": request.currency,
+                "description": request.description,
+                "counterparty": request.counterparty,
+                "authorization_context": request.authorization_context,
+                "surface": request.surface,
+            }
+        )
+        return f"{request.person_id}:{idempotency_key}", fingerprint
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Drain queued side effects and flush buffered events; call from the server's shutdown hook."""
+        if self.poller is not None:
+            self.poller.close(timeout)
+        if self.webhooks is not None:
+            self.webhooks.close(timeout)
+        if self.outbox:
+            self.outbox.close(timeout)
+        self.logger.close()
+        self.providers.close()
+        self._transactions.close()
+
+    @property
+    def transactions(self) -> TransactionStore:
+        """The transaction store (the ledger-backed cache when a ledger is configured)."""
+        return self._transactions
 
     def get_instrument(self, instrument_id: str) -> PaymentInstrument | None:
         return self._instruments.get(instrument_id)
 
     def get_transaction_status(self, txn_id: str) -> PaymentTransaction:
-        if txn_id in self._transactions:
-            return self._transactions[txn_id]
-        return self.provider.get_status(txn_id)
+        """The stored transaction, or on a miss whichever registered provider knows ``txn_id``.
 
-    def process_webhook(self, provider_name: str, payload: Dict[str, Any]) -> PaymentTransaction:
-        if provider_name != getattr(self.provider, "name", ""):
-            raise ValueError("unknown provider")
-        txn = self.provider.handle_webhook(payload)
-        self._transactions[txn.txn_id] = txn
-        self.logger.log_event(
-            event_type=self._event_type_for_status(txn.status),
-            subject_id=txn.txn_id,
-            person_id=txn.person_id,
-            provider=txn.provider,
-            status=txn.status.value if hasattr(txn.status, "value") else str(txn.status),
-            amount=txn.amount,
-            currency=txn.currency,
-            counterparty=txn.counterparty,
-            instrument_kind=self._instruments.get(txn.instrument_id).kind if txn.instrument_id in self._instruments else None,
-        )
+        Stored transactions record their provider and are answered locally. An unknown id
+        is looked up at the default provider first, then at each other registered one; a
+        provider's ``KeyError`` moves on to the next. When none has it, the first other
+        provider error is raised, or ``KeyError`` if there was none.
+        """
+        txn = self._transactions.get(txn_id)
+        if txn is None:
+            error: Exception | None = None
+            for routed in self._status_providers():
+                try:
+                    with self.telemetry.span("payments.provider.get_status", provider=routed.name):
+                        txn = routed.sync.get_status(txn_id)
+                    break
+                except LookupError:
+                    continue
+                except Exception as exc:
+                    error = error or exc
+            else:
+                raise error or KeyError(txn_id)
+            self._transactions.put(txn)
         return txn
 
+    async def aget_transaction_status(self, txn_id: str) -> PaymentTransaction:
+        txn = self._transactions.get(txn_id)
+        if txn is None:
+            error: Exception | None = None
+            for routed in self._status_providers():
+                try:
+                    with self.telemetry.span("payments.provider.get_status", provider=routed.name):
+                        txn = await routed.get_status(txn_id)
+                    break
+                except LookupError:
+                    continue
+                except Exception as exc:
+                    error = error or exc
+            else:
+                raise error or KeyError(txn_id)
+            self._transactions.put(txn)
+        return txn
+
+    def _status_providers(self) -> List[RoutedProvider]:
+        default = self.providers.get()
+        return [default] + [self.providers.get(name) for name in self.providers.names() if name != default.name]
+
+    def list_transactions(self, query: TransactionQuery) -> List[PaymentTransaction]:
+        """Keyset-paginated listing, newest first, served from the store's secondary indexes."""
+        return self._transactions.query(query)
+
+    def verify_webhook(self, provider_name: str, raw_body: bytes, headers: Mapping[str, str]) -> None:
+        """Raise ValueError for an unknown provider and PermissionError for a failed signature check."""
+        if not self.providers.get(provider_name).verify_webhook(raw_body, headers):
+            raise PermissionError("webhook verification failed")
+
+    def process_webhook(self, provider_name: str, payload: Dict[str, Any]) -> PaymentTransaction:
+        with self.telemetry.span("payments.process_webhook", provider=provider_name):
+            txn = self.providers.get(provider_name).sync.handle_webhook(payload)
+            self._record_update(txn)
+            return txn
+
+    def apply_settled_status(self, txn: PaymentTransaction, status: PaymentStatus | str) -> PaymentTransaction:
+        """Move ``txn`` to the status its provider settled, as a verified webhook would.
+
+        Stores the updated copy and emits the transaction event; the previous status is
+        kept in ``metadata["reconciled_from"]``.
+        """
+        with self.telemetry.span("payments.apply_settled_status", provider=txn.provider):
+            updated = copy.copy(txn)
+            updated.status = PaymentStatus(status_value(status))
+            updated.metadata = {**txn.metadata, "reconciled_from": status_value(txn.status)}
+            self._record_update(updated)
+            return updated
+
+    def poll_statuses(self, provider_name: str, txn_ids: List[str]) -> Dict[str, bool]:
+        """Ask ``provider_name`` for the status of pending ``txn_ids``; ``{txn_id: settled}`` per answer.
+
+        This is the :class:`StatusPoller` callback. A status that moved forward is recorded
+        as a verified webhook would be (stored, transaction event emitted). Transactions
+        already settled in the store, e.g. by a webhook on another worker, are not sent to
+        the provider. Providers may implement ``get_statuses(txn_ids)`` (returning the
+        transactions they know) to answer a batch in one call; otherwise each id is a
+        ``get_status`` call, and the batch stops early when the provider is busy or its
+        circuit is open. Ids missing from the result are retried by the poller.
+        """
+        known = self._transactions.get_many(txn_ids)
+        results: Dict[str, bool] = {}
+        unsettled = []
+        for txn_id in txn_ids:
+            current = known.get(txn_id)
+            if current is not None and is_terminal(current.status):
+                results[txn_id] = True
+            else:
+                unsettled.append(txn_id)
+        if not unsettled:
+            return results
+        with self.telemetry.span("payments.poll_statuses", provider=provider_name):
+            for txn in self._fetch_statuses(self.providers.get(provider_name), unsettled):
+                # Re-read before writing: a webhook may have landed while the provider answered.
+                if self._advances(txn, known.get(txn.txn_id)) and self._advances(txn, self._transactions.get(txn.txn_id)):
+                    self._record_update(txn)
+                results[txn.txn_id] = is_terminal(txn.status)
+        return results
+
+    @staticmethod
+    def _fetch_statuses(routed: RoutedProvider, txn_ids: List[str]) -> List[PaymentTransaction]:
+        if hasattr(routed.load(), "get_statuses"):
+            try:
+                return list(routed.call_sync("get_statuses", txn_ids))
+            except Exception as exc:
+                logger.debug("batch status poll at %s failed: %s", routed.name, exc)
+                return []
+        txns = []
+        for txn_id in txn_ids:
+            try:
+                txns.append(routed.sync.get_status(txn_id))
+            except (ProviderBusy, CircuitOpen):
+                break
+            except Exception as exc:
+                logger.debug("status poll of %s at %s failed: %s", txn_id, routed.name, exc)
+        return txns
+
+    @staticmethod
+    def _advances(txn: PaymentTransaction, current: PaymentTransaction | None) -> bool:
+        if current is None:
+            return True
+        return _STATUS_ORDER.get(status_value(txn.status), 0) > _STATUS_ORDER.get(status_value(current.status), 0)
+
+    def _track_pending(self, txn: PaymentTransaction) -> None:
+        if self.poller is not None and not is_terminal(txn.status):
+            self.poller.track(txn.txn_id, txn.provider or self.providers.default)
+
+    def _record_update(self, txn: PaymentTransaction) -> None:
+        self._transactions.put(txn)
+        if self.poller is not None and is_terminal(txn.status):
+            self.poller.forget(txn.txn_id)
+        self._log_event(**self._transaction_event(txn, None, self.get_instrument(txn.instrument_id)))
+
+    async def aprocess_webhook(self, provider_name: str, payload: Dict[str, Any]) -> PaymentTransaction:
+        with self.telemetry.span("payments.process_webhook", provider=provider_name):
+            txn = await self.providers.get(provider_name).handle_webhook(payload)
+            if self._events_block:
+                await run_in_threadpool(self._record_update, txn)
+            else:
+                self._record_update(txn)
+            return txn
+
+    def _route(self, instrument: PaymentInstrument | None) -> RoutedProvider:
+        return self.providers.get(instrument.provider if instrument else None)
+
+    @staticmethod
+    def _instrument_event(instrument: PaymentInstrument) -> Dict[str, Any]:
+        return {
+            "event_type": "PaymentInstrumentRegistered",
+            "subject_id": instrument.instrument_id,
+            "person_id": instrument.person_id,
+            "provider": instrument.provider,
+            "status": "registered",
+            "instrument_kind": instrument.kind,
+        }
+
+    def _transaction_event(
+        self, txn: PaymentTransaction, surface: str | None, instrument: PaymentInstrument | None
+    ) -> Dict[str, Any]:
+        return {
+            "event_type": self._event_type_for_status(txn.status),
+            "subject_id": txn.txn_id,
+            "person_id": txn.person_id,
+            "provider": txn.provider,
+            "status": txn.status.value if hasattr(txn.status, "value") else str(txn.status),
+            "amount": txn.amount,
+            "currency": txn.currency,
+            "counterparty": txn.counterparty,
+            "surface": surface,
+            "instrument_kind": instrument.kind if instrument else None,
+        }
+
     @staticmethod
     def _event_type_for_status(status) -> str:
         status_value = status.value if hasattr(status, "value") else str(status)
@@ -102,51 +500,130 @@ class PaymentService:
             return "PaymentTransactionAuthorized"
         return "PaymentTransactionCreated"
 
+    def _log_event(self, **fields: Any) -> None:
+        if not self.outbox or self.logger.batching:
+            mode = "batched" if self.logger.batching else "direct"
+            with self.telemetry.step("payments.event.emit", self.telemetry.events, mode):
+                self.logger.log_event(**fields)
+            return
+        payload = self.logger.build_event(**fields)
+        self.outbox.submit("payment_event", lambda: self._send_event(payload))
+
+    def _send_event(self, payload: Dict[str, Any]) -> None:
+        with self.telemetry.timed(self.telemetry.events, "outbox"):
+            self.logger.send_event(payload)
+
+    @property
+    def _events_block(self) -> bool:
+        """Whether ``_log_event`` sends the event over the network on the calling thread."""
+        return not (self.outbox or self.logger.batching or self.logger.client is None)
+
+    async def _alog_event(self, **fields: Any) -> None:
+        if self._events_block:
+            with self.telemetry.step("payments.event.emit", self.telemetry.events, "direct"):
+                await run_in_threadpool(self.logger.log_event, **fields)
+        else:
+            self._log_event(**fields)
+
+    def _queue_instrument_side_effects(self, instrument: PaymentInstrument, token: str | None) -> None:
+        # The vault write is not queued: an outbox item can be dropped or give up, and an
+        # instrument must only reference a vault key once its token is actually stored.
+        vault_key = self._store_instrument_secret(instrument, token)
+        if vault_key:
+            instrument.metadata["vault_key"] = vault_key
+        self._instruments[instrument.instrument_id] = instrument
+        if self.context_client:
+            self._queue_profile_update(instrument.person_id, [instrument])
+
+    def _queue_profile_update(self, person_id: str, instruments: List[PaymentInstrument]) -> None:
+        if self.profile_patcher is None:
+            self.outbox.submit("profile_update", lambda: self._write_person_instruments(person_id, instruments))
+            return
+        # Stage now and flush from the outbox: a burst of registrations for one person is
+        # sent by the first flush, and the later ones find nothing left to send.
+        self.profile_patcher.stage(person_id, [self._instrument_profile_entry(i) for i in instruments])
+        self.outbox.submit("profile_update", lambda: self.profile_patcher.flush(person_id))
+
+    def _apply_instrument_side_effects(self, instrument: PaymentInstrument, token: str | None) -> None:
+        vault_key = self._store_instrument_secret(instrument, token)
+        if vault_key:
+            instrument.metadata["vault_key"] = vault_key
+        self._instruments[instrument.instrument_id] = instrument
+        self._persist_instrument_metadata(instrument)
+
     def _persist_instrument_metadata(self, instrument: PaymentInstrument) -> None:
         if not self.context_client:
             return
         try:
-            ok, status, body = self.context_client.get(f"/profile/{instrument.person_id}")
-            profile = {}
-            if ok and status == 200 and isinstance(body, dict):
-                profile = body.get("profile") or {}
-            payments = profile.get("payments") if isinstance(profile.get("payments"), dict) else {}
-            instruments = payments.get("instruments") if isinstance(payments.get("instruments"), list) else []
-            instruments = [i for i in instruments if i.get("instrument_id") != instrument.instrument_id]
-            instruments.append(
-                {
-                    "instrument_id": instrument.instrument_id,
-                    "provider": instrument.provider,
-                    "kind": instrument.kind,
-                    "display_name": instrument.display_name,
-                    "brand": instrument.brand,
-                    "last4": instrument.last4,
-                    "expiry": instrument.expiry,
-                    "handle": instrument.handle,
-                    "vault_key": instrument.metadata.get("vault_key"),
-                    "created_at": instrument.created_at,
-                }
-            )
-            payments["instruments"] = instruments
-            profile["payments"] = payments
-            self.context_client.post(f"/profile/{instrument.person_id}", {"profile": profile})
+            self._write_instrument_metadata(instrument)
         except Exception as exc:
             logger.debug("payment instrument metadata persistence failed: %s", exc)
 
+    def _write_instrument_metadata(self, instrument: PaymentInstrument) -> None:
+        self._write_person_instruments(instrument.person_id, [instrument])
+
+    def _write_person_instruments(self, person_id: str, updates: List[PaymentInstrument]) -> None:
+        """Upsert several instruments into one person's profile with a single write."""
+        if self.profile_patcher is not None:
+            with self.telemetry.step("payments.profile.patch", self.telemetry.profile, "patch"):
+                self.profile_patcher.upsert(person_id, [self._instrument_profile_entry(i) for i in updates])
+            return
+        with self.telemetry.step("payments.profile.read", self.telemetry.profile, "read"):
+            ok, status, body = self.context_client.get(f"/profile/{person_id}")
+            if not ok and status != 404:
+                # Never overwrite a profile we failed to read.
+                raise RuntimeError(f"profile read failed: status={status}")
+        profile = {}
+        if ok and status == 200 and isinstance(body, dict):
+            profile = body.get("profile") or {}
+        payments = profile.get("payments") if isinstance(profile.get("payments"), dict) else {}
+        payments["instruments"] = upsert_instruments(payments, (self._instrument_profile_entry(i) for i in updates))
+        payments.pop("instruments_by_id", None)
+        profile["payments"] = payments
+        with self.telemetry.step("payments.profile.write", self.telemetry.profile, "write"):
+            ok, status, _ = self.context_client.post(f"/profile/{person_id}", {"profile": profile})
+            if not ok:
+                raise RuntimeError(f"profile write failed: status={status}")
+
+    @staticmethod
+    def _instrument_profile_entry(instrument: PaymentInstrument) -> Dict[str, Any]:
+        return {
+            "instrument_id": instrument.instrument_id,
+            "provider": instrument.provider,
+            "kind": instrument.kind,
+            "display_name": instrument.display_name,
+            "brand": instrument.brand,
+            "last4": instrument.last4,
+            "expiry": instrument.expiry,
+            "handle": instrument.handle,
+            "vault_key": instrument.metadata.get("vault_key"),
+            "created_at": instrument.created_at,
+        }
+
+    @staticmethod
+    def _vault_key(instrument: PaymentInstrument) -> str:
+        return f"payment:{instrument.person_id}:{instrument.instrument_id}"
+
     def _store_instrument_secret(self, instrument: PaymentInstrument, token: str | None) -> str | None:
         if not token or not self.storage_client:
             return None
-        vault_key = f"payment:{instrument.person_id}:{instrument.instrument_id}"
-        payload = {"provider": instrument.provider, "kind": instrument.kind, "token": token}
+        vault_key = self._vault_key(instrument)
         try:
-            ok, status, _ = self.storage_client.put(f"/kv/vault/{vault_key}", {"value": payload})
-            if ok and status in {200, 201}:
-                return vault_key
-            logger.debug("vault store failed for %s: status=%s ok=%s", vault_key, status, ok)
+            self._write_instrument_secret(instrument, vault_key, token)
+            return vault_key
         except Exception as exc:
-            logger.debug("vault store exception for %s: %s", vault_key, exc)
+            logger.debug("vault store failed for %s: %s", vault_key, exc)
         return None
 
+    def _write_instrument_secret(self, instrument: PaymentInstrument, vault_key: str, token: str) -> None:
+        payload = {"provider": instrument.provider, "kind": instrument.kind, "token": token}
+        with self.telemetry.step("payments.vault.put", self.telemetry.vault, "put"):
+            ok, status, _ = self.storage_client.put(f"/kv/vault/{vault_key}", {"value": payload})
+            if self.vault_cache is not None:
+                self.vault_cache.invalidate(vault_key)
+            if not (ok and status in {200, 201}):
+                raise RuntimeError(f"vault store failed: status={status} ok={ok}")
+
     def _load_instrument_secret(self, instrument: PaymentInstrument | None) -> str | None:
         if not instrument or not self.storage_client:
             return None
@@ -154,10 +631,49 @@ class PaymentService:
         if not vault_key:
             return None
         try:
-            ok, status, body = self.storage_client.get(f"/kv/vault/{vault_key}")
-            if ok and status == 200 and isinstance(body, dict):
-                value = body.get("value") or {}
-                return value.get("token")
+            if self.vault_cache is not None:
+                return self.vault_cache.get_or_load(vault_key, lambda: self._fetch_instrument_secret(vault_key))
+            return self._fetch_instrument_secret(vault_key)
+        except Exception as exc:
+            logger.debug("vault fetch failed for %s: %s", vault_key, exc)
+        return None
+
+    async def _aload_instrument_secret(self, instrument: PaymentInstrument | None) -> str | None:
+        vault_key = instrument.metadata.get("vault_key") if instrument else None
+        if not vault_key or (self.async_storage_client is None and not self.storage_client):
+            return None
+        try:
+            if self.vault_cache is not None:
+                return await self.vault_cache.aget_or_load(vault_key, lambda: self._afetch_instrument_secret(vault_key))
+            return await self._afetch_instrument_secret(vault_key)
         except Exception as exc:
             logger.debug("vault fetch failed for %s: %s", vault_key, exc)
         return None
+
+    def _fetch_instrument_secret(self, vault_key: str) -> str | None:
+        with self.telemetry.step("payments.vault.get", self.telemetry.vault, "get"):
+            return self._secret_from_response(*self.storage_client.get(f"/kv/vault/{vault_key}"))
+
+    async def _afetch_instrument_secret(self, vault_key: str) -> str | None:
+        if self.async_storage_client is None:
+            return await run_in_threadpool(self._fetch_instrument_secret, vault_key)
+        with self.telemetry.step("payments.vault.get", self.telemetry.vault, "get"):
+            return self._secret_from_response(*await self.async_storage_client.get(f"/kv/vault/{vault_key}"))
+
+    @staticmethod
+    def _secret_from_response(ok: bool, status: int, body: Any) -> str | None:
+        if status == 404:
+            return None
+        if not ok:
+            raise RuntimeError(f"vault fetch failed: status={status}")
+        value = (body.get("value") or {}) if isinstance(body, dict) else {}
+        return value.get("token")
+
+    def _forget_instrument_secret(self, instrument: PaymentInstrument) -> None:
+        """Drop any cached token for ``instrument`` (called whenever it is (re-)registered)."""
+        if self.vault_cache is None:
+            return
+        self.vault_cache.invalidate(self._vault_key(instrument))
+        vault_key = instrument.metadata.get("vault_key")
+        if vault_key:
+            self.vault_cache.invalidate(vault_key)
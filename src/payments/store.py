@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import base64
+import json
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from .cache import TTLCache
+from .index import TransactionIndex
+from .models import PaymentStatus, PaymentTransaction
+
+TERMINAL_STATUSES = frozenset({PaymentStatus.SUCCEEDED.value, PaymentStatus.FAILED.value})
+
+
+def status_value(status: Any) -> str:
+    return status.value if hasattr(status, "value") else str(status)
+
+
+def is_terminal(status: Any) -> bool:
+    return status_value(status) in TERMINAL_STATUSES
+
+
+def encode_cursor(txn: PaymentTransaction) -> str:
+    return encode_position(txn.created_at, txn.txn_id)
+
+
+def encode_position(created_at: float, txn_id: str) -> str:
+    """Opaque ``(created_at, txn_id)`` position, as used by listing cursors and export watermarks."""
+    raw = json.dumps([created_at, txn_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Decode an opaque listing cursor; raises ValueError when it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, txn_id = json.loads(raw)
+        return float(created_at), str(txn_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+@dataclass
+class TransactionQuery:
+    """Filters for keyset-paginated listing, newest first.
+
+    ``created_after`` is inclusive and ``created_before`` exclusive; ``cursor`` is the
+    ``(created_at, txn_id)`` key of the last row of the previous page.
+    """
+
+    person_id: str | None = None
+    instrument_id: str | None = None
+    status: str | None = None
+    counterparty: str | None = None
+    created_after: float | None = None
+    created_before: float | None = None
+    cursor: Tuple[float, str] | None = None
+    limit: int = 50
+
+    def matches(self, txn: PaymentTransaction) -> bool:
+        if self.person_id is not None and txn.person_id != self.person_id:
+            return False
+        if self.instrument_id is not None and txn.instrument_id != self.instrument_id:
+            return False
+        if self.status is not None and status_value(txn.status) != self.status:
+            return False
+        if self.counterparty is not None and txn.counterparty != self.counterparty:
+            return False
+        return True
+
+
+def iter_query(store: "TransactionStore", query: TransactionQuery) -> Iterator[PaymentTransaction]:
+    """Every transaction matching ``query``, newest first, fetched a page (``query.limit``) at a time."""
+    query = replace(query)
+    while True:
+        page = store.query(query)
+        yield from page
+        if len(page) < query.limit:
+            return
+        query.cursor = (page[-1].created_at, page[-1].txn_id)
+
+
+# Row layout of ``TransactionStore.export_rows``; ``metadata`` is JSON text (None when empty).
+EXPORT_COLUMNS = (
+    "txn_id", "person_id", "instrument_id", "amount_minor", "currency", "status", "description", "counterparty",
+    "provider", "metadata", "created_at",
+)
+
+
+class TransactionStore:
+    """Storage interface for transactions keyed by ``txn_id``."""
+
+    def get(self, txn_id: str) -> PaymentTransaction | None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def put(self, txn: PaymentTransaction) -> None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def delete(self, txn_id: str) -> None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[PaymentTransaction]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def __len__(self) -> int:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def query(self, query: TransactionQuery) -> List[PaymentTransaction]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def get_many(self, txn_ids: Iterable[str]) -> Dict[str, PaymentTransaction]:
+        """The transactions among ``txn_ids`` that exist, keyed by ``txn_id``."""
+        found: Dict[str, PaymentTransaction] = {}
+        for txn_id in txn_ids:
+            txn = self.get(txn_id)
+            if txn is not None:
+                found[txn_id] = txn
+        return found
+
+    def get_summaries(self, txn_ids: Iterable[str]) -> Dict[str, Tuple[int, str, str]]:
+        """``(amount_minor, currency, status)`` of the transactions among ``txn_ids`` that exist.
+
+        The cheap projection bulk comparisons need; stores override it to skip building
+        full transactions.
+        """
+        return {
+            txn_id: (txn.amount_minor, txn.currency, status_value(txn.status))
+            for txn_id, txn in self.get_many(txn_ids).items()
+        }
+
+    def scan_amounts(
+        self, created_after: float | None = None, created_before: float | None = None
+    ) -> Iterator[Tuple[str, str, str, int, float]]:
+        """``(person_id, currency, status, amount_minor, created_at)`` of every transaction in the window.
+
+        The cheap projection reporting needs; stores override it to skip building full
+        transactions.
+        """
+        query = TransactionQuery(created_after=created_after, created_before=created_before, limit=1000)
+        for txn in iter_query(self, query):
+            yield txn.person_id, txn.currency, status_value(txn.status), txn.amount_minor, txn.created_at
+
+    def export_rows(
+        self, after: Tuple[float, str] | None = None, created_before: float | None = None
+    ) -> Iterator[Tuple[Any, ...]]:
+        """``EXPORT_COLUMNS`` tuples, oldest first, strictly after the ``(created_at, txn_id)`` position ``after``.
+
+        This default sorts everything the store holds; durable stores override it with a
+        keyset scan so memory stays flat.
+        """
+        rows = []
+        for txn in self:
+            position = (txn.created_at, txn.txn_id)
+            if (after is None or position > after) and (created_before is None or txn.created_at < created_before):
+                rows.append((position, txn))
+        rows.sort(key=lambda item: item[0])
+        for _, txn in rows:
+            yield (
+                txn.txn_id, txn.person_id, txn.instrument_id, txn.amount_minor, txn.currency, status_value(txn.status),
+                txn.description, txn.counterparty, txn.provider,
+                json.dumps(txn._metadata, separators=(",", ":")) if txn._metadata else None, txn.created_at,
+            )
+
+    def __contains__(self, txn_id: str) -> bool:
+        return self.get(txn_id) is not None
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryTransactionStore(TransactionStore):
+    """Bounded LRU/TTL transaction store.
+
+    Pending transactions live for ``pending_ttl`` seconds and terminal ones
+    (succeeded/failed) for ``terminal_ttl`` (by default one hour and five minutes with a
+    ``backend``). Without a backend this store is the only copy of a transaction, and the
+    mock provider answers status lookups from it, so by default nothing expires by age and
+    only ``max_entries`` bounds it. When ``backend`` is set, writes go through
+    to it and misses are read back from it, so this store acts as a hot cache in front of
+    a durable ledger. Without a backend, listing queries are answered from a
+    :class:`TransactionIndex` that tracks exactly the transactions held in memory.
+    With a backend, a TTL of ``0`` leaves transactions in that state uncached, so
+    processes sharing the ledger always read each other's latest status.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100000,
+        *,
+        pending_ttl: float | None = None,
+        terminal_ttl: float | None = None,
+        backend: TransactionStore | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if pending_ttl is None:
+            pending_ttl = 3600.0 if backend is not None else math.inf
+        if terminal_ttl is None:
+            terminal_ttl = 300.0 if backend is not None else math.inf
+        self.pending_ttl = pending_ttl
+        self.terminal_ttl = terminal_ttl
+        self.backend = backend
+        self._index = TransactionIndex() if backend is None else None
+        self._cache: TTLCache[PaymentTransaction] = TTLCache(
+            max_entries, pending_ttl, clock=clock, on_evict=self._evicted
+        )
+
+    def get(self, txn_id: str) -> PaymentTransaction | None:
+        txn = self._cache.get(txn_id)
+        if txn is None and self.backend is not None:
+            txn = self.backend.get(txn_id)
+            if txn is not None:
+                self._cache_put(txn)
+        return txn
+
+    def get_many(self, txn_ids: Iterable[str]) -> Dict[str, PaymentTransaction]:
+        # Bulk reads (reconciliation, exports) go straight to the ledger and leave the hot cache alone.
+        if self.backend is not None:
+            return self.backend.get_many(txn_ids)
+        found: Dict[str, PaymentTransaction] = {}
+        for txn_id in txn_ids:
+            txn = self._cache.peek(txn_id)
+            if txn is not None:
+                found[txn_id] = txn
+        return found
+
+    def get_summaries(self, txn_ids: Iterable[str]) -> Dict[str, Tuple[int, str, str]]:
+        if self.backend is not None:
+            return self.backend.get_summaries(txn_ids)
+        return super().get_summaries(txn_ids)
+
+    def scan_amounts(
+        self, created_after: float | None = None, created_before: float | None = None
+    ) -> Iterator[Tuple[str, str, str, int, float]]:
+        if self.backend is not None:
+            return self.backend.scan_amounts(created_after, created_before)
+        return super().scan_amounts(created_after, created_before)
+
+    def export_rows(
+        self, after: Tuple[float, str] | None = None, created_before: float | None = None
+    ) -> Iterator[Tuple[Any, ...]]:
+        if self.backend is not None:
+            return self.backend.export_rows(after, created_before)
+        return super().export_rows(after, created_before)
+
+    def put(self, txn: PaymentTransaction) -> None:
+        if self.backend is not None:
+            self.backend.put(txn)
+        else:
+            self._index.add(txn)
+        self._cache_put(txn)
+
+    def delete(self, txn_id: str) -> None:
+        self._cache.pop(txn_id)
+        if self.backend is not None:
+            self.backend.delete(txn_id)
+        else:
+            self._index.discard(txn_id)
+
+    def query(self, query: TransactionQuery) -> List[PaymentTransaction]:
+        if self.backend is not None:
+            return self.backend.query(query)
+        results: List[PaymentTransaction] = []
+        before = query.cursor
+        batch = max(query.limit, 64)
+        while len(results) < query.limit:
+            keys = self._index.scan(
+                person_id=query.person_id,
+                instrument_id=query.instrument_id,
+                created_after=query.created_after,
+                created_before=query.created_before,
+                before=before,
+                limit=batch,
+            )
+            for _, txn_id in keys:
+                txn = self._cache.peek(txn_id)
+                if txn is not None and query.matches(txn):
+                    results.append(txn)
+                    if len(results) >= query.limit:
+                        break
+            if len(keys) < batch:
+                break
+            before = keys[-1]
+        return results
+
+    def __iter__(self) -> Iterator[PaymentTransaction]:
+        if self.backend is not None:
+            return iter(self.backend)
+        return self._cache.values()
+
+    def __len__(self) -> int:
+        return len(self.backend) if self.backend is not None else len(self._cache)
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+    def _evicted(self, txn_id: str, txn: PaymentTransaction) -> None:
+        if self._index is not None:
+            self._index.discard(txn_id)
+
+    def _cache_put(self, txn: PaymentTransaction) -> None:
+        ttl = self._ttl_for(txn)
+        if ttl <= 0 and self.backend is not None:
+            self._cache.pop(txn.txn_id)
+        else:
+            self._cache.set(txn.txn_id, txn, ttl)
+
+    def _ttl_for(self, txn: PaymentTransaction) -> float:
+        return self.terminal_ttl if is_terminal(txn.status) else self.pending_ttl
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import inspect
+import logging
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .registry import ProviderTimeout
+
+logger = logging.getLogger(__name__)
+
+# Prometheus' default latency buckets, in seconds.
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+_FAST_BUCKETS: Tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025) + DEFAULT_BUCKETS
+
+_NULL = nullcontext()
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]+", "_", name).strip("_")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative latency histogram with Prometheus text rendering.
+
+    Label values are passed positionally in ``labelnames`` order; each distinct label
+    set gets its own bucket counts. ``observe`` is a bisect and a few additions under a
+    lock, cheap enough for every request.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Bucket counts (the last is +Inf), then sum and count.
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        with self._lock:
+            return {labels: {"count": series[-1], "sum": series[-2]} for labels, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in series:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {_number(cumulative)}")
+            rendered = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{rendered} {_number(values[-2])}")
+            lines.append(f"{self.name}_count{rendered} {_number(values[-1])}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels, "error" if exc_type else "ok")
+
+
+class _Step:
+    __slots__ = ("span", "timer")
+
+    def __init__(self, span: Any, timer: _Timer):
+        self.span = span
+        self.timer = timer
+
+    def __enter__(self) -> "_Step":
+        self.span.__enter__()
+        self.timer.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.timer.__exit__(exc_type, exc, tb)
+        self.span.__exit__(exc_type, exc, tb)
+
+
+class Telemetry:
+    """Hot-path latency histograms, optional OpenTelemetry spans and the ``/metrics`` text.
+
+    With ``metrics=False`` every timer is a shared no-op context; spans are only created
+    when a ``tracer`` (an OpenTelemetry ``Tracer``) is given.
+    """
+
+    def __init__(self, *, metrics: bool = True, tracer: Any | None = None):
+        self.metrics = metrics
+        self.tracer = tracer
+        self.provider_calls = Histogram(
+            "payments_provider_call_seconds",
+            "Latency of payment provider calls.",
+            ("provider", "operation", "status"),
+            _FAST_BUCKETS,
+        )
+        self.vault = Histogram(
+            "payments_vault_seconds", "Latency of vault reads and writes.", ("operation", "status"), _FAST_BUCKETS
+        )
+        self.profile = Histogram(
+            "payments_profile_seconds",
+            "Latency of context profile reads and writes.",
+            ("operation", "status"),
+            _FAST_BUCKETS,
+        )
+        self.events = Histogram(
+            "payments_event_emit_seconds", "Latency of payment event emission.", ("mode", "status"), _FAST_BUCKETS
+        )
+        self.transactions = Histogram(
+            "payments_transaction_seconds",
+            "End-to-end latency of PaymentService transaction creation.",
+            ("provider", "surface", "status"),
+            _FAST_BUCKETS,
+        )
+        self.requests = Histogram(
+            "payments_http_request_seconds",
+            "Latency of payments API handlers.",
+            ("route", "method", "status"),
+            _FAST_BUCKETS,
+        )
+
+    def timed(self, histogram: Histogram, *labels: str) -> Any:
+        """Context manager observing the block's latency with ``labels`` plus ``ok``/``error``."""
+        if not self.metrics:
+            return _NULL
+        return _Timer(histogram, labels)
+
+    def span(self, name: str, **attributes: Any) -> Any:
+        if self.tracer is None:
+            return _NULL
+        return self.tracer.start_as_current_span(
+            name, attributes={k: v for k, v in attributes.items() if v is not None}
+        )
+
+    def step(self, name: str, histogram: Histogram, *labels: str, **attributes: Any) -> Any:
+        """A span named ``name`` around a block that is also timed into ``histogram``."""
+        if self.tracer is None:
+            return self.timed(histogram, *labels)
+        span = self.span(name, **attributes)
+        return _Step(span, _Timer(histogram, labels)) if self.metrics else span
+
+    def observe_provider_call(self, provider: str, operation: str, latency: float, error: BaseException | None) -> None:
+        if not self.metrics:
+            return
+        if error is None:
+            status = "ok"
+        elif isinstance(error, LookupError):
+            status = "not_found"
+        else:
+            status = "timeout" if isinstance(error, ProviderTimeout) else "error"
+        self.provider_calls.observe(latency, provider, operation, status)
+
+    def histograms(self) -> List[Histogram]:
+        return [self.provider_calls, self.vault, self.profile, self.events, self.transactions, self.requests]
+
+    def render(self, components: Dict[str, Any] | None = None) -> str:
+        """Prometheus text exposition: the histograms plus numeric ``stats()`` of ``components``."""
+        lines: List[str] = []
+        if self.metrics:
+            for histogram in self.histograms():
+                lines.extend(histogram.render())
+        for name, stats in (components or {}).items():
+            if name == "providers":
+                for provider, provider_stats in stats.items():
+                    _render_stats(lines, "payments_provider", provider_stats, ("provider",), (provider,))
+            else:
+                _render_stats(lines, f"payments_{name}", stats, (), ())
+        return "\n".join(lines) + "\n"
+
+
+def _render_stats(
+    lines: List[str], prefix: str, stats: Dict[str, Any], names: Tuple[str, ...], values: Tuple[str, ...]
+) -> None:
+    """Flatten a ``stats()`` dict into gauges; strings become a ``{name}="value"`` label set to 1."""
+    for key, value in stats.items():
+        metric = _metric_name(f"{prefix}_{key}")
+        if isinstance(value, dict):
+            _render_stats(lines, metric, value, names, values)
+        elif isinstance(value, bool):
+            lines.append(f"{metric}{_labels(names, values)} {int(value)}")
+        elif isinstance(value, (int, float)):
+            lines.append(f"{metric}{_labels(names, values)} {_number(value)}")
+        elif isinstance(value, str):
+            lines.append(f"{metric}{_labels(names + (key,), values + (value,))} 1")
+
+
+def timed_route_class(resolve: Callable[[Any], Telemetry | None]) -> type:
+    """An ``APIRoute`` subclass recording handler latency by route template, method and status.
+
+    ``resolve(request)`` returns the telemetry to record into after each request, or None
+    to skip it (e.g. metrics are off, or the app's service is not running).
+
+    Exceptions are turned into responses here by the app's own exception handlers (as
+    Starlette's exception middleware would), so the recorded status is the one the client
+    gets: 422 for validation errors, whatever a custom handler returns, and 500 only for
+    exceptions no handler takes, which are re-raised.
+    """
+    from fastapi.routing import APIRoute
+    from starlette.concurrency import run_in_threadpool
+    from starlette.exceptions import HTTPException
+
+    async def handled(request, exc: Exception):
+        handlers, status_handlers = request.scope.get("starlette.exception_handlers", ({}, {}))
+        handler = status_handlers.get(exc.status_code) if isinstance(exc, HTTPException) else None
+        if handler is None:
+            handler = next((handlers[cls] for cls in type(exc).__mro__ if cls in handlers), None)
+        if handler is None:
+            raise exc
+        if inspect.iscoroutinefunction(handler):
+            return await handler(request, exc)
+        return await run_in_threadpool(handler, request, exc)
+
+    class TimedRoute(APIRoute):
+        def get_route_handler(self) -> Callable:
+            handler = super().get_route_handler()
+            route = self.path
+
+            async def timed_handler(request):
+                start = time.perf_counter()
+                status = 500
+                try:
+                    try:
+                        response = await handler(request)
+                    except Exception as exc:
+                        response = await handled(request, exc)
+                    status = response.status_code
+                    return response
+                finally:
+                    telemetry = resolve(request)
+                    if telemetry is not None:
+                        telemetry.requests.observe(time.perf_counter() - start, route, request.method, str(status))
+
+            return timed_handler
+
+    return TimedRoute
+
+
+def configure_tracing(service_name: str = "unison-payments") -> Any | None:
+    """Return an OpenTelemetry tracer, installing an SDK provider with the OTLP exporter.
+
+    Spans are exported when the standard ``OTEL_EXPORTER_OTLP_*`` settings point at a
+    collector. Returns None (tracing off) when the OpenTelemetry packages are missing.
+    """
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("tracing requested but opentelemetry-sdk is not installed; spans are disabled")
+        return None
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("OTLP exporter is not installed; spans are recorded but not exported")
+        else:
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        trace.set_tracer_provider(provider)
+    return trace.get_tracer("payments")
+
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .cache import TTLCache
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error", "stale", "future")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: str | None = None
+        self.error: BaseException | None = None
+        # Set when the key is invalidated mid-fetch: the result is returned but not cached.
+        self.stale = False
+        self.future: Tuple[Any, asyncio.Future] | None = None
+
+
+class VaultTokenCache:
+    """Short-lived in-memory cache of provider tokens read from the vault.
+
+    Values live only in this process's memory and are never included in ``repr``,
+    ``stats`` or log output. Concurrent misses for one key share a single fetch
+    (single-flight); failed or empty fetches are not cached. ``invalidate`` drops a key
+    and keeps an in-progress fetch for it from repopulating the cache.
+    """
+
+    def __init__(
+        self, max_entries: int = 1000, ttl: float = 60.0, *, clock: Callable[[], float] = time.monotonic
+    ):
+        self._cache: TTLCache[str] = TTLCache(max_entries, ttl, clock=clock)
+        self._in_flight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.invalidations = 0
+        self._load_seconds = 0.0
+        self._load_max = 0.0
+
+    def __repr__(self) -> str:
+        return f"VaultTokenCache(size={len(self._cache)}, max_entries={self._cache.max_entries})"
+
+    def get_or_load(self, key: str, loader: Callable[[], str | None]) -> str | None:
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            flight = self._in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._in_flight[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        start = time.perf_counter()
+        try:
+            flight.value = loader()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            self._finish(key, flight, time.perf_counter() - start)
+        return flight.value
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable[str | None]]) -> str | None:
+        """Async :meth:`get_or_load`; waiters are parked on the event loop, not on threads."""
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._in_flight[key] = _Flight()
+                flight.future = (loop, loop.create_future())
+            else:
+                self.coalesced += 1
+        if not owner:
+            if flight.future is not None and flight.future[0] is loop:
+                await asyncio.shield(flight.future[1])
+            else:
+                await asyncio.get_running_loop().run_in_executor(None, flight.done.wait)
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        start = time.perf_counter()
+        try:
+            flight.value = await loader()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            self._finish(key, flight, time.perf_counter() - start)
+            if not flight.future[1].done():
+                flight.future[1].set_result(None)
+        return flight.value
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key)
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                flight.stale = True
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            for flight in self._in_flight.values():
+                flight.stale = True
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self._cache.stats()
+        return {
+            "size": cache["size"],
+            "max_entries": cache["max_entries"],
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "hit_rate": cache["hit_rate"],
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "vault_loads": self.loads,
+            "vault_errors": self.load_errors,
+            "vault_latency_avg": self._load_seconds / self.loads if self.loads else 0.0,
+            "vault_latency_max": self._load_max,
+        }
+
+    def _finish(self, key: str, flight: _Flight, elapsed: float) -> None:
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self.loads += 1
+            self._load_seconds += elapsed
+            self._load_max = max(self._load_max, elapsed)
+            if flight.error is not None:
+                self.load_errors += 1
+            elif flight.value is not None and not flight.stale:
+                self._cache.set(key, flight.value)
+        flight.done.set()
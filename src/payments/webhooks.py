@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookQueueFull(Exception):
+    """The queue is at ``max_pending``; the provider should retry the delivery later."""
+
+
+@dataclass
+class WebhookDelivery:
+    provider: str
+    event_id: str
+    txn_id: str | None
+    raw_body: bytes
+    payload: Dict[str, Any] | None = None
+    seq: int | None = None
+    received_at: float = field(default_factory=time.time)
+
+    def parsed(self) -> Dict[str, Any]:
+        if self.payload is None:
+            self.payload = json.loads(self.raw_body) if self.raw_body else {}
+        return self.payload
+
+
+def webhook_event_id(payload: Dict[str, Any], raw_body: bytes) -> str:
+    """The provider's event ID, or a digest of the body for providers that do not send one."""
+    event_id = payload.get("event_id") or payload.get("id")
+    if event_id:
+        return str(event_id)
+    return "sha256:" + hashlib.sha256(raw_body).hexdigest()
+
+
+class _Shard:
+    def __init__(self) -> None:
+        self.queue: Deque[WebhookDelivery] = deque()
+        self.cond = threading.Condition()
+        self.busy = False
+        self.thread: threading.Thread | None = None
+
+
+class WebhookQueue:
+    """Accepts provider webhooks quickly and processes them on a pool of worker threads.
+
+    ``submit`` records the delivery (in ``backend`` when one is configured, see
+    ``SQLiteLedger``) and queues it; ``handler(provider, payload)`` runs later on a worker.
+    Deliveries are sharded by ``txn_id`` and each shard is worked by a single thread, so
+    deliveries for one transaction are processed in arrival order. Duplicate deliveries
+    (same provider and event ID) are dropped: by a unique index in the backend, or by a
+    bounded in-memory set without one. A failing delivery is retried with backoff on its
+    shard, holding back later deliveries for the same shard; after ``max_attempts`` it is
+    counted as failed and, with a backend, retried on the next start.
+
+    Unprocessed deliveries are re-queued on start by a replay thread that reads the
+    backend page by page and waits while ``max_pending`` deliveries are queued, so a large
+    backlog is never held in memory at once. When several processes share one backend,
+    pass ``replay_lease`` (seconds): only the process that claims the backend's replay
+    lease replays, so a multi-worker restart does not process the backlog once per worker.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, Dict[str, Any]], Any],
+        *,
+        workers: int = 4,
+        max_pending: int = 10000,
+        backend: Any | None = None,
+        dedupe_size: int = 100000,
+        max_attempts: int = 5,
+        backoff_base: float = 0.1,
+        backoff_max: float = 5.0,
+        retention: float = 7 * 86400.0,
+        replay_lease: float | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.backend = backend
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention = retention
+        self.replay_lease = replay_lease
+        self._sleep = sleep
+        self._shards = [_Shard() for _ in range(max(1, workers))]
+        # Without a backend, remember recent event IDs in insertion order (oldest evicted first).
+        self._seen: Dict[tuple, None] = {}
+        self._dedupe_size = dedupe_size
+        self._lock = threading.Lock()
+        self._room = threading.Condition(self._lock)
+        self._replay: threading.Thread | None = None
+        self._closing = False
+        self._pending = 0
+        self._received = 0
+        self._duplicates = 0
+        self._rejected = 0
+        self._processed = 0
+        self._failed = 0
+        self._retries = 0
+        self._last_lag = 0.0
+        self._max_lag = 0.0
+        self._rate_window: Deque[List[float]] = deque()
+
+    def start(self) -> "WebhookQueue":
+        """Start the workers and re-queue deliveries the backend has not seen processed."""
+        for index, shard in enumerate(self._shards):
+            if shard.thread is None:
+                shard.thread = threading.Thread(
+                    target=self._run, args=(shard,), name=f"payments-webhooks-{index}", daemon=True
+                )
+                shard.thread.start()
+        if self.backend is not None and self._replay is None and self._claim_replay():
+            self._replay = threading.Thread(target=self._run_replay, name="payments-webhooks-replay", daemon=True)
+            self._replay.start()
+        return self
+
+    def submit(self, provider: str, raw_body: bytes, payload: Dict[str, Any]) -> bool:
+        """Record and queue a delivery; returns False when it is a duplicate.
+
+        Raises :class:`WebhookQueueFull` when ``max_pending`` deliveries are waiting.
+        """
+        with self._lock:
+            if self._closing or self._pending >= self.max_pending:
+                self._rejected += 1
+                raise WebhookQueueFull("webhook queue is full")
+        delivery = WebhookDelivery(
+            provider=provider,
+            event_id=webhook_event_id(payload, raw_body),
+            txn_id=payload.get("txn_id"),
+            raw_body=raw_body,
+            payload=payload,
+        )
+        if not self._record(delivery):
+            with self._lock:
+                self._duplicates += 1
+            return False
+        with self._lock:
+            self._received += 1
+            self._count_ingest(delivery.received_at)
+        self._enqueue(delivery)
+        return True
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until replay has finished and every queued delivery has been processed;
+        returns False on timeout."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        replay = self._replay
+        if replay is not None:
+            replay.join(timeout)
+            if replay.is_alive():
+                return False
+        for shard in self._shards:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            with shard.cond:
+                if not shard.cond.wait_for(lambda: not shard.queue and not shard.busy, remaining):
+                    return False
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop accepting deliveries, drain what is queued (up to ``timeout``) and stop the workers."""
+        with self._lock:
+            self._closing = True
+            self._room.notify_all()
+        self.join(timeout)
+        for shard in self._shards:
+            with shard.cond:
+                shard.cond.notify_all()
+                thread, shard.thread = shard.thread, None
+            if thread is not None:
+                thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        oldest = None
+        for shard in self._shards:
+            with shard.cond:
+                if shard.queue and (oldest is None or shard.queue[0].received_at < oldest):
+                    oldest = shard.queue[0].received_at
+        with self._lock:
+            self._expire_window(now)
+            ingested = sum(count for _, count in self._rate_window)
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "workers": len(self._shards),
+                "received": self._received,
+                "duplicates": self._duplicates,
+                "rejected": self._rejected,
+                "processed": self._processed,
+                "failed": self._failed,
+                "retries": self._retries,
+                "ingest_rate": ingested / 60.0,
+                "lag_seconds": now - oldest if oldest is not None else 0.0,
+                "last_lag_seconds": self._last_lag,
+                "max_lag_seconds": self._max_lag,
+            }
+
+    def _claim_replay(self) -> bool:
+        if self.replay_lease is None:
+            return True
+        owner = f"{socket.gethostname()}:{os.getpid()}"
+        return self.backend.claim_lease("webhook_replay", owner, self.replay_lease)
+
+    def _run_replay(self) -> None:
+        # Deliveries left unqueued (on close or error) stay pending in the backend for the next start.
+        try:
+            for delivery in self.backend.pending_webhook_events():
+                with self._lock:
+                    self._room.wait_for(lambda: self._pending < self.max_pending or self._closing)
+                    if self._closing:
+                        return
+                self._enqueue(delivery)
+        except Exception as exc:
+            logger.warning("webhook replay failed: %s", exc)
+
+    def _record(self, delivery: WebhookDelivery) -> bool:
+        if self.backend is not None:
+            seq = self.backend.put_webhook_event(
+                delivery.provider, delivery.event_id, delivery.txn_id, delivery.raw_body, delivery.received_at
+            )
+            delivery.seq = seq
+            return seq is not None
+        key = (delivery.provider, delivery.event_id)
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen[key] = None
+            if len(self._seen) > self._dedupe_size:
+                del self._seen[next(iter(self._seen))]
+        return True
+
+    def _count_ingest(self, now: float) -> None:
+        second = float(int(now))
+        if self._rate_window and self._rate_window[-1][0] == second:
+            self._rate_window[-1][1] += 1
+        else:
+            self._rate_window.append([second, 1])
+        self._expire_window(now)
+
+    def _expire_window(self, now: float) -> None:
+        while self._rate_window and self._rate_window[0][0] <= now - 60:
+            self._rate_window.popleft()
+
+    def _enqueue(self, delivery: WebhookDelivery) -> None:
+        key = delivery.txn_id or delivery.event_id
+        shard = self._shards[zlib.crc32(key.encode("utf-8")) % len(self._shards)]
+        with self._lock:
+            self._pending += 1
+        with shard.cond:
+            shard.queue.append(delivery)
+            shard.cond.notify_all()
+
+    def _run(self, shard: _Shard) -> None:
+        while True:
+            with shard.cond:
+                shard.busy = False
+                shard.cond.notify_all()
+                shard.cond.wait_for(lambda: shard.queue or self._closing)
+                if not shard.queue:
+                    return
+                delivery = shard.queue.popleft()
+                shard.busy = True
+            self._process(delivery)
+
+    def _process(self, delivery: WebhookDelivery) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.handler(delivery.provider, delivery.parsed())
+            except Exception as exc:
+                if attempt >= self.max_attempts or self._closing:
+                    with self._lock:
+                        self._pending -= 1
+                        self._failed += 1
+                        self._room.notify_all()
+                    logger.warning(
+                        "webhook %s/%s failed after %s attempts: %s", delivery.provider, delivery.event_id, attempt, exc
+                    )
+                    return
+                with self._lock:
+                    self._retries += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+                self._sleep(delay * (0.5 + random.random() / 2))
+            else:
+                break
+        now = time.time()
+        if self.backend is not None and delivery.seq is not None:
+            try:
+                self.backend.mark_webhook_event_processed(delivery.seq, now)
+            except Exception as exc:
+                logger.debug("marking webhook %s processed failed: %s", delivery.seq, exc)
+        with self._lock:
+            self._pending -= 1
+            self._processed += 1
+            self._room.notify_all()
+            self._last_lag = now - delivery.received_at
+            self._max_lag = max(self._max_lag, self._last_lag)
+            purge = self.backend is not None and self._processed % 1000 == 0
+        if purge:
+            try:
+                self.backend.purge_webhook_events(now - self.retention)
+            except Exception as exc:
+                logger.debug("webhook purge failed: %s", exc)
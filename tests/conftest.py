@@ -0,0 +1,11 @@
+import pytest
+
+from payments.auth import reset_auth_settings
+
+
+@pytest.fixture(autouse=True)
+def _fresh_auth_settings():
+    # Auth settings are read once per process; tests change the env between cases.
+    reset_auth_settings()
+    yield
+    reset_auth_settings()
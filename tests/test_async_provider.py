@@ -0,0 +1,106 @@
+import asyncio
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.models import PaymentInstrument, PaymentStatus, PaymentTransaction
+from payments.providers import PaymentProvider
+
+
+class _SlowAsyncProvider:
+    name = "mock"
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+
+    async def register_instrument(self, instrument):
+        return instrument
+
+    async def create_transaction(self, request):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.latency)
+        self.active -= 1
+        return PaymentTransaction(
+            txn_id=str(uuid.uuid4()),
+            person_id=request.person_id,
+            instrument_id=request.instrument_id,
+            amount=request.amount,
+            currency=request.currency,
+            status=PaymentStatus.SUCCEEDED,
+            provider=self.name,
+        )
+
+    async def get_status(self, txn_id):
+        raise KeyError(txn_id)
+
+    async def handle_webhook(self, payload):
+        raise NotImplementedError
+
+
+class _SlowSyncProvider(PaymentProvider):
+    def __init__(self, latency):
+        self.latency = latency
+
+    def register_instrument(self, instrument):
+        return instrument
+
+    def create_transaction(self, request):
+        time.sleep(self.latency)
+        return PaymentTransaction(
+            txn_id=str(uuid.uuid4()),
+            person_id=request.person_id,
+            instrument_id=request.instrument_id,
+            amount=request.amount,
+            currency=request.currency,
+            status=PaymentStatus.SUCCEEDED,
+            provider=self.name,
+        )
+
+
+def _app(provider):
+    app = FastAPI()
+    service = register_payment_routes(app, provider=provider)
+    asyncio.run(
+        service.aregister_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"))
+    )
+    return app
+
+
+_CHARGE = {"person_id": "p1", "instrument_id": "i1", "amount": 1.0, "authorization_context": {"approved": True}}
+
+
+def test_async_provider_is_not_bound_by_the_threadpool(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    provider = _SlowAsyncProvider(latency=0.2)
+    app = _app(provider)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/payments/transactions", json=_CHARGE) for _ in range(100)))
+
+    responses = asyncio.run(run())
+    assert all(resp.status_code == 200 for resp in responses)
+    # Starlette's threadpool allows 40 concurrent sync calls; the async path is not capped by it.
+    assert provider.peak == 100
+
+
+def test_sync_provider_works_through_the_adapter(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    client = TestClient(_app(_SlowSyncProvider(latency=0)))
+    resp = client.post("/payments/transactions", json=_CHARGE)
+    assert resp.status_code == 200 and resp.json()["transaction"]["amount"] == 1.0
+
+
+def test_bulk_path_drives_async_provider_from_worker_threads(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    client = TestClient(_app(_SlowAsyncProvider(latency=0)))
+    body = client.post("/payments/transactions/bulk", json=[_CHARGE, _CHARGE]).json()
+    assert body["succeeded"] == 2
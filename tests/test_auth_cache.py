@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from payments import auth
+
+
+def _token(secret="s3cret", exp_in=3600, **claims):
+    claims = {"sub": "u1", "iss": "unison-auth", "aud": "unison-internal", "exp": int(time.time()) + exp_in, **claims}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+@pytest.fixture
+def secret(monkeypatch):
+    monkeypatch.setenv("UNISON_AUTH_SECRET", "s3cret")
+    monkeypatch.delenv("DISABLE_AUTH_FOR_TESTS", raising=False)
+
+
+def test_verified_tokens_are_cached(secret):
+    header = f"Bearer {_token()}"
+    first = asyncio.run(auth.auth_dependency(header))
+    second = asyncio.run(auth.auth_dependency(header))
+    assert first["sub"] == second["sub"] == "u1"
+    cache = auth.get_token_cache()
+    assert cache.misses == 1 and cache.hits == 1
+
+
+def test_cached_claims_are_not_shared_between_requests(secret):
+    header = f"Bearer {_token(roles=['viewer'])}"
+    for _ in range(2):
+        claims = asyncio.run(auth.auth_dependency(header))
+        assert claims["sub"] == "u1" and claims["roles"] == ["viewer"]
+        claims["sub"] = "someone-else"
+        claims["roles"].append("admin")
+
+
+def test_invalid_and_missing_tokens_are_rejected_and_not_cached(secret):
+    for header in (None, "Basic abc", f"Bearer {_token(secret='wrong')}", f"Bearer {_token(exp_in=-10)}"):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(auth.auth_dependency(header))
+        assert exc.value.status_code == 401
+    assert len(auth.get_token_cache()) == 0
+
+
+def test_cache_entry_never_outlives_token_exp(secret):
+    token = _token(exp_in=2)
+    asyncio.run(auth.auth_dependency(f"Bearer {token}"))
+    cache = auth.get_token_cache()
+    (_, expires_at), = cache._data.values()
+    assert expires_at - time.monotonic() <= 2
+
+
+def test_cache_can_be_disabled(secret, monkeypatch):
+    monkeypatch.setenv("UNISON_AUTH_CACHE_SIZE", "0")
+    auth.reset_auth_settings()
+    assert asyncio.run(auth.auth_dependency(f"Bearer {_token()}"))["sub"] == "u1"
+    assert auth.get_token_cache() is None
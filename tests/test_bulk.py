@@ -0,0 +1,118 @@
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.limits import LimitExceeded, LimitRule
+from payments.models import PaymentInstrument, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.registry import ProviderTimeout
+from payments.service import PaymentService
+
+
+class _CountingClient:
+    def __init__(self):
+        self.calls = []
+        self.profiles = {}
+
+    def get(self, path, **_):
+        self.calls.append(("GET", path))
+        if path.startswith("/profile/") and path in self.profiles:
+            return True, 200, {"profile": self.profiles[path]}
+        if path.startswith("/kv/vault/"):
+            return True, 200, {"value": {"token": "tok"}}
+        return False, 404, None
+
+    def post(self, path, payload, **_):
+        self.calls.append(("POST", path))
+        self.profiles[path] = payload["profile"]
+        return True, 200, {}
+
+    def put(self, path, payload, **_):
+        self.calls.append(("PUT", path))
+        return True, 201, {}
+
+
+def test_batch_registration_writes_each_profile_once():
+    context, storage = _CountingClient(), _CountingClient()
+    service = PaymentService(MockPaymentProvider(), context_client=context, storage_client=storage)
+    items = [
+        (PaymentInstrument(instrument_id=f"i{n}", person_id=f"p{n % 2}", provider="mock", kind="card"), "tok")
+        for n in range(6)
+    ]
+    results = service.register_instruments_batch(items)
+    assert [r.instrument_id for r in results] == [f"i{n}" for n in range(6)]
+    assert context.calls.count(("POST", "/profile/p0")) == 1
+    assert context.calls.count(("POST", "/profile/p1")) == 1
+    assert len(context.profiles["/profile/p0"]["payments"]["instruments"]) == 3
+    assert len([c for c in storage.calls if c[0] == "PUT"]) == 6
+
+    requests = [
+        PaymentTransactionRequest(person_id="p0", instrument_id="i0", amount=1.0, authorization_context={"approved": True})
+        for _ in range(5)
+    ]
+    txns = service.create_transactions_batch(requests)
+    assert len({txn.txn_id for txn in txns}) == 5
+    assert storage.calls.count(("GET", "/kv/vault/payment:p0:i0")) == 1
+
+
+def test_bulk_endpoints_accept_json_and_ndjson(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    register_payment_routes(app)
+    client = TestClient(app)
+
+    resp = client.post(
+        "/payments/instruments/bulk",
+        json=[{"person_id": "p1", "kind": "card"}, {"kind": "card"}, {"person_id": "p2"}],
+    )
+    body = resp.json()
+    assert resp.status_code == 200 and body["succeeded"] == 2 and body["failed"] == 1
+    assert body["results"][1]["ok"] is False and body["results"][1]["index"] == 1
+    assert body["results"][1]["code"] == "invalid_item"
+    instrument_id = body["results"][0]["instrument"]["instrument_id"]
+
+    lines = [
+        {"person_id": "p1", "instrument_id": instrument_id, "amount": 1.5, "authorization_context": {"approved": True}},
+        {"person_id": "p1", "instrument_id": instrument_id, "amount": 2.5},
+    ]
+    resp = client.post(
+        "/payments/transactions/bulk",
+        content="\n".join(json.dumps(line) for line in lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    body = resp.json()
+    assert resp.status_code == 200 and body["succeeded"] == 1
+    assert body["results"][0]["transaction"]["amount"] == 1.5
+    assert body["results"][1] == {
+        "index": 1, "ok": False, "code": "approval_required", "error": "payment requires explicit approval",
+    }
+
+    assert client.post("/payments/transactions/bulk", content=b"not json").status_code == 400
+
+
+def test_bulk_errors_have_stable_codes_and_hide_internal_messages(monkeypatch, caplog):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    rule = LimitRule.parse("person:amount:10/1d")
+    service.create_transactions_batch = lambda requests: [
+        LimitExceeded("person limit person:amount:10/86400s exceeded", rule, 30.4),
+        ProviderTimeout("provider 'psp' timed out after 2.0s"),
+        KeyError("i9"),
+        RuntimeError("connect to postgres://payments:hunter2@db failed"),
+    ]
+    line = {"person_id": "p1", "instrument_id": "i1", "amount": 1.0, "authorization_context": {"approved": True}}
+    body = client.post("/payments/transactions/bulk", json=[line] * 4).json()
+
+    assert [(item["code"], item["error"]) for item in body["results"]] == [
+        ("limit_exceeded", "person limit person:amount:10/86400s exceeded"),
+        ("provider_timeout", "provider timed out"),
+        ("not_found", "not found"),
+        ("internal_error", "internal error"),
+    ]
+    assert body["results"][0]["retry_after"] == 30 and body["failed"] == 4
+    assert "hunter2" in caplog.text and "hunter2" not in json.dumps(body)
+    service.close()
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+
+from payments.clients import AsyncServiceHttpClient, ClientSettings, ServiceHttpClient
+
+
+def _echo_transport(seen):
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.method, request.url.path))
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"method": request.method})
+
+    return httpx.MockTransport(handler)
+
+
+def test_sync_client_reuses_pool_and_supports_put():
+    seen = []
+    client = ServiceHttpClient("stub", "1", transport=_echo_transport(seen))
+    assert client.get("/profile/p1") == (True, 200, {"method": "GET"})
+    pool = client._client
+    assert client.post("/profile/p1", {"profile": {}}) == (True, 200, {"method": "POST"})
+    assert client.put("/kv/vault/k", {"value": {}}) == (True, 200, {"method": "PUT"})
+    assert client._client is pool
+    assert client.get("/missing") == (False, 404, None)
+    assert seen[0] == ("GET", "/profile/p1")
+    client.close()
+    assert client._client is None
+
+
+def test_sync_client_maps_transport_errors():
+    def handler(request):
+        raise httpx.ConnectError("refused")
+
+    client = ServiceHttpClient("stub", "1", transport=httpx.MockTransport(handler))
+    assert client.get("/profile/p1") == (False, 500, None)
+
+
+def test_async_client_round_trip():
+    seen = []
+
+    async def run():
+        client = AsyncServiceHttpClient("stub", "1", transport=_echo_transport(seen))
+        try:
+            return await client.get("/a"), await client.put("/b", {"value": 1})
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == ((True, 200, {"method": "GET"}), (True, 200, {"method": "PUT"}))
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("UNISON_STORAGE_CONNECT_TIMEOUT", "0.5")
+    monkeypatch.setenv("UNISON_STORAGE_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("UNISON_STORAGE_HTTP2", "true")
+    settings = ClientSettings.from_env("UNISON_STORAGE")
+    assert settings.connect_timeout == 0.5
+    assert settings.read_timeout == 2.0
+    assert settings.max_connections == 7
+    assert settings.http2 is True
@@ -0,0 +1,54 @@
+import gzip
+import json
+
+from payments.logging import BATCH_PATH, PaymentEventLogger
+
+
+class _BatchClient:
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.batches = []
+
+    def post_content(self, path, content, *, headers=None):
+        assert path == BATCH_PATH
+        assert headers["Content-Encoding"] == "gzip"
+        lines = gzip.decompress(content).decode("utf-8").splitlines()
+        self.batches.append([json.loads(line) for line in lines])
+        return (True, 202, None) if self.ok else (False, 503, None)
+
+
+def _emit(emitter, count):
+    for i in range(count):
+        emitter.log_event(event_type="PaymentTransactionSucceeded", subject_id=f"t{i}", person_id="p", provider="mock", status="succeeded")
+
+
+def test_batches_by_count_and_flushes_on_close():
+    client = _BatchClient()
+    emitter = PaymentEventLogger(client, batch_size=10, flush_interval=60)
+    _emit(emitter, 25)
+    emitter.close()
+    sizes = sorted(len(batch) for batch in client.batches)
+    assert sum(sizes) == 25 and max(sizes) == 10
+    assert [event["subject_id"] for batch in client.batches for event in batch] == [f"t{i}" for i in range(25)]
+    stats = emitter.stats()
+    assert stats["events_sent"] == 25 and stats["batches_failed"] == 0 and stats["pending"] == 0
+
+
+def test_batches_by_time():
+    client = _BatchClient()
+    emitter = PaymentEventLogger(client, batch_size=500, flush_interval=0.01)
+    _emit(emitter, 3)
+    for _ in range(100):
+        if client.batches:
+            break
+        emitter._thread.join(0.01)
+    assert client.batches and len(client.batches[0]) == 3
+    emitter.close()
+
+
+def test_failed_batches_are_accounted():
+    emitter = PaymentEventLogger(_BatchClient(ok=False), batch_size=2, flush_interval=60)
+    _emit(emitter, 4)
+    emitter.close()
+    stats = emitter.stats()
+    assert stats["batches_failed"] == 2 and stats["events_failed"] == 4 and stats["events_sent"] == 0
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import payments.export as export_module
+from payments.api import register_payment_routes
+from payments.export import Export, main
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+
+
+def _put(store, n, created_at, **extra):
+    store.put(
+        PaymentTransaction(
+            f"t{n:03d}", "p1", "i1", "1.25", "USD", PaymentStatus.SUCCEEDED, created_at=created_at, **extra
+        )
+    )
+
+
+def _csv_rows(data):
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+
+
+def test_chunked_csv_export_with_watermarks(tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    for n in range(25):
+        _put(ledger, n, 100 + n // 2, metadata={"n": n} if n == 3 else None)
+
+    first = Export(ledger, "csv", until=106, chunk_rows=5)
+    chunks = list(first)
+    rows = _csv_rows(b"".join(chunks))
+    assert first.rows == len(rows) == 12 and len(chunks) == 3
+    assert rows[3] == {
+        "txn_id": "t003", "person_id": "p1", "instrument_id": "i1", "amount_minor": "125", "currency": "USD",
+        "status": "succeeded", "description": "", "counterparty": "", "provider": "", "metadata": '{"n":3}',
+        "created_at": "101.0",
+    }
+
+    _put(ledger, 99, 105.5)  # arrives late, but before the watermark: already past, never exported
+    second = Export(ledger, "csv", since=first.watermark)
+    assert [row["txn_id"] for row in _csv_rows(b"".join(second))] == [f"t{n:03d}" for n in range(12, 25)]
+    third = Export(ledger, "csv", since=second.watermark, until=50)
+    assert _csv_rows(b"".join(third)) == [] and third.watermark == second.watermark
+    ledger.close()
+
+
+def test_arrow_and_parquet_round_trip(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    for n in range(7):
+        _put(ledger, n, 100 + n)
+    arrow = pa.ipc.open_stream(b"".join(Export(ledger, "arrow", chunk_rows=3))).read_all()
+    assert arrow.num_rows == 7 and arrow.schema.field("amount_minor").type == pa.int64()
+    data = b"".join(Export(ledger, "parquet", chunk_rows=3))
+    assert pq.ParquetFile(io.BytesIO(data)).num_row_groups == 3
+    assert pq.read_table(io.BytesIO(data)).column("txn_id").to_pylist() == [f"t{n:03d}" for n in range(7)]
+    ledger.close()
+
+
+def test_csv_only_without_pyarrow(monkeypatch, tmp_path):
+    monkeypatch.setattr(export_module, "use_pyarrow", False)
+    assert export_module.available_formats() == ("csv",)
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    with pytest.raises(ValueError):
+        Export(ledger, "parquet")
+    ledger.close()
+
+
+def test_export_endpoint_streams_incrementally(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    for n in range(3):
+        _put(service.transactions, n, 100 + n)
+
+    resp = client.get("/payments/exports/transactions", params={"until": 102})
+    assert resp.headers["content-type"].startswith("text/csv")
+    assert [row["txn_id"] for row in _csv_rows(resp.content)] == ["t000", "t001"]
+    resp = client.get("/payments/exports/transactions", params={"since": resp.headers["X-Export-Watermark"]})
+    assert [row["txn_id"] for row in _csv_rows(resp.content)] == ["t002"]
+    assert client.get("/payments/exports/transactions", params={"since": "garbage"}).status_code == 400
+    assert client.get("/payments/exports/transactions", params={"format": "xlsx"}).status_code == 422
+    service.close()
+
+
+def test_cli_keeps_a_watermark_file(tmp_path, capsys):
+    path = str(tmp_path / "ledger.db")
+    ledger = SQLiteLedger(path)
+    _put(ledger, 1, 100)
+    ledger.close()
+    watermark = str(tmp_path / "watermark")
+    argv = ["--ledger", path, "--watermark-file", watermark]
+
+    assert main([str(tmp_path / "first.csv"), "--until", "150", *argv]) == 0
+    assert json.loads(capsys.readouterr().err)["rows"] == 1
+    ledger = SQLiteLedger(path)
+    _put(ledger, 2, 200)
+    ledger.close()
+    assert main([str(tmp_path / "second.csv"), "--until", "250", *argv]) == 0
+    assert [row["txn_id"] for row in _csv_rows((tmp_path / "second.csv").read_bytes())] == ["t002"]
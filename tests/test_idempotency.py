@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.idempotency import IdempotencyCache, IdempotencyConflict, IdempotencyInProgress
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentInstrument, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+
+
+def test_concurrent_duplicates_run_once():
+    cache = IdempotencyCache()
+    calls = []
+    release = threading.Event()
+
+    def charge():
+        calls.append(1)
+        release.wait(5)
+        return "txn-1"
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(cache.execute, "k", "h", charge) for _ in range(5)]
+        time.sleep(0.05)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert sorted(results) == [("txn-1", False)] + [("txn-1", True)] * 4
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 4 and stats["in_flight"] == 0
+
+
+def test_conflicting_payload_and_failures():
+    cache = IdempotencyCache()
+    with pytest.raises(RuntimeError):
+        cache.execute("k", "h", lambda: (_ for _ in ()).throw(RuntimeError("provider down")))
+    assert cache.execute("k", "h", lambda: "ok") == ("ok", False)
+    with pytest.raises(IdempotencyConflict):
+        cache.execute("k", "other", lambda: "nope")
+    assert cache.stats()["conflicts"] == 1
+
+
+def test_replay_survives_restart_with_ledger(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    request = PaymentTransactionRequest(person_id="p1", instrument_id="i1", amount=5.0, authorization_context={"approved": True})
+
+    def build():
+        ledger = SQLiteLedger(path)
+        service = PaymentService(MockPaymentProvider(), ledger=ledger)
+        service.idempotency = IdempotencyCache(
+            backend=ledger, encode=lambda txn: txn.txn_id, decode=service.get_transaction_status
+        )
+        return service
+
+    service = build()
+    service.register_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"))
+    first, replayed = service.create_transaction_idempotent(request, "key-1")
+    assert not replayed
+    service.close()
+
+    restarted = build()
+    again, replayed = restarted.create_transaction_idempotent(request, "key-1")
+    assert replayed and again.txn_id == first.txn_id
+    restarted.close()
+
+
+def test_workers_sharing_a_ledger_run_a_key_once(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledgers = [SQLiteLedger(path), SQLiteLedger(path)]
+    caches = [IdempotencyCache(backend=ledger, encode=str, decode=str, wait_timeout=5) for ledger in ledgers]
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def charge():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "txn-1"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(caches[0].execute, "k", "h", charge)
+        assert started.wait(5)
+        second = pool.submit(caches[1].execute, "k", "h", charge)  # another worker, no shared memory
+        time.sleep(0.05)
+        release.set()
+        assert first.result() == ("txn-1", False) and second.result() == ("txn-1", True)
+    assert len(calls) == 1 and caches[1].stats()["shared_replays"] == 1
+
+    # A failed attempt releases its claim; a claim left by a dead worker goes stale.
+    with pytest.raises(RuntimeError):
+        caches[0].execute("k2", "h", lambda: (_ for _ in ()).throw(RuntimeError("provider down")))
+    assert caches[1].execute("k2", "h", lambda: "txn-2") == ("txn-2", False)
+    assert ledgers[0].claim_idempotency_key("k3", "h", stale_before=0, expired_before=0) is None
+    caches[1].claim_ttl = 0.0
+    assert caches[1].execute("k3", "h", lambda: "txn-3") == ("txn-3", False)
+    with pytest.raises(IdempotencyConflict):
+        caches[0].execute("k3", "other", lambda: "nope")
+    for ledger in ledgers:
+        ledger.close()
+
+
+def test_unreadable_stored_result_is_never_run_again(tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    IdempotencyCache(backend=ledger, encode=str, decode=str).execute("k", "h", lambda: "txn-1")
+
+    def expired(txn_id):
+        raise KeyError(txn_id)  # e.g. the transaction left the store and the provider is down
+
+    calls = []
+    for shared in (False, True):
+        cache = IdempotencyCache(backend=ledger, encode=str if shared else None, decode=expired)
+        with pytest.raises(IdempotencyInProgress):
+            cache.execute("k", "h", lambda: calls.append(1) or "txn-2")
+    assert calls == [] and ledger.get_idempotency_key("k", max_age=60) == ("h", "txn-1")
+    ledger.close()
+
+
+def test_async_replay_loads_outside_the_lock_and_off_the_loop(tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    IdempotencyCache(backend=ledger, encode=str, decode=str).execute("k", "h", lambda: "txn-1")
+    seen = []
+
+    def decode(txn_id):
+        seen.append((cache._lock.locked(), threading.get_ident()))
+        return txn_id
+
+    cache = IdempotencyCache(backend=ledger, decode=decode)
+
+    async def replay():
+        return await cache.aexecute("k", "h", _never_called), threading.get_ident()
+
+    result, loop_thread = asyncio.run(replay())
+    assert result == ("txn-1", True)
+    assert [locked for locked, _ in seen] == [False] and seen[0][1] != loop_thread
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 0
+    ledger.close()
+
+
+async def _never_called():
+    raise AssertionError("a stored key must be replayed, not run")
+
+
+def test_api_replays_and_rejects_mismatch(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    service.register_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"))
+    client = TestClient(app)
+    payload = {"person_id": "p1", "instrument_id": "i1", "amount": 2.5, "authorization_context": {"approved": True}}
+    headers = {"Idempotency-Key": "abc"}
+
+    first = client.post("/payments/transactions", json=payload, headers=headers)
+    second = client.post("/payments/transactions", json=payload, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert first.json()["transaction"]["txn_id"] == second.json()["transaction"]["txn_id"]
+    assert "Idempotent-Replayed" not in first.headers and second.headers["Idempotent-Replayed"] == "true"
+
+    mismatch = client.post("/payments/transactions", json=dict(payload, amount=3.0), headers=headers)
+    assert mismatch.status_code == 422
+    assert service.idempotency.stats()["hit_rate"] == 0.5
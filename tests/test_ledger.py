@@ -0,0 +1,47 @@
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentInstrument, PaymentStatus, PaymentTransaction, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+
+
+def _txn(txn_id, status=PaymentStatus.CREATED):
+    return PaymentTransaction(
+        txn_id=txn_id,
+        person_id="p1",
+        instrument_id="i1",
+        amount=12.5,
+        currency="USD",
+        status=status,
+        authorization_context={"approved": True},
+        metadata={"k": "v"},
+    )
+
+
+def test_ledger_round_trip_and_group_commit(tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"), group_commit_size=3, group_commit_interval=0)
+    ledger.put(_txn("t1"))
+    ledger.put(_txn("t2"))
+    assert ledger.stats()["pending_writes"] == 2
+    assert ledger.get("t1").metadata == {"k": "v"}
+    ledger.put(_txn("t1", PaymentStatus.SUCCEEDED))
+    assert ledger.stats() == {"pending_writes": 0, "group_commits": 1}
+    assert ledger.get("t1").status == PaymentStatus.SUCCEEDED
+    assert len(ledger) == 2
+    assert sorted(txn.txn_id for txn in ledger) == ["t1", "t2"]
+    ledger.close()
+
+
+def test_service_state_survives_restart(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledger = SQLiteLedger(path)
+    service = PaymentService(MockPaymentProvider(), ledger=ledger)
+    service.register_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"))
+    txn = service.create_transaction(
+        PaymentTransactionRequest(person_id="p1", instrument_id="i1", amount=3.0, authorization_context={"approved": True})
+    )
+    service.close()
+
+    restarted = PaymentService(MockPaymentProvider(), ledger=SQLiteLedger(path))
+    assert restarted.get_instrument("i1").kind == "card"
+    assert restarted.get_transaction_status(txn.txn_id).amount == 3.0
+    restarted.close()
@@ -0,0 +1,126 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.limits import LimitExceeded, LimitRule, LimitsEngine
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.store import TransactionQuery
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _txn(txn_id, amount, created_at, status=PaymentStatus.SUCCEEDED, currency="USD"):
+    return PaymentTransaction(
+        txn_id=txn_id, person_id="p1", instrument_id="i1", amount=amount, currency=currency, status=status,
+        provider="mock", created_at=created_at,
+    )
+
+
+def test_rule_parsing():
+    assert LimitRule.parse("person:amount:1000/1d") == LimitRule("person", "amount", 1000.0, 86400.0)
+    assert LimitRule.parse(" instrument:count:5/90 ").window == 90.0
+    assert LimitRule.parse("person:amount:500eur/1d").currency == "EUR"
+    for bad in ("person:amount:10", "account:count:1/1m", "person:count:1/0s", "person:count:5USD/1m"):
+        with pytest.raises(ValueError):
+            LimitRule.parse(bad)
+
+
+def test_sliding_window_amount_and_velocity():
+    clock = _Clock()
+    engine = LimitsEngine.from_spec("person:amount:100/100s,instrument:count:3/10s", buckets=10, clock=clock)
+
+    engine.reserve("p1", "i1", 6000, "USD")
+    with pytest.raises(LimitExceeded) as exc:
+        engine.reserve("p1", "i2", 5000, "USD")
+    assert exc.value.rule.metric == "amount" and 0 < exc.value.retry_after <= 10
+
+    # A failed charge gives its amount back but still counts as an attempt.
+    engine.release(engine.reserve("p1", "i1", 4000, "USD"))
+    engine.reserve("p2", "i1", 100, "USD")
+    with pytest.raises(LimitExceeded) as exc:
+        engine.reserve("p3", "i1", 100, "USD")
+    assert exc.value.rule.name == "instrument:count:3/10s"
+    assert engine.usage("person", "p1") == {"person:amount:100/100s": 60.0}
+
+    clock.now += 11
+    engine.reserve("p3", "i1", 100, "USD")
+    clock.now += 90
+    engine.reserve("p1", "i1", 10000, "USD")
+    assert engine.stats()["rejections"] == {"person:amount:100/100s": 1, "instrument:count:3/10s": 1}
+
+
+def test_amounts_are_capped_per_currency_in_minor_units():
+    engine = LimitsEngine.from_spec("person:amount:100/1d,person:amount:50EUR/1d,person:count:5/1d", clock=_Clock())
+    engine.reserve("p1", "i1", 9000, "USD")
+    engine.reserve("p1", "i1", 99_000, "KWD")  # 99.000 KWD: its own 100 KWD cap, not added to USD
+    engine.reserve("p1", "i1", 100, "JPY")  # 100 yen: exactly the cap, in yen
+    with pytest.raises(LimitExceeded) as exc:
+        engine.reserve("p1", "i1", 1_001, "usd")
+    assert exc.value.rule.name == "person:amount:100/86400s"
+    with pytest.raises(LimitExceeded) as exc:
+        engine.reserve("p1", "i1", 5_001, "EUR")
+    assert exc.value.rule.name == "person:amount:50EUR/86400s"
+    engine.reserve("p1", "i1", 5_000, "EUR")
+    assert engine.usage("person", "p1", "KWD") == {"person:amount:100/86400s": 99.0, "person:count:5/86400s": 4.0}
+    assert engine.usage("person", "p1", "EUR") == {
+        "person:amount:100/86400s": 50.0, "person:amount:50EUR/86400s": 50.0, "person:count:5/86400s": 4.0,
+    }
+    assert engine.rebuild([_txn("t1", 1.5, 990, currency="KWD")]) == 1
+    assert engine.usage("person", "p1", "KWD")["person:amount:100/86400s"] == 100.5
+
+
+def test_non_positive_amounts_cannot_free_up_the_window():
+    engine = LimitsEngine.from_spec("person:amount:1000/1d", clock=_Clock())
+    engine.reserve("p1", "i1", 90_000, "USD")
+    for amount in (0, -10_000_000):
+        with pytest.raises(ValueError):
+            engine.reserve("p1", "i1", amount, "USD")
+    with pytest.raises(LimitExceeded):
+        engine.reserve("p1", "i1", 90_000, "USD")
+    assert engine.usage("person", "p1") == {"person:amount:1000/86400s": 900.0}
+
+
+def test_rebuild_counts_recent_transactions_only():
+    clock = _Clock()
+    engine = LimitsEngine.from_spec("person:amount:100/60s,person:count:10/60s", clock=clock)
+    counted = engine.rebuild(
+        [_txn("new", 50, 990), _txn("failed", 30, 995, PaymentStatus.FAILED), _txn("old", 70, 900)]
+    )
+    assert counted == 2
+    assert engine.usage("person", "p1") == {"person:amount:100/60s": 50.0, "person:count:10/60s": 2.0}
+
+
+def test_limit_exceeded_returns_429_before_the_provider_call(monkeypatch, tmp_path):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    monkeypatch.setenv("UNISON_PAYMENTS_LIMITS", "person:amount:10/1d")
+    monkeypatch.setenv("UNISON_PAYMENTS_LEDGER_PATH", str(tmp_path / "ledger.db"))
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    instrument = client.post("/payments/instruments", json={"person_id": "p1", "kind": "card"}).json()["instrument"]
+    charge = {"person_id": "p1", "instrument_id": instrument["instrument_id"], "amount": 6.0}
+    charge["authorization_context"] = {"approved": True}
+
+    assert client.post("/payments/transactions", json=charge).status_code == 200
+    resp = client.post("/payments/transactions", json=charge)
+    assert resp.status_code == 429 and int(resp.headers["Retry-After"]) >= 1
+    assert len(service.list_transactions(TransactionQuery(person_id="p1"))) == 1
+    for amount in (0, -100):
+        assert client.post("/payments/transactions", json={**charge, "amount": amount}).status_code == 422
+    bulk = client.post("/payments/transactions/bulk", json=[{**charge, "amount": -100}]).json()
+    assert bulk["results"][0]["code"] == "invalid_item"
+    assert service.limits.usage("person", "p1") == {"person:amount:10/86400s": 6.0}
+    service.close()
+
+    # Counters are rebuilt from the ledger on startup.
+    restarted = register_payment_routes(FastAPI())
+    assert restarted.limits.usage("person", "p1") == {"person:amount:10/86400s": 6.0}
+    restarted.close()
+
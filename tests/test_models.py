@@ -0,0 +1,68 @@
+import pickle
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments import responses
+from payments.api import register_payment_routes
+from payments.models import PaymentInstrument, PaymentStatus, PaymentTransaction
+
+
+def _txn(**overrides):
+    fields = dict(
+        txn_id="t1", person_id="p1", instrument_id="i1", amount=1.0, currency="USD", status=PaymentStatus.SUCCEEDED
+    )
+    fields.update(overrides)
+    return PaymentTransaction(**fields)
+
+
+def test_models_are_slotted_with_lazy_dicts():
+    txn = _txn(created_at=1.0)
+    assert not hasattr(txn, "__dict__")
+    assert txn._metadata is None and txn._authorization_context is None
+    assert txn.to_dict()["metadata"] == {} and txn._metadata is None
+    txn.metadata["k"] = "v"
+    assert txn.metadata == {"k": "v"}
+    assert txn == _txn(created_at=1.0, metadata={"k": "v"}) and txn != _txn(created_at=1.0)
+    assert "metadata={'k': 'v'}" in repr(txn)
+    assert pickle.loads(pickle.dumps(txn)) == txn
+
+    instrument = PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card")
+    assert instrument.to_dict()["metadata"] == {} and instrument.created_at > 0
+
+
+def test_transaction_serialization_hides_authorization_context():
+    txn = _txn(authorization_context={"approved": True, "approver": "voice"})
+    assert "authorization_context" not in txn.to_dict()
+    assert txn.to_dict(include_authorization_context=True)["authorization_context"]["approver"] == "voice"
+    assert txn.to_dict()["status"] == "succeeded"
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    content = {"transaction": _txn(created_at=1.5).to_dict(), "name": "café"}
+    encoded = responses.dumps(content)
+    monkeypatch.setattr(responses, "orjson", None)
+    assert responses.dumps(content) == encoded
+
+
+def test_api_responses(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    registered = client.post("/payments/instruments", json={"person_id": "p1", "kind": "card"}).json()["instrument"]
+    assert registered["metadata"] == {}
+    charge = {"person_id": "p1", "instrument_id": registered["instrument_id"], "amount": 2.0}
+    charge["authorization_context"] = {"approved": True}
+
+    resp = client.post("/payments/transactions", json=charge, headers={"Idempotency-Key": "k1"})
+    assert resp.headers["content-type"] == "application/json"
+    txn = resp.json()["transaction"]
+    assert txn["status"] == "succeeded" and "authorization_context" not in txn
+    replay = client.post("/payments/transactions?include_authorization_context=true", json=charge, headers={"Idempotency-Key": "k1"})
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["transaction"]["authorization_context"] == {"approved": True}
+
+    listed = client.get("/payments/transactions", params={"person_id": "p1"}).json()["transactions"]
+    assert [t["txn_id"] for t in listed] == [txn["txn_id"]] and "authorization_context" not in listed[0]
+    service.close()
@@ -0,0 +1,68 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.money import exponent, from_minor, to_minor
+
+
+def test_minor_units_follow_the_currency_exponent():
+    assert (exponent("usd"), exponent("JPY"), exponent("KWD"), exponent(None)) == (2, 0, 3, 2)
+    assert to_minor(19.99, "USD") == 1999 and to_minor(1.005, "USD") == 101
+    assert to_minor("1500", "JPY") == 1500 and to_minor(Decimal("1.234"), "KWD") == 1234
+    assert to_minor(7, "BHD") == 7000 and from_minor(1999, "USD") == Decimal("19.99")
+    with pytest.raises(ValueError):
+        to_minor(10.001, "USD", strict=True)
+    for bad in ("abc", float("nan"), float("inf")):
+        with pytest.raises(ValueError):
+            to_minor(bad, "USD")
+
+
+def test_transactions_store_integer_minor_units(tmp_path):
+    txn = PaymentTransaction("t1", "p1", "i1", 0.1, "USD", PaymentStatus.SUCCEEDED, created_at=1.0)
+    txn.amount += 0.2
+    assert txn.amount_minor == 30 and txn.amount == 0.3
+    assert txn.to_dict()["amount"] == 0.3 and txn.to_dict()["amount_minor"] == 30
+
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    ledger.put(PaymentTransaction("t2", "p1", "i1", 1500, "JPY", PaymentStatus.SUCCEEDED, created_at=1.0))
+    stored = ledger.get("t2")
+    assert stored.amount_minor == 1500 and stored.amount == 1500.0
+    ledger.close()
+
+
+def test_ledger_backfills_minor_units_on_open(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE transactions (txn_id TEXT PRIMARY KEY, person_id TEXT NOT NULL, instrument_id TEXT NOT NULL, "
+        "amount REAL NOT NULL, currency TEXT NOT NULL, status TEXT NOT NULL, description TEXT, counterparty TEXT, "
+        "provider TEXT, authorization_context TEXT, metadata TEXT, created_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO transactions VALUES ('old', 'p1', 'i1', 19.99, 'USD', 'succeeded', NULL, NULL, NULL, NULL, NULL, 1.0)")
+    conn.commit()
+    conn.close()
+
+    ledger = SQLiteLedger(path)
+    assert ledger.get("old").amount_minor == 1999
+    ledger.close()
+
+
+def test_api_rejects_amounts_finer_than_the_minor_unit(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    instrument = client.post("/payments/instruments", json={"person_id": "p1", "kind": "card"}).json()["instrument"]
+    charge = {"person_id": "p1", "instrument_id": instrument["instrument_id"], "authorization_context": {"approved": True}}
+
+    assert client.post("/payments/transactions", json={**charge, "amount": 10.001}).status_code == 422
+    assert client.post("/payments/transactions", json={**charge, "amount": 5.5, "currency": "JPY"}).status_code == 422
+    txn = client.post("/payments/transactions", json={**charge, "amount": "0.10"}).json()["transaction"]
+    assert (txn["amount"], txn["amount_minor"]) == (0.1, 10)
+    service.close()
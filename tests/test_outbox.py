@@ -0,0 +1,104 @@
+import threading
+
+from payments.models import PaymentInstrument
+from payments.outbox import Outbox
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+
+
+class _RecordingClient:
+    def __init__(self, gate: threading.Event | None = None):
+        self.calls = []
+        self.gate = gate
+
+    def get(self, path, **_):
+        if self.gate:
+            self.gate.wait(5)
+        self.calls.append(("GET", path))
+        return False, 404, None
+
+    def post(self, path, payload, **_):
+        self.calls.append(("POST", path))
+        return True, 200, {}
+
+    def put(self, path, payload, **_):
+        self.calls.append(("PUT", path))
+        return True, 201, {}
+
+
+def test_outbox_runs_items_in_order_and_retries():
+    sleeps = []
+    outbox = Outbox(max_attempts=3, sleep=sleeps.append).start()
+    seen = []
+    attempts = {"n": 0}
+
+    def flaky():
+        attempts["n"] += 1
+        if attempts["n"] < 3:
+            raise RuntimeError("boom")
+        seen.append("flaky")
+
+    outbox.submit("a", lambda: seen.append("a"))
+    outbox.submit("flaky", flaky)
+    outbox.submit("b", lambda: seen.append("b"))
+    assert outbox.join(5)
+    outbox.close()
+    assert seen == ["a", "flaky", "b"]
+    assert len(sleeps) == 2 and sleeps[1] > sleeps[0] * 0.5
+    stats = outbox.stats()
+    assert stats["processed"] == 3 and stats["retries"] == 2 and stats["failed"] == 0
+
+
+def test_outbox_full_policies():
+    oldest = Outbox(max_size=2, policy="drop_oldest")
+    for name in ("a", "b", "c"):
+        assert oldest.submit(name, lambda: None)
+    assert [item.name for item in oldest._queue] == ["b", "c"]
+    assert oldest.stats()["dropped"] == 1
+
+    newest = Outbox(max_size=1, policy="drop_newest")
+    assert newest.submit("a", lambda: None)
+    assert not newest.submit("b", lambda: None)
+
+    blocking = Outbox(max_size=1, policy="block", block_timeout=0.01)
+    assert blocking.submit("a", lambda: None)
+    assert not blocking.submit("b", lambda: None)
+    assert blocking.stats()["depth"] == 1
+
+
+def test_service_returns_before_side_effects_complete():
+    gate = threading.Event()
+    context = _RecordingClient(gate)
+    storage = _RecordingClient()
+    outbox = Outbox().start()
+    service = PaymentService(MockPaymentProvider(), context_client=context, storage_client=storage, outbox=outbox)
+    instrument = PaymentInstrument(instrument_id="inst-1", person_id="p1", provider="mock", kind="card")
+
+    registered = service.register_instrument(instrument, token="tok")
+    assert registered.metadata["vault_key"] == "payment:p1:inst-1"
+    assert storage.calls == [("PUT", "/kv/vault/payment:p1:inst-1")]  # the token is stored before returning
+    assert context.calls == []
+
+    gate.set()
+    service.close()
+    assert context.calls == [("GET", "/profile/p1"), ("POST", "/profile/p1")]
+    assert outbox.stats()["processed"] == 2
+
+
+def test_instrument_only_references_a_vault_key_that_was_written():
+    class _FailingVault(_RecordingClient):
+        def put(self, path, payload, **_):
+            return False, 503, None
+
+    outbox = Outbox(max_size=1, policy="drop_oldest")  # not started: queued items would be dropped
+    service = PaymentService(MockPaymentProvider(), storage_client=_FailingVault(), outbox=outbox)
+    instrument = PaymentInstrument(instrument_id="inst-1", person_id="p1", provider="mock", kind="card")
+    assert "vault_key" not in service.register_instrument(instrument, token="tok").metadata
+    [batched] = service.register_instruments_batch([(instrument, "tok")])
+    assert "vault_key" not in batched.metadata
+
+    stored = PaymentService(MockPaymentProvider(), storage_client=_RecordingClient(), outbox=outbox)
+    for _ in range(3):
+        outbox.submit("filler", lambda: None)
+    assert stored.register_instrument(instrument, token="tok").metadata["vault_key"] == "payment:p1:inst-1"
+    assert stored.storage_client.calls == [("PUT", "/kv/vault/payment:p1:inst-1")]
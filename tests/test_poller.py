@@ -0,0 +1,151 @@
+import asyncio
+import copy
+import threading
+
+from fastapi import FastAPI
+
+from payments.api import register_payment_routes
+from payments.ledger import SQLiteLedger
+from payments.logging import PaymentEventLogger
+from payments.models import PaymentStatus, PaymentTransaction, PaymentTransactionRequest
+from payments.poller import StatusPoller
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+
+
+def _poller(check, **kwargs):
+    options = dict(workers=2, batch_size=3, base_delay=0.01, max_delay=0.02, max_attempts=3, resolution=0.005)
+    return StatusPoller(check, **{**options, **kwargs})
+
+
+def test_batches_per_provider_back_off_and_give_up():
+    calls = []
+    in_flight = [0, 0]
+    lock = threading.Lock()
+
+    def check(provider, txn_ids):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+            calls.append((provider, list(txn_ids)))
+        polls = {txn_id: sum(txn_id in ids for _, ids in calls) for txn_id in txn_ids}
+        with lock:
+            in_flight[0] -= 1
+        # a*: settled on the second poll; "stuck": never settles; "flaky": no answer the first time.
+        return {txn_id: n >= 2 and txn_id != "stuck" for txn_id, n in polls.items() if txn_id != "flaky" or n >= 2}
+
+    poller = _poller(check).start()
+    for n in range(5):
+        assert poller.track(f"a{n}", "alpha")
+    assert not poller.track("a0", "alpha")
+    poller.track("stuck", "beta")
+    poller.track("flaky", "gamma")
+    poller.track("gone", "beta")
+    poller.forget("gone")
+    assert poller.join(5)
+    poller.close()
+
+    assert all(len(ids) <= 3 and len({provider}) == 1 for provider, ids in calls)
+    assert {provider for provider, ids in calls if "stuck" in ids} == {"beta"}
+    assert not any("gone" in ids for _, ids in calls)
+    assert in_flight[1] <= 2
+    stats = poller.stats()
+    assert stats["tracked"] == 0 and stats["settled"] == 6 and stats["expired"] == 1
+    assert stats["failures"] == 1 and stats["stale_entries"] == 1
+    assert sum("stuck" in ids for _, ids in calls) == 3
+
+
+_NEXT = {PaymentStatus.CREATED: PaymentStatus.AUTHORIZED, PaymentStatus.AUTHORIZED: PaymentStatus.SUCCEEDED}
+
+
+class _PendingProvider(MockPaymentProvider):
+    """Charges start ``created`` and move one status further on every ``get_status``."""
+
+    name = "pending"
+
+    def create_transaction(self, request):
+        txn = copy.copy(super().create_transaction(request))
+        txn.status = PaymentStatus.CREATED
+        self._transactions.put(txn)
+        return copy.copy(txn)
+
+    def get_status(self, txn_id):
+        txn = copy.copy(super().get_status(txn_id))
+        txn.status = _NEXT.get(txn.status, txn.status)
+        self._transactions.put(txn)
+        return copy.copy(txn)
+
+
+class _BatchProvider(_PendingProvider):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def get_statuses(self, txn_ids):
+        self.batches.append(list(txn_ids))
+        return [self.get_status(txn_id) for txn_id in txn_ids]
+
+
+class _Events(PaymentEventLogger):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def log_event(self, **fields):
+        self.events.append(fields)
+
+
+def _service(provider):
+    service = PaymentService(provider, _Events())
+    service.poller = _poller(service.poll_statuses, max_attempts=10).start()
+    return service
+
+
+def test_service_polls_pending_transactions_through_the_webhook_event_path():
+    provider = _PendingProvider()
+    service = _service(provider)
+    txns = [service.create_transaction(PaymentTransactionRequest("p1", "i1", 5.0)) for _ in range(4)]
+    assert all(txn.txn_id in service.poller for txn in txns)
+    assert service.poller.join(5)
+
+    for txn in txns:
+        assert service.get_transaction_status(txn.txn_id).status == PaymentStatus.SUCCEEDED
+    statuses = [event["event_type"] for event in service.logger.events if event["subject_id"] == txns[0].txn_id]
+    assert statuses == ["PaymentTransactionCreated", "PaymentTransactionAuthorized", "PaymentTransactionSucceeded"]
+    assert service.stats()["poller"]["settled"] == 4
+    service.close()
+
+
+def test_webhooks_stop_polling_and_batch_status_api_is_used():
+    provider = _BatchProvider()
+    service = _service(provider)
+    service.poller.base_delay = service.poller.max_delay = 60.0
+    first = service.create_transaction(PaymentTransactionRequest("p1", "i1", 5.0))
+    second = service.create_transaction(PaymentTransactionRequest("p1", "i1", 5.0))
+    service.process_webhook("pending", {"txn_id": first.txn_id, "status": "failed"})
+    assert first.txn_id not in service.poller and second.txn_id in service.poller
+    third = service.create_transaction(PaymentTransactionRequest("p1", "i1", 5.0))
+    asyncio.run(service.aprocess_webhook("pending", {"txn_id": third.txn_id, "status": "succeeded"}))
+    assert third.txn_id not in service.poller
+    assert service.logger.events[-1]["event_type"] == "PaymentTransactionSucceeded"
+
+    # Settled transactions are answered from the store; only the pending one reaches the provider.
+    assert service.poll_statuses("pending", [first.txn_id, second.txn_id]) == {first.txn_id: True, second.txn_id: False}
+    assert provider.batches == [[second.txn_id]]
+    assert service.get_transaction_status(second.txn_id).status == PaymentStatus.AUTHORIZED
+    service.close()
+
+
+def test_pending_ledger_transactions_are_polled_again_after_a_restart(monkeypatch, tmp_path):
+    monkeypatch.setenv("UNISON_PAYMENTS_LEDGER_PATH", str(tmp_path / "ledger.db"))
+    monkeypatch.setenv("UNISON_PAYMENTS_STATUS_POLL", "true")
+    monkeypatch.setenv("UNISON_PAYMENTS_STATUS_POLL_BASE_DELAY", "60")
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    for n, status in enumerate((PaymentStatus.CREATED, PaymentStatus.AUTHORIZED, PaymentStatus.SUCCEEDED)):
+        ledger.put(PaymentTransaction(f"t{n}", "p1", "i1", 5.0, "USD", status, provider="mock"))
+    ledger.close()
+
+    service = register_payment_routes(FastAPI())
+    assert "t0" in service.poller and "t1" in service.poller and "t2" not in service.poller
+    assert service.stats()["poller"]["tracked"] == 2
+    service.close()
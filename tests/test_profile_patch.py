@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from payments.models import PaymentInstrument
+from payments.outbox import Outbox
+from payments.profile import ProfilePatcher, merge_patch
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+
+
+class _PatchingContext:
+    def __init__(self, gate: threading.Event | None = None, failures: int = 0):
+        self.calls = []
+        self.profiles = {}
+        self.gate = gate
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def get(self, path, **_):
+        with self._lock:
+            profile = self.profiles.get(path)
+        if profile is None:
+            return False, 404, None
+        return True, 200, {"profile": profile}
+
+    def patch(self, path, payload, *, headers=None):
+        assert headers == {"Content-Type": "application/merge-patch+json"}
+        if self.gate:
+            self.gate.wait(5)
+        with self._lock:
+            instruments = payload["profile"]["payments"]["instruments"]
+            self.calls.append(("PATCH", path, sorted(i["instrument_id"] for i in instruments)))
+            if self.failures:
+                self.failures -= 1
+                return False, 503, None
+            self.profiles[path] = merge_patch(self.profiles.get(path), payload["profile"])
+        return True, 200, {}
+
+
+def _instrument(n, person="p1"):
+    return PaymentInstrument(instrument_id=f"i{n}", person_id=person, provider="mock", kind="card", last4=str(n))
+
+
+def test_merge_patch():
+    target = {"a": 1, "b": {"c": 2, "d": 3}, "e": [1]}
+    assert merge_patch(target, {"b": {"c": None, "x": 4}, "e": [2], "f": "new"}) == {
+        "a": 1,
+        "b": {"d": 3, "x": 4},
+        "e": [2],
+        "f": "new",
+    }
+    assert target["b"] == {"c": 2, "d": 3}
+
+
+def test_service_patches_only_the_instrument_list():
+    context = _PatchingContext()
+    context.profiles["/profile/p1"] = {"name": "Ada", "payments": {"instruments": [{"instrument_id": "i1"}]}}
+    service = PaymentService(MockPaymentProvider(), context_client=context, profile_patcher=ProfilePatcher(context))
+    service.register_instrument(_instrument(1))
+    service.register_instrument(_instrument(2))
+    assert context.calls == [("PATCH", "/profile/p1", ["i1"]), ("PATCH", "/profile/p1", ["i1", "i2"])]
+    profile = context.profiles["/profile/p1"]
+    assert profile["name"] == "Ada" and [i["last4"] for i in profile["payments"]["instruments"]] == ["1", "2"]
+
+
+def test_patcher_and_read_modify_write_share_the_list_schema():
+    context = _PatchingContext()
+    # Written by an earlier patcher version that keyed entries by ID.
+    context.profiles["/profile/p1"] = {"payments": {"instruments_by_id": {"i0": {"instrument_id": "i0"}}}}
+    ProfilePatcher(context).upsert("p1", [{"instrument_id": "i1"}])
+    assert context.profiles["/profile/p1"] == {"payments": {"instruments": [{"instrument_id": "i0"}, {"instrument_id": "i1"}]}}
+
+    class _Posting(_PatchingContext):
+        def post(self, path, payload, **_):
+            self.profiles[path] = payload["profile"]
+            return True, 200, {}
+
+    rmw = _Posting()
+    rmw.profiles = context.profiles
+    PaymentService(MockPaymentProvider(), context_client=rmw).register_instrument(_instrument(2))
+    assert [i["instrument_id"] for i in rmw.profiles["/profile/p1"]["payments"]["instruments"]] == ["i0", "i1", "i2"]
+
+
+def test_concurrent_registrations_coalesce_and_keep_every_instrument():
+    gate = threading.Event()
+    context = _PatchingContext(gate)
+    patcher = ProfilePatcher(context)
+    service = PaymentService(MockPaymentProvider(), context_client=context, profile_patcher=patcher)
+    with ThreadPoolExecutor(10) as pool:
+        futures = [pool.submit(service.register_instrument, _instrument(n)) for n in range(10)]
+        while patcher.stats()["coalesced"] < 8:
+            threading.Event().wait(0.001)
+        gate.set()
+        for future in futures:
+            future.result()
+    # The first write was in flight while the other nine arrived; they go out together.
+    assert len(context.calls) == 2
+    assert len(context.profiles["/profile/p1"]["payments"]["instruments"]) == 10
+    assert patcher.stats()["entries_written"] == 10 and patcher.stats()["pending_persons"] == 0
+
+
+def test_outbox_flushes_staged_entries_once_and_retries_failures():
+    context = _PatchingContext(failures=1)
+    patcher = ProfilePatcher(context)
+    outbox = Outbox(sleep=lambda _: None)
+    service = PaymentService(MockPaymentProvider(), context_client=context, outbox=outbox, profile_patcher=patcher)
+    for n in range(3):
+        service.register_instrument(_instrument(n))
+    outbox.start()
+    assert outbox.join(5)
+    service.close()
+    assert context.calls == [("PATCH", "/profile/p1", ["i0", "i1", "i2"])] * 2
+    assert [i["instrument_id"] for i in context.profiles["/profile/p1"]["payments"]["instruments"]] == ["i0", "i1", "i2"]
+    assert patcher.stats()["failures"] == 1
+
+
+def test_upsert_raises_on_failed_patch():
+    patcher = ProfilePatcher(_PatchingContext(failures=1))
+    with pytest.raises(RuntimeError):
+        patcher.upsert("p1", [{"instrument_id": "i1"}])
+    assert patcher.stats()["pending_persons"] == 0
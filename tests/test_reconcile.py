@@ -0,0 +1,108 @@
+import io
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.providers import MockPaymentProvider
+from payments.reconcile import Reconciler, SettlementRecord, parse_csv, read_settlement
+from payments.service import PaymentService
+from payments.store import InMemoryTransactionStore
+
+
+def _txn(txn_id, amount=10.0, status=PaymentStatus.SUCCEEDED, created_at=100.0, currency="USD"):
+    return PaymentTransaction(
+        txn_id=txn_id, person_id="p1", instrument_id="i1", amount=amount, currency=currency, status=status,
+        provider="mock", created_at=created_at,
+    )
+
+
+def test_parsers_accept_aliases_and_report_bad_rows():
+    csv_text = "Reference,Gross_Amount,Currency,Settlement_Status\nt1,10.00,usd,settled\nt2,abc,USD,paid\n\nt3,1,EUR,weird\n"
+    records = list(parse_csv(io.StringIO(csv_text)))
+    assert records[0] == SettlementRecord(2, "t1", 10.0, "USD", "succeeded")
+    assert records[1].txn_id is None and "unreadable" in records[1].error
+    assert records[2] == SettlementRecord(5, "t3", 1.0, "EUR", None)
+
+    ndjson = b'{"transaction_id": "t1", "amount": 10, "currency": "USD", "status": "failed"}\n\n[1]\nnot json\n'
+    records = list(read_settlement(io.BytesIO(ndjson), "ndjson"))
+    assert records[0] == SettlementRecord(1, "t1", 10.0, "USD", "failed")
+    assert [r.line for r in records[1:]] == [3, 4] and all(r.error for r in records[1:])
+
+
+def test_reconciler_reports_and_fixes(tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    store = InMemoryTransactionStore(backend=ledger)
+    service = PaymentService(MockPaymentProvider(store), store=store, ledger=ledger)
+    for txn in (_txn("ok"), _txn("amount"), _txn("status", status=PaymentStatus.AUTHORIZED), _txn("extra")):
+        store.put(txn)
+    store.put(_txn("outside", created_at=500.0))
+    records = [
+        SettlementRecord(2, "ok", 10.001, "USD", "succeeded"),
+        SettlementRecord(3, "amount", 12.0, "USD", "succeeded"),
+        SettlementRecord(4, "status", 10.0, "USD", "succeeded"),
+        SettlementRecord(5, "gone", 3.0, "USD", None),
+        SettlementRecord(6, None, None, None, None, "unreadable row"),
+    ]
+    reconciler = Reconciler(store, apply=service.apply_settled_status, batch_size=2)
+    found = {d.get("txn_id"): d for d in reconciler.run(records, created_after=0, created_before=200)}
+
+    assert found["amount"]["fields"] == {"amount": {"local": 10.0, "settled": 12.0}} and "fixed" not in found["amount"]
+    assert found["status"]["fixed"] is True
+    assert found["gone"]["kind"] == "missing" and found[None]["kind"] == "invalid"
+    assert found["extra"] == {"kind": "extra", "txn_id": "extra", "local": {"amount": 10.0, "currency": "USD", "status": "succeeded"}}
+    assert "outside" not in found and "ok" not in found
+    assert reconciler.summary == {
+        "records": 5, "matched": 1, "missing": 1, "mismatched": 2, "extra": 1, "invalid": 1, "fixed": 1, "fix_failed": 0,
+    }
+    fixed = ledger.get("status")
+    assert fixed.status == PaymentStatus.SUCCEEDED and fixed.metadata["reconciled_from"] == "authorized"
+    service.close()
+
+
+def test_amounts_are_compared_in_minor_units():
+    store = InMemoryTransactionStore()
+    store.put(_txn("kwd", amount=10.0, currency="KWD"))
+    store.put(_txn("usd", amount=19.99))
+    records = [
+        SettlementRecord(1, "kwd", 10.004, "KWD", None),
+        SettlementRecord(2, "usd", 19.99, "USD", None),
+        SettlementRecord(3, "usd", 19.994, "USD", None),  # rounds to the stored cents
+    ]
+    found = list(Reconciler(store).run(records))
+    assert found == [{"kind": "mismatch", "line": 1, "txn_id": "kwd", "fields": {"amount": {"local": 10.0, "settled": 10.004}}}]
+    assert not list(Reconciler(store, tolerance=4).run(records[:1]))
+    records = list(parse_csv(["txn_id,amount\n", "usd,inf\n"]))
+    assert records[0].error and records[0].txn_id is None
+
+    # Beyond float precision: 1 cent apart, which float() would read as the same number.
+    big = PaymentTransaction(
+        txn_id="big", person_id="p1", instrument_id="i1", amount=None, amount_minor=1234567890123456789,
+        currency="USD", status=PaymentStatus.SUCCEEDED, provider="mock", created_at=100.0,
+    )
+    store.put(big)
+    records = list(parse_csv(["txn_id,amount\n", "big,12345678901234567.89\n", "big,12345678901234567.88\n"]))
+    assert [r.amount for r in records] == [Decimal("12345678901234567.89"), Decimal("12345678901234567.88")]
+    assert [d["line"] for d in Reconciler(store).run(records)] == [3]
+
+
+def test_reconciliation_endpoint(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    service.transactions.put(_txn("t1", status=PaymentStatus.AUTHORIZED))
+    body = "txn_id,amount,currency,status\nt1,10.00,USD,succeeded\nt2,1.00,USD,succeeded\n"
+
+    resp = client.post("/payments/reconciliations?fix=true&max_discrepancies=1", content=body, headers={"content-type": "text/csv"})
+    report = resp.json()
+    assert report["summary"]["fixed"] == 1 and report["summary"]["missing"] == 1
+    assert len(report["discrepancies"]) == 1 and report["truncated"] is True
+    assert client.get("/payments/transactions/t1").json()["transaction"]["status"] == "succeeded"
+
+    resp = client.post("/payments/reconciliations", content="id_missing,amount\nx,1\n", headers={"content-type": "text/csv"})
+    assert resp.status_code == 400
+    service.close()
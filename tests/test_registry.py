@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.models import PaymentInstrument, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.registry import ProviderBusy, ProviderRegistry, ProviderTimeout, UnknownProvider
+from payments.service import PaymentService
+
+
+class _Named(MockPaymentProvider):
+    def __init__(self, name, store=None):
+        super().__init__(store)
+        self.name = name
+
+
+class _Gated(MockPaymentProvider):
+    blocking = True
+
+    def __init__(self, gate):
+        super().__init__()
+        self.gate = gate
+
+    def create_transaction(self, request):
+        self.gate.wait(5)
+        return super().create_transaction(request)
+
+
+def _request(instrument_id="i1"):
+    return PaymentTransactionRequest(person_id="p1", instrument_id=instrument_id, amount=1.0)
+
+
+def test_routes_by_instrument_provider_and_loads_lazily():
+    built = []
+
+    def factory(name):
+        def build(store=None):
+            built.append(name)
+            return _Named(name, store)
+
+        return build
+
+    registry = ProviderRegistry("alpha")
+    registry.register("alpha", factory("alpha"))
+    registry.register("beta", factory("beta"))
+    service = PaymentService(registry)
+    assert built == []
+
+    service.register_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="beta", kind="card"))
+    assert built == ["beta"]
+    assert service.create_transaction(_request()).provider == "beta"
+    with pytest.raises(UnknownProvider):
+        service.register_instrument(PaymentInstrument(instrument_id="i2", person_id="p1", provider="zeta", kind="card"))
+    assert registry.stats()["alpha"]["loaded"] is False
+
+
+def test_unknown_transactions_are_looked_up_at_every_provider():
+    alpha, beta = _Named("alpha"), _Named("beta")
+    registry = ProviderRegistry("alpha")
+    registry.add(alpha)
+    registry.add(beta)
+    service = PaymentService(registry)
+    at_beta = beta.create_transaction(_request())  # e.g. created by a process with its own store
+
+    assert service.get_transaction_status(at_beta.txn_id).provider == "beta"
+    assert at_beta.txn_id in service.transactions
+    second = beta.create_transaction(_request())
+    assert asyncio.run(service.aget_transaction_status(second.txn_id)).provider == "beta"
+    with pytest.raises(KeyError):
+        service.get_transaction_status("nowhere")
+    with pytest.raises(KeyError):
+        asyncio.run(service.aget_transaction_status("nowhere"))
+    service.close()
+
+
+def test_concurrency_limit_and_timeout_are_per_provider():
+    gate = threading.Event()
+    registry = ProviderRegistry("slow")
+    slow = registry.register("slow", lambda: _Gated(gate), max_concurrency=2, queue_timeout=0)
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(slow.sync.create_transaction, _request()) for _ in range(2)]
+        while slow.in_flight < 2:
+            pass
+        with pytest.raises(ProviderBusy):
+            slow.sync.create_transaction(_request())
+        gate.set()
+        assert all(f.result().txn_id for f in futures)
+    assert slow.stats()["rejected"] == 1
+
+    never = threading.Event()
+    stuck = registry.register("stuck", lambda: _Gated(never), timeout=0.05)
+    with pytest.raises(ProviderTimeout):
+        asyncio.run(stuck.create_transaction(_request()))
+    with pytest.raises(ProviderTimeout):
+        stuck.sync.create_transaction(_request())
+    # The abandoned calls hold their slots until the provider actually returns.
+    assert stuck.stats()["timeouts"] == 2 and stuck.in_flight == 2
+    never.set()
+    deadline = time.monotonic() + 5
+    while stuck.in_flight and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert stuck.in_flight == 0
+    registry.close()
+
+
+def test_env_registry_and_webhook_routing(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    monkeypatch.setenv("UNISON_PAYMENTS_PROVIDERS", "alt=payments.providers:MockPaymentProvider")
+    monkeypatch.setenv("UNISON_PAYMENTS_PROVIDER_ALT_MAX_CONCURRENCY", "4")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    assert sorted(service.providers.names()) == ["alt", "mock"]
+    stats = service.providers.stats()["alt"]
+    assert stats["loaded"] is False and stats["max_concurrency"] == 4 and stats["timeout"] == 30.0
+    client = TestClient(app)
+    resp = client.post("/payments/webhooks/alt", json={"txn_id": "t1", "status": "succeeded"})
+    assert resp.status_code == 200 and service.providers.get("alt").loaded
+    assert client.post("/payments/webhooks/nope", json={}).status_code == 404
+    resp = client.post("/payments/instruments", json={"person_id": "p1", "provider": "nope"})
+    assert resp.status_code == 400
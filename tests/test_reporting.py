@@ -0,0 +1,72 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import payments.reporting as reporting
+from payments.api import register_payment_routes
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.reporting import FXRates, snapshot, totals
+
+DAY = 86400
+
+
+def _load(store):
+    rows = [
+        ("a", "0.10", "USD", 0), ("a", "0.20", "USD", 10), ("a", 500, "JPY", 20),
+        ("b", "1.00", "EUR", DAY), ("b", "2.01", "EUR", DAY + 1), ("c", "9.99", "USD", 5, PaymentStatus.FAILED),
+    ]
+    for n, (person, amount, currency, offset, *status) in enumerate(rows):
+        status = status[0] if status else PaymentStatus.SUCCEEDED
+        store.put(PaymentTransaction(f"t{n}", person, "i1", amount, currency, status, created_at=19000 * DAY + offset))
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(reporting, "use_numpy", False)
+    return request.param
+
+
+def test_totals_by_person_currency_and_day(backend, tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    _load(ledger)
+    columns = snapshot(ledger)
+    assert len(columns) == 5
+
+    assert totals(columns) == [
+        {"person_id": "a", "currency": "JPY", "day": "2022-01-08", "amount": 500.0, "amount_minor": 500, "count": 1},
+        {"person_id": "a", "currency": "USD", "day": "2022-01-08", "amount": 0.3, "amount_minor": 30, "count": 2},
+        {"person_id": "b", "currency": "EUR", "day": "2022-01-09", "amount": 3.01, "amount_minor": 301, "count": 2},
+    ]
+    fx = FXRates.from_spec("EUR=1.1,JPY=0.0067")
+    assert totals(columns, by=["person"], convert_to="USD", fx=fx) == [
+        {"person_id": "a", "currency": "USD", "amount": 3.65, "amount_minor": 365, "count": 3},
+        {"person_id": "b", "currency": "USD", "amount": 3.31, "amount_minor": 331, "count": 2},
+    ]
+    assert totals(columns, by=["currency"], convert_to="JPY", fx=fx)[0] == {
+        "source_currency": "EUR", "currency": "JPY", "amount": 494.0, "amount_minor": 494, "count": 2,
+    }
+    with pytest.raises(ValueError):
+        totals(columns, by=["person"])
+    with pytest.raises(ValueError):
+        totals(columns, by=["person"], convert_to="GBP", fx=fx)
+    assert totals(snapshot(ledger, created_after=19001 * DAY)) == totals(columns)[2:]
+    ledger.close()
+
+
+def test_totals_endpoint(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    monkeypatch.setenv("UNISON_PAYMENTS_FX_RATES", "EUR=1.1,JPY=0.0067")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    _load(service.transactions)
+
+    report = client.get("/payments/reports/totals", params={"group_by": "day", "convert_to": "USD"}).json()
+    assert report["transactions"] == 5
+    assert [(g["day"], g["amount_minor"]) for g in report["groups"]] == [("2022-01-08", 365), ("2022-01-09", 331)]
+    assert client.get("/payments/reports/totals", params={"group_by": "person"}).status_code == 400
+    service.close()
@@ -0,0 +1,279 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from payments.models import PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.registry import ProviderBusy, ProviderTimeout, RoutedProvider
+from payments.resilience import AdaptiveLimiter, CircuitBreaker, CircuitOpen
+
+
+class FaultInjectingProvider(MockPaymentProvider):
+    """Deterministic stub: healthy, or down (fails after ``latency``), switched by the test."""
+
+    blocking = True
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.down = False
+        self.latency = latency
+        self.calls = 0
+
+    def create_transaction(self, request):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.down:
+            raise ConnectionError("provider unavailable")
+        return super().create_transaction(request)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _request():
+    return PaymentTransactionRequest(person_id="p1", instrument_id="i1", amount=1.0)
+
+
+def test_breaker_state_machine():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open" and not breaker.allow() and breaker.retry_after() == 10
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()  # a single probe
+    breaker.record(False)
+    assert breaker.state == "open"
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.stats()["transitions"] == {"closed->open": 1, "open->half_open": 2, "half_open->open": 1, "half_open->closed": 1}
+
+
+class _ProbeProvider(MockPaymentProvider):
+    """Fails while ``outcome`` is "down"; otherwise unknown ids get the usual ``KeyError``."""
+
+    blocking = False
+
+    def __init__(self):
+        super().__init__()
+        self.outcome = "down"
+
+    def get_status(self, txn_id):
+        if self.outcome == "down":
+            raise RuntimeError("provider unavailable")
+        return super().get_status(txn_id)  # unknown ids raise KeyError
+
+
+class _HangingProvider:
+    """Async provider whose ``get_status`` fails while ``down`` and hangs otherwise."""
+
+    name = "hanging"
+
+    def __init__(self):
+        self.down = True
+
+    async def create_transaction(self, request):
+        raise NotImplementedError
+
+    async def get_status(self, txn_id):
+        if self.down:
+            raise RuntimeError("provider unavailable")
+        await asyncio.sleep(60)
+
+
+def _tripped(provider, clock):
+    routed = RoutedProvider("probe", lambda: provider, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=1, clock=clock))
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            routed.sync.get_status("t1")
+    assert routed.breaker.state == "open"
+    clock.now = 1
+    return routed
+
+
+def test_lookup_error_probe_closes_the_circuit():
+    provider, clock = _ProbeProvider(), _Clock()
+    routed = _tripped(provider, clock)
+    provider.outcome = "missing"
+    with pytest.raises(KeyError):
+        routed.sync.get_status("unknown")
+    assert routed.breaker.state == "closed"
+    with pytest.raises(KeyError):
+        routed.sync.get_status("unknown")  # not CircuitOpen
+    routed.close()
+
+
+def test_cancelled_probe_returns_its_slot():
+    provider, clock = _HangingProvider(), _Clock()
+    routed = _tripped(provider, clock)
+    provider.down = False
+
+    async def cancel_probe():
+        probe = asyncio.ensure_future(routed.get_status("t1"))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(cancel_probe())
+    assert routed.breaker.state == "half_open" and routed.in_flight == 0
+    assert routed.breaker.allow()  # the next probe is let through
+    routed.close()
+
+
+def test_limiter_is_additive_increase_multiplicative_decrease():
+    clock = _Clock()
+    limiter = AdaptiveLimiter(initial=10, max_limit=20, clock=clock)
+    for _ in range(100):
+        limiter.on_sample(0.010, True, in_flight=9)
+    assert 14 <= limiter.limit <= 20
+    grown = limiter.limit
+    clock.now = 1
+    limiter.on_sample(0.100, True, in_flight=9)  # latency spike: congestion
+    limiter.on_sample(0.100, True, in_flight=9)  # same interval: counted once
+    assert limiter.limit == grown // 2
+    clock.now = 2
+    limiter.on_sample(0.010, False, in_flight=0)
+    assert limiter.limit == grown // 4
+    # Jitter below the latency floor is not congestion.
+    fast = AdaptiveLimiter(initial=4)
+    for latency in (0.00001, 0.0005, 0.00001, 0.0009):
+        fast.on_sample(latency, True, in_flight=3)
+    assert fast.decreases == 0
+
+
+def test_outage_fails_fast_with_bounded_latency_and_memory():
+    provider = FaultInjectingProvider(latency=0.02)
+    clock = _Clock()
+    routed = RoutedProvider(
+        "flaky",
+        lambda: provider,
+        max_concurrency=8,
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock),
+        limiter=AdaptiveLimiter(initial=8, max_limit=8),
+    )
+    routed.sync.create_transaction(_request())
+    provider.down = True
+
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            routed.sync.create_transaction(_request())
+    assert routed.breaker.state == "open"
+
+    def hammer(calls):
+        rejected = 0
+        for _ in range(calls):
+            try:
+                routed.sync.create_transaction(_request())
+            except CircuitOpen:
+                rejected += 1
+        return rejected
+
+    tracemalloc.start()
+    hammer(1000)  # warm-up, so one-off allocations are not counted as growth
+    baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    assert hammer(10_000) == 10_000
+    elapsed = time.perf_counter() - start
+    growth = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    assert provider.calls == 4  # rejected calls never reach the provider
+    assert elapsed < 1.0  # ~tens of microseconds each, not the 20ms provider latency
+    assert growth < 16 * 1024
+    assert routed.in_flight == 0 and routed.limiter.limit < 8
+
+    provider.down = False
+    clock.now = 30
+    routed.sync.create_transaction(_request())
+    stats = routed.stats()
+    assert stats["breaker"]["state"] == "closed"
+    assert stats["breaker"]["transitions"] == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+    routed.close()
+
+
+def test_in_flight_stays_bounded_while_provider_hangs():
+    provider = FaultInjectingProvider(latency=0.2)
+    routed = RoutedProvider("slow", lambda: provider, max_concurrency=4, timeout=0.05, queue_timeout=0)
+    outcomes = []
+
+    def call():
+        try:
+            routed.sync.create_transaction(_request())
+        except (ProviderBusy, ProviderTimeout) as exc:
+            outcomes.append(type(exc).__name__)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(32) as pool:
+        for _ in range(64):
+            pool.submit(call)
+    assert time.perf_counter() - start < 1.0
+    assert routed.stats()["calls"] <= 8  # at most two admission rounds fit in the 4 slots
+    assert set(outcomes) <= {"ProviderBusy", "ProviderTimeout"} and "ProviderBusy" in outcomes
+    routed.close()
+
+
+class _CountingProvider(MockPaymentProvider):
+    """Records how many calls are running inside the provider at once."""
+
+    blocking = True
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.running = self.peak = 0
+        self._lock = threading.Lock()
+
+    def create_transaction(self, request):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.latency)
+        with self._lock:
+            self.running -= 1
+        return super().create_transaction(request)
+
+
+def test_calls_over_the_limit_queue_and_timed_out_calls_keep_their_slot():
+    provider = _CountingProvider(latency=0.1)
+    routed = RoutedProvider("slow", lambda: provider, max_concurrency=2, timeout=0.02, queue_timeout=2.0)
+    with ThreadPoolExecutor(6) as pool:
+        outcomes = list(pool.map(lambda _: _outcome(routed.sync.create_transaction), range(6)))
+
+    async def burst():
+        return await asyncio.gather(*(_aoutcome(routed.create_transaction) for _ in range(6)))
+
+    outcomes += asyncio.run(burst())
+    time.sleep(0.15)
+    # Nobody was turned away, and timed-out calls held their slot until the provider returned.
+    assert outcomes == ["ProviderTimeout"] * 12
+    assert provider.peak == 2 and routed.in_flight == 0 and routed.stats()["rejected"] == 0
+    routed.close()
+
+
+def _outcome(call):
+    try:
+        call(_request())
+        return "ok"
+    except Exception as exc:
+        return type(exc).__name__
+
+
+async def _aoutcome(call):
+    try:
+        await call(_request())
+        return "ok"
+    except Exception as exc:
+        return type(exc).__name__
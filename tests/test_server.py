@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import add_payment_routes, register_payment_routes
+from payments.ledger import SQLiteLedger
+from payments.server import create_app
+from payments.webhooks import WebhookQueue
+
+
+def test_lifespan_builds_service_and_drains_on_shutdown(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    monkeypatch.setenv("UNISON_PAYMENTS_WEBHOOK_QUEUE", "true")
+    app = create_app()
+    routes = list(app.router.routes)
+    assert "/payments/transactions" in {route.path for route in routes}
+    schema = app.openapi()
+
+    with TestClient(app) as client:
+        service = app.state.service
+        for n in range(20):
+            body = {"event_id": f"evt_{n}", "txn_id": f"t{n}", "amount": 1, "status": "succeeded"}
+            assert client.post("/payments/webhooks/mock", json=body).status_code == 202
+        assert client.get("/openapi.json").json() == schema
+
+    assert service.webhooks.stats()["processed"] == 20
+    assert app.router.routes == routes
+    assert app.state.service is None
+
+
+def test_service_starts_on_first_request_without_lifespan(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = create_app()
+    start, started_on_loop = app.state.start_service, []
+
+    def start_service():
+        try:
+            asyncio.get_running_loop()
+            started_on_loop.append(True)
+        except RuntimeError:
+            started_on_loop.append(False)
+        return start()
+
+    app.state.start_service = start_service
+    client = TestClient(app)  # no lifespan events
+    assert client.get("/payments/transactions").status_code == 200
+    assert started_on_loop == [False]  # built in the threadpool, not on the event loop
+    service = app.state.service
+    assert service is not None
+    assert client.get("/payments/transactions").status_code == 200 and app.state.service is service
+    service.close()
+
+    bare = FastAPI()
+    add_payment_routes(bare)
+    assert TestClient(bare).get("/payments/transactions").status_code == 503
+
+
+def test_workers_share_state_through_the_ledger(monkeypatch, tmp_path):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    monkeypatch.setenv("UNISON_PAYMENTS_WORKERS", "2")
+    monkeypatch.setenv("UNISON_PAYMENTS_LEDGER_PATH", str(tmp_path / "ledger.db"))
+    workers = []
+    for _ in range(2):
+        worker = FastAPI()
+        workers.append((register_payment_routes(worker), TestClient(worker)))
+    (service_a, a), (service_b, b) = workers
+
+    instrument = a.post("/payments/instruments", json={"person_id": "p1", "kind": "card"}).json()["instrument"]
+    charge = {"person_id": "p1", "instrument_id": instrument["instrument_id"], "amount": 5.0}
+    charge["authorization_context"] = {"approved": True}
+    txn = b.post("/payments/transactions", json=charge).json()["transaction"]
+    assert a.get(f"/payments/transactions/{txn['txn_id']}").json()["transaction"]["amount"] == 5.0
+
+    # Pending transactions are not cached per worker: a webhook on one is seen by the other.
+    for status in ("authorized", "succeeded"):
+        b.post("/payments/webhooks/mock", json={"txn_id": "t1", "person_id": "p1", "status": status})
+        assert a.get("/payments/transactions/t1").json()["transaction"]["status"] == status
+    service_a.close()
+    service_b.close()
+
+    monkeypatch.delenv("UNISON_PAYMENTS_LEDGER_PATH")
+    with pytest.raises(RuntimeError):
+        register_payment_routes(FastAPI())
+
+
+def test_only_one_worker_replays_pending_webhooks(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledger = SQLiteLedger(path)
+    payload = {"event_id": "e1", "txn_id": "t1"}
+    WebhookQueue(lambda provider, body: None, backend=ledger).submit("mock", json.dumps(payload).encode(), payload)
+
+    handled = []
+    ledgers = [ledger, SQLiteLedger(path)]
+    queues = [
+        WebhookQueue(lambda provider, body: handled.append(body), backend=backend, replay_lease=60.0).start()
+        for backend in ledgers
+    ]
+    for queue in queues:
+        queue.join(5)
+        queue.close()
+    assert handled == [payload]
+    assert ledgers[0].claim_lease("webhook_replay", "other-host:1", 60.0) is False
+    for backend in ledgers:
+        backend.close()
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from payments.server import create_app
+
+BENCH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "bench_startup.py")
+
+
+def test_importing_the_server_has_no_side_effects():
+    code = "import logging, sys, payments.server; print(len(logging.getLogger().handlers), 'payments.api' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["0", "False"]
+
+
+def test_create_app_returns_independent_apps(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    first, second = create_app(), create_app()
+    with TestClient(first) as client:
+        assert client.get("/health").json() == {"ok": True}
+        assert client.get("/payments/transactions").status_code == 200
+    assert second.state.service is None
+    assert "/payments/transactions" in {route.path for route in second.router.routes}
+
+
+def test_startup_stays_within_budget():
+    result = subprocess.run([sys.executable, BENCH, "--runs", "3", "--check"], capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
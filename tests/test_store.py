@@ -0,0 +1,73 @@
+from payments.cache import TTLCache
+from payments.models import PaymentInstrument, PaymentStatus, PaymentTransaction, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+from payments.store import InMemoryTransactionStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _txn(txn_id, status=PaymentStatus.SUCCEEDED):
+    return PaymentTransaction(
+        txn_id=txn_id, person_id="p", instrument_id="i", amount=1.0, currency="USD", status=status
+    )
+
+
+def test_ttl_cache_evicts_lru_and_expired():
+    clock = _Clock()
+    cache = TTLCache(max_entries=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1
+    clock.now = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+
+
+def test_terminal_transactions_age_out_before_pending():
+    clock = _Clock()
+    store = InMemoryTransactionStore(10, pending_ttl=100, terminal_ttl=5, clock=clock)
+    store.put(_txn("done", PaymentStatus.SUCCEEDED))
+    store.put(_txn("pending", PaymentStatus.CREATED))
+    clock.now = 6
+    assert store.get("done") is None
+    assert store.get("pending").txn_id == "pending"
+
+
+def test_without_a_backend_transactions_do_not_age_out_by_default():
+    clock = _Clock()
+    store = InMemoryTransactionStore(10, clock=clock)
+    service = PaymentService(MockPaymentProvider(store=store), store=store)
+    service.register_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"))
+    request = PaymentTransactionRequest(person_id="p1", instrument_id="i1", amount=1.0, authorization_context={"approved": True})
+    txn = service.create_transaction(request)
+    clock.now = 7 * 86400
+    assert service.get_transaction_status(txn.txn_id).txn_id == txn.txn_id
+
+    cached = InMemoryTransactionStore(10, backend=InMemoryTransactionStore(10))
+    assert (cached.pending_ttl, cached.terminal_ttl) == (3600.0, 300.0)
+
+
+def test_store_stays_bounded():
+    store = InMemoryTransactionStore(100)
+    for i in range(1000):
+        store.put(_txn(f"t{i}"))
+    assert len(store) == 100
+    assert store.get("t999") and store.get("t0") is None
+
+
+def test_status_lookup_falls_back_to_provider_on_miss():
+    provider = MockPaymentProvider()
+    service = PaymentService(provider, store=InMemoryTransactionStore(10))
+    provider._transactions.put(_txn("remote"))
+    assert service.get_transaction_status("remote").txn_id == "remote"
+    assert service._transactions.get("remote") is not None
@@ -0,0 +1,118 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from payments.api import register_payment_routes
+from payments.models import PaymentInstrument, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+from payments.telemetry import Histogram, Telemetry
+
+
+class _Storage:
+    def put(self, path, payload, **_):
+        return True, 201, {}
+
+    def get(self, path, **_):
+        return True, 200, {"value": {"token": "tok"}}
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "/a")
+    assert histogram.render() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{route="/a",le="0.1"} 1',
+        'demo_seconds_bucket{route="/a",le="1"} 2',
+        'demo_seconds_bucket{route="/a",le="+Inf"} 3',
+        'demo_seconds_sum{route="/a"} 5.55',
+        'demo_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app, storage_client=_Storage())
+    client = TestClient(app)
+    instrument = client.post("/payments/instruments", json={"person_id": "p1", "kind": "card", "token": "tok"})
+    charge = {
+        "person_id": "p1",
+        "instrument_id": instrument.json()["instrument"]["instrument_id"],
+        "amount": 1.0,
+        "surface": "voice",
+        "authorization_context": {"approved": True},
+    }
+    txn_id = client.post("/payments/transactions", json=charge).json()["transaction"]["txn_id"]
+    assert client.get(f"/payments/transactions/{txn_id}").status_code == 200
+    assert client.get("/payments/transactions/missing").status_code == 404
+    assert client.post("/payments/transactions", json={"person_id": "p1"}).status_code == 422
+
+    body = client.get("/metrics").text
+    assert 'payments_provider_call_seconds_count{provider="mock",operation="create_transaction",status="ok"} 1' in body
+    assert 'payments_vault_seconds_count{operation="put",status="ok"} 1' in body
+    assert 'payments_vault_seconds_count{operation="get",status="ok"} 1' in body
+    assert 'payments_transaction_seconds_count{provider="mock",surface="voice",status="succeeded"} 1' in body
+    assert 'payments_event_emit_seconds_count{mode="direct",status="ok"} 2' in body
+    assert 'payments_http_request_seconds_count{route="/payments/transactions/{txn_id}",method="GET",status="200"} 1' in body
+    assert 'route="/payments/transactions/{txn_id}",method="GET",status="404"' in body
+    assert 'payments_http_request_seconds_count{route="/payments/transactions",method="POST",status="422"} 1' in body
+    assert 'payments_provider_calls{provider="mock"} 3' in body
+    assert 'payments_provider_breaker_state{provider="mock",state="closed"} 1' in body
+    assert "payments_store_" in body
+    service.close()
+
+
+def test_service_spans_and_disabled_metrics():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    telemetry = Telemetry(metrics=False, tracer=provider.get_tracer("test"))
+    service = PaymentService(MockPaymentProvider(), storage_client=_Storage(), telemetry=telemetry)
+    service.register_instrument(PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"), token="t")
+    exporter.clear()
+    service.create_transaction(PaymentTransactionRequest(person_id="p1", instrument_id="i1", amount=1.0, surface="app"))
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    root = spans["payments.create_transaction"]
+    assert root.attributes["surface"] == "app"
+    for name in ("payments.vault.get", "payments.provider.create_transaction", "payments.event.emit"):
+        assert spans[name].parent.span_id == root.context.span_id
+    assert telemetry.render() == "\n"
+    assert telemetry.provider_calls.snapshot() == {}
+
+
+def test_route_status_comes_from_the_app_exception_handlers():
+    from fastapi import APIRouter
+    from fastapi.responses import JSONResponse
+
+    from payments.telemetry import timed_route_class
+
+    class Declined(Exception):
+        pass
+
+    telemetry = Telemetry()
+    router = APIRouter(route_class=timed_route_class(lambda request: telemetry))
+
+    @router.get("/declined")
+    async def declined():
+        raise Declined()
+
+    @router.get("/broken")
+    def broken():
+        raise RuntimeError("boom")
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_exception_handler(Declined, lambda request, exc: JSONResponse({"declined": True}, status_code=402))
+    client = TestClient(app, raise_server_exceptions=False)
+    assert client.get("/declined").status_code == 402
+    assert client.get("/broken").status_code == 500
+
+    body = telemetry.render()
+    assert 'payments_http_request_seconds_count{route="/declined",method="GET",status="402"} 1' in body
+    assert 'payments_http_request_seconds_count{route="/broken",method="GET",status="500"} 1' in body
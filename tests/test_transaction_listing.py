@@ -0,0 +1,82 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.ledger import SQLiteLedger
+from payments.models import PaymentStatus, PaymentTransaction
+from payments.store import InMemoryTransactionStore, TransactionQuery
+
+
+def _fill(store):
+    for i in range(30):
+        store.put(
+            PaymentTransaction(
+                txn_id=f"t{i:02d}",
+                person_id=f"p{i % 2}",
+                instrument_id=f"i{i % 3}",
+                amount=1.0,
+                currency="USD",
+                status=PaymentStatus.FAILED if i % 5 == 0 else PaymentStatus.SUCCEEDED,
+                counterparty="acme" if i % 4 == 0 else None,
+                created_at=1000.0 + i,
+            )
+        )
+
+
+def _pages(store, **filters):
+    pages, cursor = [], None
+    while True:
+        page = store.query(TransactionQuery(cursor=cursor, limit=4, **filters))
+        pages.append([txn.txn_id for txn in page])
+        if len(page) < 4:
+            return pages
+        cursor = (page[-1].created_at, page[-1].txn_id)
+
+
+@pytest.fixture(params=["memory", "ledger"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryTransactionStore(100)
+    else:
+        ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+        yield ledger
+        ledger.close()
+
+
+def test_keyset_pagination_and_filters(store):
+    _fill(store)
+    ids = [txn_id for page in _pages(store, person_id="p0") for txn_id in page]
+    assert ids == [f"t{i:02d}" for i in range(28, -1, -2)]
+
+    failed = [txn_id for page in _pages(store, status="failed", person_id="p0") for txn_id in page]
+    assert failed == ["t20", "t10", "t00"]
+
+    windowed = store.query(TransactionQuery(instrument_id="i0", created_after=1003.0, created_before=1012.0))
+    assert [txn.txn_id for txn in windowed] == ["t09", "t06", "t03"]
+
+    acme = store.query(TransactionQuery(counterparty="acme", limit=3))
+    assert [txn.txn_id for txn in acme] == ["t28", "t24", "t20"]
+
+
+def test_evicted_transactions_leave_the_index():
+    store = InMemoryTransactionStore(10)
+    _fill(store)
+    ids = [txn.txn_id for txn in store.query(TransactionQuery(limit=50))]
+    assert ids == [f"t{i:02d}" for i in range(29, 19, -1)]
+    assert len(store._index) == 10
+
+
+def test_list_endpoint_paginates(monkeypatch):
+    monkeypatch.setenv("DISABLE_AUTH_FOR_TESTS", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    _fill(service._transactions)
+    client = TestClient(app)
+    resp = client.get("/payments/transactions", params={"person_id": "p1", "limit": 10})
+    body = resp.json()
+    assert resp.status_code == 200 and len(body["transactions"]) == 10 and body["next_cursor"]
+    resp = client.get("/payments/transactions", params={"person_id": "p1", "limit": 10, "cursor": body["next_cursor"]})
+    assert [txn["txn_id"] for txn in resp.json()["transactions"]] == ["t09", "t07", "t05", "t03", "t01"]
+    assert resp.json()["next_cursor"] is None
+    assert client.get("/payments/transactions", params={"cursor": "???"}).status_code == 400
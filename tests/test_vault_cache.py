@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from payments.models import PaymentInstrument, PaymentTransactionRequest
+from payments.providers import MockPaymentProvider
+from payments.service import PaymentService
+from payments.vault import VaultTokenCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = VaultTokenCache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return "tok_secret"
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: cache.get_or_load("k", load), range(8)))
+    assert results == ["tok_secret"] * 8 and len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+
+    async def run():
+        async def aload():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "tok_other"
+
+        return await asyncio.gather(*(cache.aget_or_load("k2", aload) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["tok_other"] * 5 and len(calls) == 2
+
+
+def test_ttl_failures_and_invalidation():
+    clock = _Clock()
+    cache = VaultTokenCache(ttl=10, clock=clock)
+    assert cache.get_or_load("k", lambda: None) is None
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", lambda: (_ for _ in ()).throw(RuntimeError("vault down")))
+    assert cache.get_or_load("k", lambda: "v1") == "v1"
+    assert cache.get_or_load("k", lambda: "v2") == "v1"
+    clock.now = 10
+    assert cache.get_or_load("k", lambda: "v2") == "v2"
+
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "stale"
+
+    cache.invalidate("k")
+    thread = threading.Thread(target=cache.get_or_load, args=("k", slow))
+    thread.start()
+    while not cache._in_flight:
+        time.sleep(0.001)
+    cache.invalidate("k")
+    release.set()
+    thread.join()
+    assert cache.get_or_load("k", lambda: "fresh") == "fresh"
+    stats = cache.stats()
+    assert stats["vault_errors"] == 1 and stats["vault_loads"] == 6
+
+
+class _Storage:
+    def __init__(self):
+        self.gets = 0
+        self.values = {}
+
+    def put(self, path, payload, **_):
+        self.values[path] = payload
+        return True, 201, {}
+
+    def get(self, path, **_):
+        self.gets += 1
+        if path not in self.values:
+            return False, 404, None
+        return True, 200, self.values[path]
+
+
+def test_service_reuses_tokens_until_reregistered(caplog):
+    storage = _Storage()
+    service = PaymentService(MockPaymentProvider(), storage_client=storage, vault_cache=VaultTokenCache())
+    instrument = PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card")
+    caplog.set_level(logging.DEBUG)
+    service.register_instrument(instrument, token="tok_first")
+
+    def charge():
+        request = PaymentTransactionRequest(person_id="p1", instrument_id="i1", amount=1.0)
+        service.create_transaction(request)
+        return request.provider_token
+
+    assert [charge() for _ in range(5)] == ["tok_first"] * 5
+    assert storage.gets == 1
+
+    service.register_instrument(
+        PaymentInstrument(instrument_id="i1", person_id="p1", provider="mock", kind="card"), token="tok_second"
+    )
+    assert charge() == "tok_second" and storage.gets == 2
+    assert service.vault_cache.stats()["hit_rate"] == pytest.approx(4 / 6)
+    assert "tok_" not in caplog.text and "tok_" not in repr(service.vault_cache)
+    assert "tok_" not in str(service.vault_cache.stats())
@@ -0,0 +1,115 @@
+import json
+import random
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from payments.api import register_payment_routes
+from payments.ledger import SQLiteLedger
+from payments.webhooks import WebhookQueue, WebhookQueueFull
+
+
+def _submit(queue, event_id, txn_id, step):
+    payload = {"event_id": event_id, "txn_id": txn_id, "step": step}
+    return queue.submit("mock", json.dumps(payload).encode(), payload)
+
+
+def test_deliveries_for_a_transaction_keep_their_order():
+    seen = {}
+
+    def handler(provider, payload):
+        time.sleep(random.random() / 1000)
+        seen.setdefault(payload["txn_id"], []).append(payload["step"])
+
+    queue = WebhookQueue(handler, workers=4).start()
+    for step in range(20):
+        for txn in range(8):
+            _submit(queue, f"e-{txn}-{step}", f"t{txn}", step)
+    assert queue.join(5)
+    assert seen == {f"t{txn}": list(range(20)) for txn in range(8)}
+    stats = queue.stats()
+    assert stats["processed"] == 160 and stats["pending"] == 0 and stats["ingest_rate"] > 0
+    queue.close()
+
+
+def test_duplicates_are_dropped_and_failures_retried():
+    calls = []
+
+    def handler(provider, payload):
+        calls.append(payload["event_id"])
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+
+    queue = WebhookQueue(handler, sleep=lambda _: None).start()
+    assert _submit(queue, "e1", "t1", 0) is True
+    assert _submit(queue, "e1", "t1", 0) is False
+    queue.join(5)
+    assert calls == ["e1", "e1"]
+    stats = queue.stats()
+    assert stats["duplicates"] == 1 and stats["retries"] == 1 and stats["processed"] == 1
+    queue.close()
+
+
+def test_backpressure():
+    queue = WebhookQueue(lambda provider, payload: None, max_pending=1)
+    _submit(queue, "e1", "t1", 0)
+    with pytest.raises(WebhookQueueFull):
+        _submit(queue, "e2", "t1", 1)
+
+
+def test_unprocessed_deliveries_survive_restart(tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    # Not started: the delivery is persisted but never processed.
+    _submit(WebhookQueue(lambda provider, payload: None, backend=ledger), "e1", "t1", 0)
+    ledger.close()
+
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    handled = []
+    queue = WebhookQueue(lambda provider, payload: handled.append(payload), backend=ledger).start()
+    queue.join(5)
+    assert handled == [{"event_id": "e1", "txn_id": "t1", "step": 0}]
+    assert _submit(queue, "e1", "t1", 0) is False
+    queue.close()
+    assert list(ledger.pending_webhook_events()) == []
+    ledger.close()
+
+
+def test_replay_pages_the_backlog_and_respects_max_pending(tmp_path):
+    ledger = SQLiteLedger(str(tmp_path / "ledger.db"))
+    for step in range(1200):  # more than two ledger pages
+        body = json.dumps({"event_id": f"e{step}", "txn_id": "t1", "step": step}).encode()
+        ledger.put_webhook_event("mock", f"e{step}", "t1", body, time.time())
+
+    steps, pending = [], []
+
+    def handler(provider, payload):
+        steps.append(payload["step"])
+        pending.append(queue.stats()["pending"])
+
+    queue = WebhookQueue(handler, backend=ledger, max_pending=10)
+    queue.start()
+    assert queue.join(10)
+    queue.close()
+    assert steps == list(range(1200)) and max(pending) <= 10
+    assert list(ledger.pending_webhook_events()) == []
+    ledger.close()
+
+
+def test_api_acknowledges_with_202(monkeypatch):
+    monkeypatch.setenv("UNISON_PAYMENTS_WEBHOOK_QUEUE", "true")
+    app = FastAPI()
+    service = register_payment_routes(app)
+    client = TestClient(app)
+    body = {"event_id": "evt_1", "txn_id": "t1", "person_id": "p1", "amount": 3, "status": "failed"}
+
+    resp = client.post("/payments/webhooks/mock", json=body)
+    assert resp.status_code == 202 and resp.json()["duplicate"] is False
+    assert client.post("/payments/webhooks/mock", json=body).json()["duplicate"] is True
+    assert client.post("/payments/webhooks/other", json=body).status_code == 404
+    assert client.post("/payments/webhooks/mock", content=b"not json").status_code == 400
+
+    service.webhooks.join(5)
+    assert service.get_transaction_status("t1").status.value == "failed"
+    service.close()